@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License Agreement
+# This code is licensed under the outer restricted Tiss license:
+#
+#  Copyright [2014]-[2020] Thales Services under the Thales Inner Source Software License
+#  (Version 1.0, InnerPublic -OuterRestricted the "License");
+#
+#  You may not use this file except in compliance with the License.
+#
+#  The complete license agreement can be requested at contact@punchplatform.com.
+#
+#  Refer to the License for the specific language governing permissions and limitations
+#  under the License.
+
+import json
+import os
+import tempfile
+from typing import NamedTuple, Optional
+
+
+class Watermark(NamedTuple):
+    """Last document scored; documents are scored in (@timestamp, _id) order"""
+
+    timestamp: str
+    id: str
+
+
+class LocalCheckpointStore(object):
+    """Watermark kept in a local json file, replaced atomically on every save"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self) -> Optional[Watermark]:
+        try:
+            with open(self.path, "r") as file:
+                checkpoint = json.load(file)
+        except FileNotFoundError:
+            return None
+        return Watermark(checkpoint["timestamp"], checkpoint["id"])
+
+    def save(self, watermark: Watermark) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(watermark._asdict(), file)
+        os.replace(temporary, self.path)
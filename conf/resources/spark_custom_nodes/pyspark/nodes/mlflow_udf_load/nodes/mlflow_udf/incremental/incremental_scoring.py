@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License Agreement
+# This code is licensed under the outer restricted Tiss license:
+#
+#  Copyright [2014]-[2020] Thales Services under the Thales Inner Source Software License
+#  (Version 1.0, InnerPublic -OuterRestricted the "License");
+#
+#  You may not use this file except in compliance with the License.
+#
+#  The complete license agreement can be requested at contact@punchplatform.com.
+#
+#  Refer to the License for the specific language governing permissions and limitations
+#  under the License.
+
+import argparse
+import datetime
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from nodes.mlflow_udf.incremental.checkpoint import LocalCheckpointStore, Watermark
+from nodes.mlflow_udf.udf_loading.local_runner import LocalPredictionRunner, get_field
+from nodes.mlflow_udf.udf_loading.prediction_udf import DEFAULT_BATCH_SIZE, REGRESSION
+
+TIMESTAMP_FIELD = "@timestamp"
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+DEATH_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.0000Z"
+OUTPUT_INDEX_PREFIX = "aircraft-report-"
+# Only documents with a sensor value are scored, as in the punchline query
+SENSOR_QUERY = {"exists": {"field": "sensor"}}
+
+
+def document_key(document: Dict[str, Any]) -> Watermark:
+    return Watermark(document[TIMESTAMP_FIELD], document["_id"])
+
+
+def _elasticsearch_client(nodes: Sequence[str], port: int, login: str, password: str) -> Any:
+    from elasticsearch import Elasticsearch
+
+    return Elasticsearch(hosts=[{"host": node, "port": port} for node in nodes], http_auth=(login, password) if login else None)
+
+
+class ElasticsearchDocumentSource(object):
+    """Documents of the input indices not older than the watermark"""
+
+    def __init__(
+        self,
+        index: str,
+        nodes: Sequence[str] = ("localhost",),
+        port: int = 9200,
+        login: str = "",
+        password: str = "",
+        page_size: int = 1000,
+    ) -> None:
+        self.index = index
+        self.client = _elasticsearch_client(nodes, port, login, password)
+        self.page_size = page_size
+
+    def fetch(self, watermark: Optional[Watermark]) -> Iterable[Dict[str, Any]]:
+        from elasticsearch import helpers
+
+        must = [SENSOR_QUERY]
+        if watermark is not None:
+            # _id cannot be ranged on, documents of the watermark timestamp
+            # already scored are dropped by the scorer
+            must.append({"range": {TIMESTAMP_FIELD: {"gte": watermark.timestamp}}})
+        query = {"query": {"bool": {"must": must}}}
+        for hit in helpers.scan(self.client, query=query, index=self.index, size=self.page_size):
+            yield {**hit["_source"], "_id": hit["_id"]}
+
+
+class InMemoryDocumentSource(object):
+    """Documents held in memory, e.g. read from the aircraft generator output"""
+
+    def __init__(self, documents: Iterable[Dict[str, Any]] = ()) -> None:
+        self.documents = list(documents)
+
+    def fetch(self, watermark: Optional[Watermark]) -> Iterable[Dict[str, Any]]:
+        return [document for document in self.documents if watermark is None or document[TIMESTAMP_FIELD] >= watermark.timestamp]
+
+
+class ElasticsearchUpsertSink(object):
+    """Upsert scored documents by id into one daily index per @timestamp day"""
+
+    def __init__(
+        self,
+        index_prefix: str = OUTPUT_INDEX_PREFIX,
+        nodes: Sequence[str] = ("localhost",),
+        port: int = 9200,
+        login: str = "",
+        password: str = "",
+    ) -> None:
+        self.index_prefix = index_prefix
+        self.client = _elasticsearch_client(nodes, port, login, password)
+
+    def upsert(self, documents: List[Dict[str, Any]]) -> None:
+        from elasticsearch import helpers
+
+        actions = (
+            {
+                "_op_type": "update",
+                "_index": self.index_prefix + document[TIMESTAMP_FIELD][:10].replace("-", "."),
+                "_id": document["id"],
+                "doc": document,
+                "doc_as_upsert": True,
+            }
+            for document in documents
+        )
+        helpers.bulk(self.client, actions)
+
+
+class InMemoryUpsertSink(object):
+    def __init__(self) -> None:
+        self.documents: Dict[str, Dict[str, Any]] = {}
+
+    def upsert(self, documents: List[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.documents[document["id"]] = document
+
+
+def decorate(document: Dict[str, Any], life: float) -> Dict[str, Any]:
+    """Scored document, as the sql stage of the prediction punchline builds it,
+    identified by the id of its source document so scoring it again updates it"""
+    cycle_number = get_field(document, "cycle.number")
+    cycle_schedule = get_field(document, "cycle.schedule")
+    death_timestamp = None
+    if life:
+        cycle_left = cycle_number / life - cycle_number
+        try:
+            timestamp = datetime.datetime.strptime(document[TIMESTAMP_FIELD], TIMESTAMP_FORMAT)
+            death = timestamp.replace(microsecond=0) + datetime.timedelta(seconds=int(cycle_left * cycle_schedule))
+            death_timestamp = death.strftime(DEATH_TIMESTAMP_FORMAT)
+        except (ValueError, OverflowError):
+            pass
+    return {
+        "life": life,
+        "death_timestamp": death_timestamp,
+        "id": document["_id"],
+        "sensor": get_field(document, "sensor"),
+        "cycle": {"number": cycle_number, "schedule": cycle_schedule},
+        "aircraft": {"id": get_field(document, "aircraft.id")},
+        TIMESTAMP_FIELD: document[TIMESTAMP_FIELD],
+    }
+
+
+class IncrementalScorer(object):
+    """Score only the documents after the watermark, in (@timestamp, _id) order.
+
+    The watermark is saved after every upserted batch, so an interrupted run
+    resumes after the last batch written, and the cost of a run grows with the
+    new documents rather than with the whole window.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        sink: Any,
+        store: LocalCheckpointStore,
+        predict: Callable[[Sequence[Sequence[Any]]], List[Any]],
+        input_fields: Sequence[str] = ("sensor",),
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.source = source
+        self.sink = sink
+        self.store = store
+        self.predict = predict
+        self.input_fields = input_fields
+        self.batch_size = batch_size
+
+    def run(self) -> int:
+        """Score the new documents, return how many there were"""
+        watermark = self.store.load()
+        documents = sorted(
+            (document for document in self.source.fetch(watermark) if watermark is None or document_key(document) > watermark),
+            key=document_key,
+        )
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            columns = [[get_field(document, field) for document in batch] for field in self.input_fields]
+            lives = self.predict(columns)
+            self.sink.upsert([decorate(document, life) for document, life in zip(batch, lives)])
+            self.store.save(document_key(batch[-1]))
+        return len(documents)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score the aircraft documents not scored yet and upsert them")
+    parser.add_argument("--model-uri", required=True)
+    parser.add_argument("--model-type", default=REGRESSION)
+    parser.add_argument("--checkpoint", required=True, help="json file of the watermark")
+    parser.add_argument("--input-index", default="source-aircraft-report-*")
+    parser.add_argument("--output-index-prefix", default=OUTPUT_INDEX_PREFIX)
+    parser.add_argument("--nodes", default="localhost", help="comma separated elasticsearch nodes")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--login", default="")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--fields", default="sensor", help="comma separated model inputs")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    arguments = parser.parse_args()
+
+    nodes = arguments.nodes.split(",")
+    runner = LocalPredictionRunner(arguments.model_uri, arguments.model_type, arguments.batch_size)
+    scorer = IncrementalScorer(
+        ElasticsearchDocumentSource(arguments.input_index, nodes, arguments.port, arguments.login, arguments.password),
+        ElasticsearchUpsertSink(arguments.output_index_prefix, nodes, arguments.port, arguments.login, arguments.password),
+        LocalCheckpointStore(arguments.checkpoint),
+        runner.predict,
+        arguments.fields.split(","),
+        arguments.batch_size,
+    )
+    scorer.run()
+    print(json.dumps(runner.report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License Agreement
+# This code is licensed under the outer restricted Tiss license:
+#
+#  Copyright [2014]-[2020] Thales Services under the Thales Inner Source Software License
+#  (Version 1.0, InnerPublic -OuterRestricted the "License");
+#
+#  You may not use this file except in compliance with the License.
+#
+#  The complete license agreement can be requested at contact@punchplatform.com.
+#
+#  Refer to the License for the specific language governing permissions and limitations
+#  under the License.
+
+import argparse
+import json
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+from nodes.mlflow_udf.udf_loading.model_cache import get_model, load_pyfunc
+from nodes.mlflow_udf.udf_loading.prediction_udf import DEFAULT_BATCH_SIZE, REGRESSION, predict_columns
+
+
+def get_field(document: Dict[str, Any], field: str) -> Any:
+    """Value of a dotted field, nested ("cycle": {"number": ..}) or flat ("cycle.number")"""
+    if field in document:
+        return document[field]
+    value = document
+    for name in field.split("."):
+        value = value[name]
+    return value
+
+
+class LocalPredictionRunner(object):
+    """Score documents batch by batch without Spark, with the same model cache
+    and the same batch scoring as the prediction udf.
+
+    Meant to benchmark scoring and to run it where no cluster is available.
+    """
+
+    def __init__(
+        self,
+        model_uri: str,
+        model_type: str = REGRESSION,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        version: str = None,
+        loader: Callable[[str], Any] = load_pyfunc,
+    ) -> None:
+        self.model_uri = model_uri
+        self.model_type = model_type
+        self.batch_size = batch_size
+        self.records = 0
+        self.predict_s = 0.0
+        start = time.perf_counter()
+        self.model = get_model(model_uri, version, loader)
+        self.load_s = time.perf_counter() - start
+
+    def predict(self, columns: Sequence[Sequence[Any]]) -> List[Any]:
+        """Score one batch, one sequence of values per model input"""
+        start = time.perf_counter()
+        result = predict_columns(self.model, columns, self.model_type).tolist()
+        self.predict_s += time.perf_counter() - start
+        self.records += len(result)
+        return result
+
+    def run(self, documents: Iterable[Dict[str, Any]], input_fields: Sequence[str], output_field: str) -> Iterator[Dict[str, Any]]:
+        """Yield the documents with their prediction set in ``output_field``"""
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, self.batch_size))
+            if not batch:
+                return
+            columns = [[get_field(document, field) for document in batch] for field in input_fields]
+            for document, prediction in zip(batch, self.predict(columns)):
+                document[output_field] = prediction
+                yield document
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "load_s": self.load_s,
+            "records": self.records,
+            "predict_s": self.predict_s,
+            "records_per_s": self.records / self.predict_s if self.predict_s else 0.0,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Score json lines documents with an mlflow model, without Spark")
+    parser.add_argument("--model-uri", required=True)
+    parser.add_argument("--model-type", default=REGRESSION)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--input", required=True, help="json lines documents, e.g. the aircraft generator output")
+    parser.add_argument("--fields", default="sensor", help="comma separated model inputs")
+    parser.add_argument("--output-field", default="life")
+    parser.add_argument("--output", help="json lines scored documents, only the report is printed if not set")
+    arguments = parser.parse_args()
+
+    runner = LocalPredictionRunner(arguments.model_uri, arguments.model_type, arguments.batch_size)
+    with open(arguments.input, "r") as source:
+        documents = runner.run(map(json.loads, source), arguments.fields.split(","), arguments.output_field)
+        if arguments.output:
+            with open(arguments.output, "w") as output:
+                for document in documents:
+                    output.write(json.dumps(document) + "\n")
+        else:
+            for _ in documents:
+                pass
+    print(json.dumps(runner.report()))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,10 @@
 #  under the License.
 
 from punchline_python.core.udf_registration import UdfRegistration
-from pyspark.sql.types import StringType
-from pyspark.sql.types import DoubleType
 from pyspark.sql.session import SparkSession
 from pyspark import SparkConf
-import mlflow.pyfunc
+
+from nodes.mlflow_udf.udf_loading.prediction_udf import DEFAULT_BATCH_SIZE, prediction_udf
 
 __author__ = "pierre"
 
@@ -32,14 +31,14 @@ class MlflowModelLoadingPreExecution(object):
         self.pre()
 
     def pre(self) -> None:
-        data_type = SparkConf().get("spark.punch.mlflow.model.type")
-        model_uri = SparkConf().get("spark.punch.mlflow.model.uri")
-        
-        if(data_type == 'regression'):
-            data_type = DoubleType()
-        
-        elif( (data_type == 'classification') or (data_type == 'clustering') ):
-            data_type = StringType()
-
-        prediction = mlflow.pyfunc.spark_udf(spark=self.__spark_session, model_uri=model_uri, result_type=data_type)
+        spark_conf = SparkConf()
+        data_type = spark_conf.get("spark.punch.mlflow.model.type")
+        model_uri = spark_conf.get("spark.punch.mlflow.model.uri")
+        # Optional, read from the MLmodel file of a local model when not set
+        model_version = spark_conf.get("spark.punch.mlflow.model.version")
+        batch_size = spark_conf.get("spark.punch.mlflow.batch.size", str(DEFAULT_BATCH_SIZE))
+
+        # Rows of a batch are scored by one call to the model
+        self.__spark_session.conf.set("spark.sql.execution.arrow.maxRecordsPerBatch", batch_size)
+        prediction = prediction_udf(model_uri, data_type, model_version)
         self.__spark_session.udf.register("prediction", prediction)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License Agreement
+# This code is licensed under the outer restricted Tiss license:
+#
+#  Copyright [2014]-[2020] Thales Services under the Thales Inner Source Software License
+#  (Version 1.0, InnerPublic -OuterRestricted the "License");
+#
+#  You may not use this file except in compliance with the License.
+#
+#  The complete license agreement can be requested at contact@punchplatform.com.
+#
+#  Refer to the License for the specific language governing permissions and limitations
+#  under the License.
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Models loaded by this python process, i.e. by this executor when python
+# workers are reused (spark.python.worker.reuse, the default)
+_models: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+
+def model_version(model_uri: str) -> str:
+    """Version of the model behind a uri.
+
+    A local model is versioned by the run and the creation time written in
+    its MLmodel file, so retraining it in place is noticed. Other uris
+    (runs:/<run_id>/..., models:/<name>/<version>) already name a version.
+    """
+    mlmodel_path = os.path.join(model_uri, "MLmodel")
+    if not os.path.isfile(mlmodel_path):
+        return ""
+    from mlflow.models import Model
+
+    model = Model.load(mlmodel_path)
+    return "{}@{}".format(model.run_id, model.utc_time_created)
+
+
+def load_pyfunc(model_uri: str) -> Any:
+    import mlflow.pyfunc
+
+    return mlflow.pyfunc.load_model(model_uri)
+
+
+def get_model(model_uri: str, version: Optional[str] = None, loader: Callable[[str], Any] = load_pyfunc) -> Any:
+    """Model of the uri, loaded once per process and version"""
+    key = (model_uri, model_version(model_uri) if version is None else version)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = loader(model_uri)
+                # Older versions of the model are not used anymore
+                for stale in [cached for cached in _models if cached[0] == model_uri]:
+                    del _models[stale]
+                _models[key] = model
+    return model
+
+
+def clear() -> None:
+    with _lock:
+        _models.clear()
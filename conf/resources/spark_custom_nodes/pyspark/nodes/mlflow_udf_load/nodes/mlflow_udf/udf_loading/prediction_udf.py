@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# License Agreement
+# This code is licensed under the outer restricted Tiss license:
+#
+#  Copyright [2014]-[2020] Thales Services under the Thales Inner Source Software License
+#  (Version 1.0, InnerPublic -OuterRestricted the "License");
+#
+#  You may not use this file except in compliance with the License.
+#
+#  The complete license agreement can be requested at contact@punchplatform.com.
+#
+#  Refer to the License for the specific language governing permissions and limitations
+#  under the License.
+
+from typing import Any, Sequence
+
+from nodes.mlflow_udf.udf_loading.model_cache import get_model, model_version
+
+DEFAULT_BATCH_SIZE = 10000
+REGRESSION = "regression"
+CLASSIFICATION_TYPES = ("classification", "clustering")
+
+
+def predict_columns(model: Any, columns: Sequence[Any], model_type: str = REGRESSION) -> Any:
+    """Score one batch given as one pandas series or array per model input.
+
+    Inputs are named "0", "1", ... as mlflow.pyfunc.spark_udf names them, so
+    models trained for it score the same way.
+    """
+    import pandas
+
+    frame = pandas.DataFrame({str(index): column for index, column in enumerate(columns)})
+    result = model.predict(frame)
+    if isinstance(result, pandas.DataFrame):
+        result = result.iloc[:, 0]
+    result = pandas.Series(result, index=frame.index)
+    if model_type in CLASSIFICATION_TYPES:
+        return result.astype(str)
+    return result.astype("float64")
+
+
+def prediction_udf(model_uri: str, model_type: str = REGRESSION, version: str = None) -> Any:
+    """Scalar pandas udf scoring Arrow batches with the model of the uri.
+
+    Unlike mlflow.pyfunc.spark_udf, the model is not archived and broadcast
+    on every run: each executor loads it from the uri once per version and
+    keeps it for as long as its python worker lives, so the uri must be
+    readable from the executors.
+    """
+    from pyspark.sql.functions import PandasUDFType, pandas_udf
+    from pyspark.sql.types import DoubleType, StringType
+
+    result_type = StringType() if model_type in CLASSIFICATION_TYPES else DoubleType()
+    # Resolved once on the driver, executors only look the model up
+    if version is None:
+        version = model_version(model_uri)
+
+    def predict(*columns):
+        return predict_columns(get_model(model_uri, version), columns, model_type)
+
+    return pandas_udf(predict, result_type, PandasUDFType.SCALAR)
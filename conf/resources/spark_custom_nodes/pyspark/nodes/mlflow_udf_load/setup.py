@@ -7,7 +7,7 @@ from setuptools import setup, find_packages
 setup(
     name="nodes",
     version="1.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests"]),
     include_package_data=True,
     author="punchplatform",
     author_email="contact@punchplatform.com",
@@ -19,7 +19,8 @@ setup(
         "mlflow==1.7.2",
         "scikit-learn==0.22.2",
         "boto3",
-        "pyarrow==0.14.0"
+        "pyarrow==0.14.0",
+        "elasticsearch>=7,<8"
     ]
 )
 
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from nodes.mlflow_udf.incremental.checkpoint import LocalCheckpointStore, Watermark
+from nodes.mlflow_udf.incremental.incremental_scoring import (
+    IncrementalScorer,
+    InMemoryDocumentSource,
+    InMemoryUpsertSink,
+)
+
+
+def aircraft_document(document_id: str, timestamp: str, sensor: float) -> dict:
+    return {
+        "_id": document_id,
+        "@timestamp": timestamp,
+        "sensor": sensor,
+        "cycle": {"number": 10, "schedule": 3600},
+        "aircraft": {"id": "aircraft-1"},
+    }
+
+
+class IncrementalScoringTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = LocalCheckpointStore(os.path.join(self.directory.name, "checkpoint.json"))
+        self.source = InMemoryDocumentSource(
+            [
+                aircraft_document("b", "2020-11-05T10:00:00.000Z", 0.5),
+                aircraft_document("a", "2020-11-05T10:00:00.000Z", 0.25),
+                aircraft_document("c", "2020-11-05T11:00:00.000Z", 0.75),
+            ]
+        )
+        self.sink = InMemoryUpsertSink()
+        self.scored = []
+
+        def predict(columns):
+            self.scored.extend(columns[0])
+            return [0.5 for _ in columns[0]]
+
+        self.scorer = IncrementalScorer(self.source, self.sink, self.store, predict, batch_size=2)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def testScoreOnlyNewDocuments(self):
+        self.assertEqual(3, self.scorer.run())
+        self.assertEqual([0.25, 0.5, 0.75], self.scored)
+        self.assertEqual(Watermark("2020-11-05T11:00:00.000Z", "c"), self.store.load())
+        self.assertEqual(0, self.scorer.run())
+
+        self.source.documents += [
+            aircraft_document("d", "2020-11-05T11:00:00.000Z", 1.0),
+            aircraft_document("e", "2020-11-05T12:00:00.000Z", 0.1),
+        ]
+        self.assertEqual(2, self.scorer.run())
+        self.assertEqual([0.25, 0.5, 0.75, 1.0, 0.1], self.scored)
+        self.assertEqual(["a", "b", "c", "d", "e"], sorted(self.sink.documents))
+
+    def testUpsertDecoratedPrediction(self):
+        self.scorer.run()
+        document = self.sink.documents["a"]
+        self.assertEqual(0.5, document["life"])
+        # Half the life used after 10 cycles, 10 more cycles of an hour
+        self.assertEqual("2020-11-05T20:00:00.0000Z", document["death_timestamp"])
+        self.assertEqual({"number": 10, "schedule": 3600}, document["cycle"])
+
+    def testResumeAfterLastBatch(self):
+        self.store.save(Watermark("2020-11-05T10:00:00.000Z", "a"))
+        self.assertEqual(2, self.scorer.run())
+        self.assertEqual([0.5, 0.75], self.scored)
+
+
+if __name__ == "__main__":
+    unittest.main()
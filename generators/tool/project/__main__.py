@@ -1,8 +1,10 @@
 from optparse import OptionParser
 
-from project.generator.GeneratorFactory import GeneratorFactory
 from project.utils.Configuration import Configuration
 
+# Generators, numpy and the modules of the other modes are imported where
+# they are used, so that short runs only pay for what they run
+
 parser = OptionParser()
 parser.add_option(
     "-c",
@@ -13,20 +15,271 @@ parser.add_option(
     help="Path to the Configuration file",
 )
 
+parser.add_option(
+    "-u",
+    "--use-cases",
+    action="store",
+    type="string",
+    dest="use_cases",
+    help="Comma separated use cases to run, every enabled one by default",
+)
+
+parser.add_option(
+    "-w",
+    "--workers",
+    action="store",
+    type="int",
+    dest="workers",
+    help="Generate use cases, payload entries and their shards over N processes",
+)
+
+parser.add_option(
+    "--seed",
+    action="store",
+    type="int",
+    dest="seed",
+    help="Seed of every use case, runs with the same seed write the same records",
+)
+
+parser.add_option(
+    "--start-time",
+    action="store",
+    type="string",
+    dest="start_time",
+    help="ISO 8601 timestamp of the first records, instead of now",
+)
+
+parser.add_option(
+    "--cache",
+    action="store",
+    type="string",
+    dest="cache",
+    help="Directory of cached outputs, reused for use cases with a seed and a"
+    " start time that did not change",
+)
+
+parser.add_option(
+    "--cache-max-mb",
+    action="store",
+    type="int",
+    dest="cache_max_mb",
+    help="Evict the least recently used outputs beyond this size, 10 GB by default",
+)
+
+parser.add_option(
+    "--cache-compress",
+    action="store_true",
+    dest="cache_compress",
+    default=False,
+    help="Store the cached outputs gzip compressed",
+)
+
+parser.add_option(
+    "--pipeline",
+    action="store_true",
+    dest="pipeline",
+    default=False,
+    help="Generate, encode and write every use case on concurrent threads",
+)
+
+parser.add_option(
+    "--probe",
+    action="store_true",
+    dest="probe",
+    default=False,
+    help="Stamp every record with the run id, its sequence number and the time"
+    " it is written, for python -m project.probe",
+)
+
+parser.add_option(
+    "--dataset-profile",
+    action="store_true",
+    dest="dataset_profile",
+    default=False,
+    help="Profile the records of every use case as they are written, into a"
+    " .profile.json report next to output_logs",
+)
+
+parser.add_option(
+    "--metrics",
+    action="store",
+    type="string",
+    dest="metrics",
+    help="Write the time spent in every phase of every use case, records, bytes"
+    " and memory high-water marks to this json file, or in the Prometheus text"
+    " format if it ends with .prom",
+)
+
+parser.add_option(
+    "--profile",
+    action="store",
+    type="string",
+    dest="profile",
+    help="Profile every use case with cprofile or tracemalloc",
+)
+
+parser.add_option(
+    "--profile-dir",
+    action="store",
+    type="string",
+    dest="profile_dir",
+    default=".",
+    help="Directory of the profiles, one per use case",
+)
+
+parser.add_option(
+    "--live",
+    action="store_true",
+    dest="live",
+    default=False,
+    help="Emit the records at a target rate, stamped with the wall clock",
+)
+
+parser.add_option(
+    "--rate",
+    action="store",
+    type="float",
+    dest="rate",
+    help="Live mode: events per second of each use case, 1000 by default",
+)
+
+parser.add_option(
+    "--ramp-s",
+    action="store",
+    type="float",
+    dest="ramp_s",
+    default=0,
+    help="Live mode: seconds to ramp up from 0 to the target rate",
+)
+
+parser.add_option(
+    "--duration-s",
+    action="store",
+    type="float",
+    dest="duration_s",
+    help="Live mode: stop after this many seconds, replaying payloads until then",
+)
+
+parser.add_option(
+    "--sink",
+    action="store",
+    type="string",
+    dest="sink",
+    help="Live mode: file (output_logs), stdout, tcp://host:port or udp://host:port"
+    " instead of the sink of each use case",
+)
+
 (options, args) = parser.parse_args()
 
 if not options.configuration:
     parser.error("options -c is mandatory")
+if options.profile and options.workers:
+    parser.error("option --profile profiles serial runs, without -w")
+if options.probe and options.workers:
+    parser.error("option --probe stamps serial runs, without -w")
+if options.metrics and options.workers:
+    parser.error("option --metrics measures serial runs, without -w")
 
 Configuration.setUp(options.configuration)
 configuration = Configuration.getConfiguration().getConf()
 
-for payload in configuration["use_case"]:
-    output_file_path = configuration["use_case"][payload]["output_logs"]
-    class_name = configuration["use_case"][payload]["class"]
-    module_name = configuration["use_case"][payload]["module"]
-    generator = GeneratorFactory.GeneratorBuild(module_name, class_name)
-    generator.generateDataset(
-        configuration["use_case"][payload]["payload"], output_file_path
+# Disabled use cases are dropped before their generator is even imported
+selected = options.use_cases.split(",") if options.use_cases else None
+if selected is not None:
+    unknown = set(selected) - set(configuration["use_case"])
+    if unknown:
+        parser.error("unknown use cases {}".format(", ".join(sorted(unknown))))
+configuration["use_case"] = {
+    name: use_case
+    for name, use_case in configuration["use_case"].items()
+    if (name in selected if selected is not None else use_case.get("enabled", True))
+}
+
+for use_case in configuration["use_case"].values():
+    if options.seed is not None:
+        use_case["seed"] = options.seed
+    if options.start_time is not None:
+        use_case["start_time"] = options.start_time
+    if options.pipeline:
+        use_case.setdefault("pipeline", True)
+    if options.dataset_profile:
+        use_case.setdefault("dataset_profile", True)
+    if options.probe:
+        use_case.setdefault("probe", True)
+
+if options.live:
+    from project.utils.Live import DEFAULT_RATE, run_live_use_cases
+
+    run_live_use_cases(
+        configuration["use_case"],
+        options.sink,
+        options.rate if options.rate is not None else DEFAULT_RATE,
+        options.ramp_s,
+        options.duration_s,
     )
+    exit(0)
+
+use_cases = configuration["use_case"]
+cache = None
+if options.cache:
+    from project.utils.Cache import DEFAULT_CACHE_MAX_MB, DatasetCache, output_offset
+
+    cache_max_mb = options.cache_max_mb or DEFAULT_CACHE_MAX_MB
+    cache = DatasetCache(options.cache, cache_max_mb << 20, options.cache_compress)
+    missing = {}
+    for name, use_case in use_cases.items():
+        if cache.load(use_case, name):
+            print("{}: loaded from the cache".format(name))
+        else:
+            missing[name] = use_case
+    use_cases = missing
+    offsets = {name: output_offset(use_case) for name, use_case in use_cases.items()}
+
+metrics = None
+if options.metrics or options.profile:
+    from project.utils.Metrics import PROFILERS, RunMetrics, run_instrumented
+
+    if options.profile is not None and options.profile not in PROFILERS:
+        parser.error("option --profile: {} or {}".format(*PROFILERS))
+    metrics = RunMetrics()
+
+if options.workers:
+    from project.utils.Parallel import run_parallel
+
+    run_parallel(use_cases, options.workers, options.seed)
+elif metrics is not None:
+    for name, use_case in use_cases.items():
+        report = run_instrumented(
+            use_case, name, metrics, options.profile, options.profile_dir
+        ).report()
+        print(
+            "{}: {records} records in {seconds:.2f}s (build {build_s:.2f}s, "
+            "generate {generate_s:.2f}s, write {write_s:.2f}s, "
+            "close {close_s:.2f}s)".format(name, **report)
+        )
+        if report["pipeline"] is not None:
+            print(
+                "{}: pipeline bottleneck {}, busy {}".format(
+                    name,
+                    report["pipeline"]["bottleneck"],
+                    ", ".join(
+                        "{} {:.2f}s".format(stage, stats["busy_s"])
+                        for stage, stats in report["pipeline"]["stages"].items()
+                    ),
+                )
+            )
+else:
+    from project.generator.GeneratorFactory import GeneratorFactory
+
+    for name, use_case in use_cases.items():
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+        generator.generateDataset(use_case["payload"], use_case["output_logs"])
+if metrics is not None:
+    metrics.stop()
+
+if cache is not None:
+    for name, use_case in use_cases.items():
+        cache.store(use_case, name, offsets[name])
+if options.metrics:
+    metrics.save(options.metrics)
 exit(0)
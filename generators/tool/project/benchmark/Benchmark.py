@@ -0,0 +1,287 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from project.generator.GeneratorFactory import GeneratorFactory
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_REPEAT = 3
+# Cold starts are short and noisy, so more of them are run
+COLD_START_REPEAT = 10
+COLD_START_KEY = "ColdStart/linear"
+SCALES = ("small", "medium", "large")
+
+# Payload entry of every generator at every scale
+CASES = {
+    "Radar": {
+        "module": "project.generator.Radar",
+        "scales": {
+            "small": {
+                "sample_size_by_radar": 1000,
+                "radar_number": 10,
+                "frequency_s": 60,
+            },
+            "medium": {
+                "sample_size_by_radar": 1000,
+                "radar_number": 100,
+                "frequency_s": 60,
+            },
+            "large": {
+                "sample_size_by_radar": 10000,
+                "radar_number": 200,
+                "frequency_s": 60,
+            },
+        },
+    },
+    "Airspace": {
+        "module": "project.generator.Airspace",
+        "scales": {
+            scale: {
+                "x_start": 2.294859,
+                "x_end": 37.918436,
+                "y_start": 48.8175,
+                "y_end": 55.59828,
+                "duration_h": duration_h,
+                "frequency_s": 1,
+                "aeronef_ID": "aeronef-1",
+                "shape": "curvy",
+            }
+            for scale, duration_h in (("small", 3), ("medium", 30), ("large", 300))
+        },
+    },
+    "Fleet": {
+        "module": "project.generator.Fleet",
+        "scales": {
+            scale: {
+                "aircraft_number": aircraft_number,
+                "duration_h": 1,
+                "frequency_s": 10,
+                "shape": "mixed",
+            }
+            for scale, aircraft_number in (
+                ("small", 30),
+                ("medium", 300),
+                ("large", 5000),
+            )
+        },
+    },
+    "Aircraft": {
+        "module": "project.generator.Aircraft",
+        "scales": {
+            scale: {
+                "aircraft_number": aircraft_number,
+                "max_cycle_number": 100,
+                "cycle_schedule_s": 43200,
+            }
+            for scale, aircraft_number in (
+                ("small", 200),
+                ("medium", 2000),
+                ("large", 40000),
+            )
+        },
+    },
+    "Usage": {
+        "module": "project.generator.Usage",
+        "scales": {
+            scale: {
+                "iteration_number": iteration_number,
+                "schedule_time_s": 3600,
+                "average_life_esperancy_s": 20,
+                "average_flow_rate": 5,
+            }
+            for scale, iteration_number in (
+                ("small", 20),
+                ("medium", 200),
+                ("large", 4000),
+            )
+        },
+    },
+    "LinearValues": {
+        "module": "project.generator.LinearValues",
+        "scales": {
+            scale: {
+                "schedule_time_s": 3600,
+                "sample_number": sample_number,
+                "x_start_value": 0,
+                "y_start_value": 0,
+                "x_end_value": 1000,
+                "y_end_value": 100,
+                "type": "project",
+            }
+            for scale, sample_number in (
+                ("small", 10000),
+                ("medium", 100000),
+                ("large", 2000000),
+            )
+        },
+    },
+}
+
+
+def run_case(generator_name: str, scale: str, output_path: str) -> dict:
+    """Generate one case and measure it, meant to run in a fresh process"""
+    case = CASES[generator_name]
+    generator = GeneratorFactory.GeneratorBuild(case["module"], generator_name)
+    start = time.perf_counter()
+    records = generator.generateDataset([case["scales"][scale]], output_path)
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    return {
+        "generator": generator_name,
+        "scale": scale,
+        "records": records,
+        "seconds": seconds,
+        "records_per_s": records / seconds if seconds else 0.0,
+        "mb_per_s": size / (1 << 20) / seconds if seconds else 0.0,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_cold_start(repeat: int = COLD_START_REPEAT) -> dict:
+    """Wall time of a whole run of the tool, in a new interpreter, on the
+    smallest LinearValues case: mostly interpreter startup and imports"""
+    tool_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    with tempfile.TemporaryDirectory() as directory:
+        configuration_path = os.path.join(directory, "config.json")
+        with open(configuration_path, "w") as file:
+            file.write(
+                json.dumps(
+                    {
+                        "use_case": {
+                            "linear": {
+                                "payload": [
+                                    {
+                                        **CASES["LinearValues"]["scales"]["small"],
+                                        "sample_number": 100,
+                                    }
+                                ],
+                                "output_logs": os.path.join(directory, "linear.log"),
+                                "module": CASES["LinearValues"]["module"],
+                                "class": "LinearValues",
+                            }
+                        }
+                    }
+                )
+            )
+
+        def best_of(command):
+            runs = []
+            for _ in range(0, repeat):
+                start = time.perf_counter()
+                subprocess.run(command, cwd=tool_root, check=True)
+                runs.append(time.perf_counter() - start)
+            return min(runs)
+
+        interpreter_s = best_of([sys.executable, "-c", "pass"])
+        seconds = best_of([sys.executable, "-m", "project", "-c", configuration_path])
+    result = {
+        "seconds": seconds,
+        "interpreter_s": interpreter_s,
+        "tool_s": seconds - interpreter_s,
+    }
+    print(
+        "{:>19}: {seconds:>10.3f}s, {tool_s:.3f}s over the interpreter "
+        "startup".format(COLD_START_KEY, **result)
+    )
+    return result
+
+
+def run_suite(
+    generators=None,
+    scales=("small", "medium"),
+    repeat: int = DEFAULT_REPEAT,
+    cold_start: bool = True,
+) -> dict:
+    """Run every case ``repeat`` times and keep its fastest run, and measure
+    the cold start of the tool"""
+    generators = generators or list(CASES)
+    results = []
+    # A new interpreter per run, so that peak RSS is the one of the case
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        for generator_name in generators:
+            for scale in scales:
+                output_path = os.path.join(
+                    directory, "{}-{}.log".format(generator_name, scale)
+                )
+                runs = []
+                for _ in range(0, repeat):
+                    with context.Pool(1) as pool:
+                        runs.append(
+                            pool.apply(run_case, (generator_name, scale, output_path))
+                        )
+                    os.remove(output_path)
+                result = max(runs, key=lambda run: run["records_per_s"])
+                results.append(result)
+                print(
+                    "{generator:>12} {scale:>6}: {records:>10} records "
+                    "{records_per_s:>12.0f} records/s {mb_per_s:>8.1f} MB/s "
+                    "{peak_rss_mb:>8.1f} MB peak RSS".format(**result)
+                )
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+        "cold_start": run_cold_start() if cold_start else None,
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.loads(file.read())
+
+
+def save_baseline(report: dict, path: str = BASELINE_PATH):
+    baseline = load_baseline(path)
+    for result in report["results"]:
+        baseline["{generator}/{scale}".format(**result)] = round(
+            result["records_per_s"]
+        )
+    if report.get("cold_start"):
+        baseline[COLD_START_KEY] = round(report["cold_start"]["seconds"], 3)
+    with open(path, "w") as file:
+        file.write(json.dumps(baseline, indent=4, sort_keys=True))
+        file.write("\n")
+
+
+def compare_to_baseline(
+    report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD
+) -> list:
+    """Cases whose throughput fell more than ``threshold`` under the baseline,
+    and a cold start over the baseline by more than ``threshold``"""
+    regressions = []
+    for result in report["results"]:
+        key = "{generator}/{scale}".format(**result)
+        if key in baseline and result["records_per_s"] < baseline[key] * (
+            1 - threshold
+        ):
+            regressions.append(
+                "{}: {:.0f} records/s, baseline {:.0f} records/s".format(
+                    key, result["records_per_s"], baseline[key]
+                )
+            )
+    cold_start = report.get("cold_start")
+    if (
+        cold_start
+        and COLD_START_KEY in baseline
+        and cold_start["seconds"] > baseline[COLD_START_KEY] * (1 + threshold)
+    ):
+        regressions.append(
+            "{}: {:.3f}s, baseline {:.3f}s".format(
+                COLD_START_KEY, cold_start["seconds"], baseline[COLD_START_KEY]
+            )
+        )
+    return regressions
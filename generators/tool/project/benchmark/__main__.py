@@ -0,0 +1,103 @@
+import json
+from optparse import OptionParser
+
+from project.benchmark.Benchmark import (
+    BASELINE_PATH,
+    DEFAULT_REPEAT,
+    DEFAULT_THRESHOLD,
+    compare_to_baseline,
+    load_baseline,
+    run_suite,
+    save_baseline,
+)
+
+parser = OptionParser()
+parser.add_option(
+    "-g",
+    "--generators",
+    action="store",
+    type="string",
+    dest="generators",
+    help="Comma separated generators to run, all of them by default",
+)
+parser.add_option(
+    "-s",
+    "--scales",
+    action="store",
+    type="string",
+    dest="scales",
+    default="small,medium",
+    help="Comma separated scales among small, medium and large",
+)
+parser.add_option(
+    "-o",
+    "--output",
+    action="store",
+    type="string",
+    dest="output",
+    default="bench_results.json",
+    help="Path of the JSON results file",
+)
+parser.add_option(
+    "-b",
+    "--baseline",
+    action="store",
+    type="string",
+    dest="baseline",
+    default=BASELINE_PATH,
+    help="Path of the baseline file",
+)
+parser.add_option(
+    "-t",
+    "--threshold",
+    action="store",
+    type="float",
+    dest="threshold",
+    default=DEFAULT_THRESHOLD,
+    help="Fail when records/s fall more than this ratio under the baseline",
+)
+parser.add_option(
+    "-r",
+    "--repeat",
+    action="store",
+    type="int",
+    dest="repeat",
+    default=DEFAULT_REPEAT,
+    help="Runs of every case, the fastest one is kept",
+)
+parser.add_option(
+    "--no-cold-start",
+    action="store_false",
+    dest="cold_start",
+    default=True,
+    help="Do not measure the cold start of the tool",
+)
+parser.add_option(
+    "--update-baseline",
+    action="store_true",
+    dest="update_baseline",
+    default=False,
+    help="Store the results as the new baseline",
+)
+
+options, args = parser.parse_args()
+
+report = run_suite(
+    options.generators.split(",") if options.generators else None,
+    options.scales.split(","),
+    options.repeat,
+    options.cold_start,
+)
+with open(options.output, "w") as file:
+    file.write(json.dumps(report, indent=4))
+
+if options.update_baseline:
+    save_baseline(report, options.baseline)
+    exit(0)
+
+regressions = compare_to_baseline(
+    report, load_baseline(options.baseline), options.threshold
+)
+for regression in regressions:
+    print("REGRESSION {}".format(regression))
+exit(1 if regressions else 0)
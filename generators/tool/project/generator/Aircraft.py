@@ -1,12 +1,27 @@
 from project.generator.GeneratorI import GeneratorI
-from project.utils.Utils import (
-    write_array_json_to_file,
-    generate_linear_aircraft_sensor_values,
-)
+from project.utils.Utils import iter_linear_aircraft_sensor_values, split_count
 
 
 class Aircraft(GeneratorI):
-    def generateDataset(self, payload: dict, output: str) -> list:
-        for conf in payload:
-            data = generate_linear_aircraft_sensor_values(**conf)
-            write_array_json_to_file(data, output)
+    rollup_defaults = {
+        "interval_s": 86400,
+        "group_by": ["aircraft.id"],
+        "stats": ["sensor"],
+    }
+
+    def generateChunks(self, conf: dict, rng=None):
+        return iter_linear_aircraft_sensor_values(
+            **conf,
+            chunk_size=self.chunk_size,
+            rng=rng,
+            start_time=self.start_time,
+        )
+
+    def shards(self, conf: dict) -> list:
+        aircraft_by_shard = max(1, self.shard_size // max(1, conf["max_cycle_number"]))
+        return [
+            {**conf, "aircraft_number": aircraft_number}
+            for aircraft_number in split_count(
+                conf["aircraft_number"], aircraft_by_shard
+            )
+        ]
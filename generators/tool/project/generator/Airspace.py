@@ -1,9 +1,17 @@
 from project.generator.GeneratorI import GeneratorI
-from project.utils.Utils import write_array_json_to_file, generate_random_shape_points
+from project.utils.Columnar import TIMESTAMP_STR
+from project.utils.Utils import iter_random_shape_points
 
 
 class Airspace(GeneratorI):
-    def generateDataset(self, payload: dict, output: str) -> list:
-        for conf in payload:
-            data = generate_random_shape_points(**conf)
-            write_array_json_to_file(data, output)
+    timestamp_field = "@timestamp"
+    timestamp_style = TIMESTAMP_STR
+    geo_fields = (("coord.longitude", "coord.latitude", "coord.country"),)
+
+    def generateChunks(self, conf: dict, rng=None):
+        return iter_random_shape_points(
+            **conf,
+            chunk_size=self.chunk_size,
+            rng=rng,
+            start_time=self.start_time,
+        )
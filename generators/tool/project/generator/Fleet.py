@@ -0,0 +1,35 @@
+from project.generator.GeneratorI import GeneratorI
+from project.utils.Columnar import TIMESTAMP_STR
+from project.utils.Utils import chunk_ranges, iter_fleet_points, step_count
+
+
+class Fleet(GeneratorI):
+    timestamp_field = "@timestamp"
+    timestamp_style = TIMESTAMP_STR
+    geo_fields = (("coord.longitude", "coord.latitude", "coord.country"),)
+
+    def generateChunks(self, conf: dict, rng=None):
+        return iter_fleet_points(
+            **conf,
+            chunk_size=self.chunk_size,
+            rng=rng,
+            start_time=self.start_time,
+        )
+
+    def shards(self, conf: dict) -> list:
+        # Shards are ranges of time steps of the same fleet, which unseeded
+        # shards would each draw differently
+        if self.seed is None:
+            return [conf]
+        step_by_shard = max(1, self.shard_size // max(1, conf["aircraft_number"]))
+        return [
+            {**conf, "step_start": start, "step_end": end}
+            for start, end in chunk_ranges(
+                step_count(conf["duration_h"], conf["frequency_s"]), step_by_shard
+            )
+        ]
+
+    def generateShard(self, conf: dict, payload_index: int, shard_index: int):
+        return self.enrichChunks(
+            self.generateChunks(conf, self.shardRng(payload_index, 0))
+        )
@@ -1,9 +1,37 @@
 import importlib
-from project.generator.GeneratorI import GeneratorI
+from typing import TYPE_CHECKING
+
+# Generators, and numpy with them, are only imported when one is built
+if TYPE_CHECKING:
+    from project.generator.GeneratorI import GeneratorI
+
+GENERATOR_OPTIONS = (
+    "chunk_size",
+    "encoder",
+    "sink",
+    "seed",
+    "start_time",
+    "pipeline",
+    "countries",
+    "rollup",
+    "dataset_profile",
+    "probe",
+)
 
 
 class GeneratorFactory:
     @staticmethod
-    def GeneratorBuild(module: str, class_name: str) -> GeneratorI:
+    def GeneratorBuild(module: str, class_name: str) -> "GeneratorI":
         dynamic_node = getattr(importlib.import_module(module), class_name)
         return dynamic_node()
+
+    @staticmethod
+    def GeneratorFromUseCase(use_case: dict, name: str = None) -> "GeneratorI":
+        generator = GeneratorFactory.GeneratorBuild(
+            use_case["module"], use_case["class"]
+        )
+        generator.name = name
+        for option in GENERATOR_OPTIONS:
+            if option in use_case:
+                setattr(generator, option, use_case[option])
+        return generator
@@ -1,4 +1,164 @@
+import contextlib
+import sys
+import zlib
+
+import numpy as np
+
+from project.sink.SinkFactory import SinkFactory
+from project.utils.Columnar import TIMESTAMP_EVENT
+from project.utils.Pipeline import DEFAULT_QUEUE_SIZE, Pipeline
+from project.utils.Utils import DEFAULT_CHUNK_SIZE, DEFAULT_ENCODER
+
+
 class GeneratorI:
-    def generateDataset(payload: dict, output: str) -> list:
-        """Generate the dataset"""
-        pass
+    chunk_size = DEFAULT_CHUNK_SIZE
+    encoder = DEFAULT_ENCODER
+    sink = "file"
+    # Root of every random stream, and first timestamp (ISO 8601) of the
+    # records; None draws fresh entropy and starts now
+    seed = None
+    start_time = None
+    # Name of the use case, keys the random streams of the generator
+    name = None
+    # Generate, encode and write on concurrent threads, True or the number
+    # of chunks queued between stages
+    pipeline = False
+    # TopoJSON map whose countries are looked up for the geo_fields of the
+    # records, None leaves them out
+    countries = None
+    # (lon field, lat field, country field) of the locations of the records
+    geo_fields = ()
+    # Summaries of the records by time bucket written next to them, see
+    # project.utils.Rollup, and the fields summarized by default
+    rollup = None
+    rollup_defaults = {}
+    # One pass profile of the records saved as a json report, True or the
+    # settings of project.utils.DatasetProfile, and the ones by default
+    dataset_profile = None
+    dataset_profile_defaults = {}
+    # Stamp the records with a project.probe probe, True or the id of the run
+    probe = False
+    # Approximate number of records of a shard in parallel mode
+    shard_size = 200000
+    # Field set to the wall clock in live mode, and its format
+    timestamp_field = "event_timestamp"
+    timestamp_style = TIMESTAMP_EVENT
+
+    def shards(self, conf: dict) -> list:
+        """Split one payload entry into independent payload entries"""
+        return [conf]
+
+    def shardRng(self, payload_index: int, shard_index: int) -> np.random.Generator:
+        """Random stream of one shard, only depending on the seed, the name of
+        the generator and the position of the shard"""
+        if self.seed is None:
+            return np.random.default_rng()
+        return np.random.default_rng(
+            np.random.SeedSequence(
+                self.seed,
+                spawn_key=(
+                    zlib.crc32((self.name or type(self).__name__).encode("utf-8")),
+                    payload_index,
+                    shard_index,
+                ),
+            )
+        )
+
+    def generateChunks(self, conf: dict, rng=None):
+        """Yield the records of one payload entry as bounded-size chunks"""
+        raise NotImplementedError
+
+    def enrichChunks(self, chunks):
+        """Chunks with the countries of their locations, if countries is set"""
+        if self.countries is None or not self.geo_fields:
+            return chunks
+        from project.utils.SpatialIndex import enrich_chunks, load_index
+
+        return enrich_chunks(chunks, load_index(self.countries), self.geo_fields)
+
+    def generateShard(self, conf: dict, payload_index: int, shard_index: int):
+        """Yield the chunks of one shard, the same ones on every run when seeded"""
+        return self.enrichChunks(
+            self.generateChunks(conf, self.shardRng(payload_index, shard_index))
+        )
+
+    def generateStream(self, payload: list, repeat: bool = False, on_entry=None):
+        """Yield the chunks of every shard of every payload entry, over and
+        over if repeat, calling ``on_entry(payload_index)`` before the chunks
+        of every entry"""
+        while True:
+            for payload_index, conf in enumerate(payload):
+                if on_entry is not None:
+                    on_entry(payload_index)
+                for shard_index, shard in enumerate(self.shards(conf)):
+                    yield from self.generateShard(shard, payload_index, shard_index)
+            if not repeat:
+                return
+
+    def buildPipeline(self, sink) -> Pipeline:
+        queue_size = DEFAULT_QUEUE_SIZE if self.pipeline is True else self.pipeline
+        return Pipeline(sink, queue_size)
+
+    def buildRollup(self):
+        """Rollup of the records, None if the use case has none"""
+        if not self.rollup:
+            return None
+        from project.utils.Rollup import build_rollup
+
+        return build_rollup(self.rollup, self)
+
+    def buildDatasetProfile(self, output: str):
+        """Profile of the records written to ``output``, None if the use case
+        has none"""
+        if not self.dataset_profile:
+            return None
+        from project.utils.DatasetProfile import build_dataset_profile
+
+        return build_dataset_profile(self.dataset_profile, self, output)
+
+    def buildSink(self, output: str, sink=None):
+        """Sink of the records, ``sink`` or else the one of the use case"""
+        sink = SinkFactory.SinkBuild(sink or self.sink, output, self.encoder)
+        if self.probe:
+            from project.sink.ProbeSink import ProbeSink
+
+            sink = ProbeSink(sink, self.probe if isinstance(self.probe, str) else None)
+            # Not on stdout, which may be the sink
+            print("{}: probe run {}".format(self.name, sink.run_id), file=sys.stderr)
+        return sink
+
+    def writeChunks(self, chunks, output: str, wrap_chunks=None) -> int:
+        """Write chunks to the sink, return the number of records written.
+
+        ``wrap_chunks(chunks, sink, pipeline)`` returns the chunks to write
+        in place of the rolled up and profiled ones, such as to time them,
+        ``pipeline`` being None without one"""
+        rollup = self.buildRollup()
+        profile = self.buildDatasetProfile(output)
+        with self.buildSink(output) as sink, rollup or contextlib.nullcontext(), (
+            profile or contextlib.nullcontext()
+        ):
+            if rollup is not None:
+                chunks = rollup.stream(chunks)
+            if profile is not None:
+                chunks = profile.stream(chunks)
+            # Empty chunks are only meant for the observers above
+            chunks = (chunk for chunk in chunks if len(chunk))
+            pipeline = self.buildPipeline(sink) if self.pipeline else None
+            if wrap_chunks is not None:
+                chunks = wrap_chunks(chunks, sink, pipeline)
+            if pipeline is not None:
+                pipeline.run(chunks)
+            else:
+                for chunk in chunks:
+                    sink.write(chunk)
+        return sink.records
+
+    def generateDataset(
+        self, payload: list, output: str, wrap_chunks=None, on_entry=None
+    ) -> int:
+        """Generate the dataset, return the number of records written; see
+        writeChunks and generateStream for the hooks"""
+        return self.writeChunks(
+            self.generateStream(payload, on_entry=on_entry), output, wrap_chunks
+        )
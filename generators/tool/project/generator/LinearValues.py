@@ -1,9 +1,17 @@
 from project.generator.GeneratorI import GeneratorI
-from project.utils.Utils import write_array_json_to_file, generate_linear_values
+from project.utils.Utils import iter_linear_values
 
 
 class LinearValues(GeneratorI):
-    def generateDataset(self, payload: dict, output: str) -> list:
-        for conf in payload:
-            data = generate_linear_values(**conf)
-            write_array_json_to_file(data, output)
+    dataset_profile_defaults = {
+        "group_by": ["corr_type"],
+        "correlations": [["x", "y"]],
+    }
+
+    def generateChunks(self, conf: dict, rng=None):
+        return iter_linear_values(
+            **conf,
+            chunk_size=self.chunk_size,
+            rng=rng,
+            start_time=self.start_time,
+        )
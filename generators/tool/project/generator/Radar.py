@@ -1,9 +1,37 @@
 from project.generator.GeneratorI import GeneratorI
-from project.utils.Utils import write_array_json_to_file, generate_random_radar_plots
+from project.utils.Columnar import TIMESTAMP_STR
+from project.utils.Utils import iter_random_radar_plots, split_count
 
 
 class Radar(GeneratorI):
-    def generateDataset(self, payload: dict, output: str) -> list:
-        for conf in payload:
-            data = generate_random_radar_plots(**conf)
-            write_array_json_to_file(data, output)
+    timestamp_field = "@timestamp"
+    timestamp_style = TIMESTAMP_STR
+    geo_fields = (
+        ("coord.location.lon", "coord.location.lat", "coord.country"),
+        ("radar.location.lon", "radar.location.lat", "radar.country"),
+    )
+
+    def generateChunks(self, conf: dict, rng=None):
+        return iter_random_radar_plots(
+            **conf,
+            chunk_size=self.chunk_size,
+            rng=rng,
+            start_time=self.start_time,
+        )
+
+    def shards(self, conf: dict) -> list:
+        radar_by_shard = max(1, self.shard_size // max(1, conf["sample_size_by_radar"]))
+        shards = []
+        first_radar = 0
+        for radar_number in split_count(conf["radar_number"], radar_by_shard):
+            shard = {**conf, "radar_number": radar_number}
+            # Every shard keeps the sites of its own radars
+            if conf.get("sites"):
+                sites = conf["sites"]
+                shard["sites"] = [
+                    sites[radar % len(sites)]
+                    for radar in range(first_radar, first_radar + radar_number)
+                ]
+            shards.append(shard)
+            first_radar += radar_number
+        return shards
@@ -1,9 +1,23 @@
 from project.generator.GeneratorI import GeneratorI
-from project.utils.Utils import write_array_json_to_file, generate_random_tool_user
+from project.utils.Utils import iter_random_tool_user
 
 
 class Usage(GeneratorI):
-    def generateDataset(self, payload: dict, output: str) -> list:
-        for conf in payload:
-            data = generate_random_tool_user(**conf)
-            write_array_json_to_file(data, output)
+    rollup_defaults = {
+        "group_by": ["user.tool"],
+        "histograms": ["http.response.code"],
+        "quantiles": ["http.response.duration"],
+    }
+    # New users of an iteration come in one block, without requests and
+    # empty without any, and their number follows a Poisson distribution
+    dataset_profile_defaults = {
+        "counts": {"new_users": {"where": "user.id", "without": "user.tool"}},
+    }
+
+    def generateChunks(self, conf: dict, rng=None):
+        return iter_random_tool_user(
+            **conf,
+            chunk_size=self.chunk_size,
+            rng=rng,
+            start_time=self.start_time,
+        )
@@ -0,0 +1,355 @@
+import datetime
+import json
+import re
+import selectors
+import socket
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from project.utils.Columnar import parse_timestamps
+from project.utils.Rollup import QuantileSketch, get_path
+
+# Probes as the json encoders write them, with or without spaces
+PROBE_PATTERN = re.compile(
+    rb'"probe":\s*\{\s*"run_id":\s*"([^"]*)",\s*"seq":\s*(\d+),\s*"emit_us":\s*(\d+)\s*\}'
+)
+READ_SIZE = 1 << 22
+POLL_S = 0.1
+DEFAULT_IDLE_S = 5.0
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+# Gap ranges listed in the report, the others are only counted
+MAX_GAP_RANGES = 100
+# Bits of the sequence bitmap unpacked at once when looking for gaps
+GAP_BLOCK_SIZE = 1 << 23
+
+
+class SequenceBitmap:
+    """Sequence numbers seen so far, one bit each"""
+
+    def __init__(self):
+        self.bits = np.zeros(1 << 12, dtype=np.uint8)
+        self.unique = 0
+        self.max_seq = -1
+
+    def add(self, sequences: np.ndarray) -> int:
+        """Mark the sequence numbers as seen, return how many were already"""
+        values, counts = np.unique(sequences, return_counts=True)
+        duplicates = int(counts.sum()) - len(values)
+        if len(values) == 0:
+            return duplicates
+        needed = int(values[-1] >> 3) + 1
+        if needed > len(self.bits):
+            bits = np.zeros(max(needed, 2 * len(self.bits)), dtype=np.uint8)
+            bits[: len(self.bits)] = self.bits
+            self.bits = bits
+        positions = values >> 3
+        masks = np.left_shift(1, values & 7).astype(np.uint8)
+        seen = (self.bits[positions] & masks) != 0
+        np.bitwise_or.at(self.bits, positions, masks)
+        self.unique += len(values) - int(seen.sum())
+        self.max_seq = max(self.max_seq, int(values[-1]))
+        return duplicates + int(seen.sum())
+
+    def gaps(self, end: int) -> tuple:
+        """Number of the sequence numbers missing under ``end``, number of
+        the gaps they make and the first MAX_GAP_RANGES [start, end) of them"""
+        missing = 0
+        count = 0
+        ranges = []
+        previous = -2
+        for start in range(0, end, GAP_BLOCK_SIZE):
+            stop = min(start + GAP_BLOCK_SIZE, end)
+            bits = np.zeros(stop - start, dtype=np.uint8)
+            unpacked = np.unpackbits(
+                self.bits[start >> 3 : (stop + 7) >> 3], bitorder="little"
+            )[: stop - start]
+            bits[: len(unpacked)] = unpacked
+            holes = np.flatnonzero(bits == 0) + start
+            if len(holes) == 0:
+                continue
+            missing += len(holes)
+            starts = np.flatnonzero(np.diff(holes, prepend=previous) != 1)
+            bounds = np.append(starts, len(holes))
+            if bounds[0] != 0 and ranges and ranges[-1][1] == previous + 1:
+                # The last gap of the previous block goes on
+                ranges[-1][1] = int(holes[bounds[0] - 1]) + 1
+            count += len(starts)
+            for first, following in zip(bounds[:-1], bounds[1:]):
+                if len(ranges) == MAX_GAP_RANGES:
+                    break
+                ranges.append([int(holes[first]), int(holes[following - 1]) + 1])
+            previous = int(holes[-1])
+        return missing, count, ranges
+
+
+class RunStats:
+    """What arrived of the records of one probe run"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.sequences = SequenceBitmap()
+        self.received = 0
+        self.duplicates = 0
+        # Latencies in milliseconds, exact extremes and a sketch for the rest
+        self.latency = QuantileSketch()
+        self.latency_min = np.inf
+        self.latency_max = -np.inf
+        self.latency_total = 0.0
+        # Records arrived in every second from the first arrival on
+        self.first_arrival_s = None
+        self.arrivals = np.zeros(0, dtype=np.int64)
+
+    def add(self, sequences: np.ndarray, emit_us: np.ndarray, arrival_us):
+        self.received += len(sequences)
+        self.duplicates += self.sequences.add(sequences)
+        latencies = (arrival_us - emit_us) / 1000.0
+        self.latency.add(latencies)
+        self.latency_min = min(self.latency_min, float(latencies.min()))
+        self.latency_max = max(self.latency_max, float(latencies.max()))
+        self.latency_total += float(latencies.sum())
+
+        seconds = np.broadcast_to(arrival_us // 1000000, sequences.shape)
+        if self.first_arrival_s is None:
+            self.first_arrival_s = int(seconds.min())
+        if seconds.min() < self.first_arrival_s:
+            shift = self.first_arrival_s - int(seconds.min())
+            self.arrivals = np.concatenate((np.zeros(shift, np.int64), self.arrivals))
+            self.first_arrival_s -= shift
+        counts = np.bincount(seconds - self.first_arrival_s)
+        if len(counts) > len(self.arrivals):
+            self.arrivals = np.concatenate(
+                (self.arrivals, np.zeros(len(counts) - len(self.arrivals), np.int64))
+            )
+        self.arrivals[: len(counts)] += counts
+
+    def report(self, expected: int = None) -> dict:
+        expected = self.sequences.max_seq + 1 if expected is None else expected
+        missing, gap_count, gaps = self.sequences.gaps(expected)
+        unique = self.sequences.unique
+        percentiles = self.latency.quantiles([p / 100 for p in LATENCY_PERCENTILES])
+        active = np.flatnonzero(self.arrivals)
+        seconds = int(active[-1] - active[0]) + 1 if len(active) else 0
+        return {
+            "run_id": self.run_id,
+            "expected": expected,
+            "received": self.received,
+            "unique": unique,
+            "duplicates": self.duplicates,
+            "missing": missing,
+            "loss_ratio": missing / expected if expected else 0.0,
+            "gap_count": gap_count,
+            "gaps": gaps,
+            "latency_ms": {
+                "min": self.latency_min if self.received else None,
+                "mean": self.latency_total / self.received if self.received else None,
+                **{
+                    "p{:g}".format(percentile): (
+                        min(max(value, self.latency_min), self.latency_max)
+                        if value is not None
+                        else None
+                    )
+                    for percentile, value in zip(LATENCY_PERCENTILES, percentiles)
+                },
+                "max": self.latency_max if self.received else None,
+            },
+            "throughput": {
+                "first_arrival": (
+                    datetime.datetime.fromtimestamp(
+                        self.first_arrival_s + int(active[0]), datetime.timezone.utc
+                    ).isoformat()
+                    if len(active)
+                    else None
+                ),
+                "seconds": seconds,
+                "mean_per_s": int(self.arrivals.sum()) / seconds if seconds else 0.0,
+                "max_per_s": int(self.arrivals.max()) if len(active) else 0,
+                "per_s": (
+                    self.arrivals[active[0] : active[-1] + 1].tolist()
+                    if len(active)
+                    else []
+                ),
+            },
+        }
+
+
+class ProbeCollector:
+    """Read back the probes of records wherever they arrived and measure the
+    latency, throughput and loss of every run.
+
+    Records are fed as blocks of json lines. Probes are picked out of them
+    with a regular expression rather than by parsing the records, sequence
+    numbers are tracked in a bitmap and latencies in a QuantileSketch, so
+    millions of records take a few megabytes. Records arrive when they are
+    fed, or at the time of their ``arrival_field`` (a timestamp, or seconds
+    since the epoch), e.g. the ingest time set by the pipeline, in which
+    case every record is parsed.
+    """
+
+    def __init__(self, arrival_field: str = None, run_id: str = None, clock=time.time):
+        self.arrival_field = arrival_field
+        self.run_id = run_id
+        self.clock = clock
+        self.runs = {}
+        self.lines = 0
+        self.unprobed = 0
+
+    def feed(self, data: bytes):
+        """Feed whole json lines"""
+        if not data:
+            return
+        lines = data.count(b"\n") + (not data.endswith(b"\n"))
+        self.lines += lines
+        if self.arrival_field is not None:
+            return self.feed_records(data.splitlines())
+        arrival_us = int(self.clock() * 1000000)
+        probes = PROBE_PATTERN.findall(data)
+        self.unprobed += lines - len(probes)
+        if not probes:
+            return
+        run_ids, sequences, emit_us = zip(*probes)
+        self.add(
+            np.array(run_ids),
+            np.array(sequences).astype(np.int64),
+            np.array(emit_us).astype(np.int64),
+            arrival_us,
+        )
+
+    def feed_records(self, lines: list):
+        run_ids = []
+        sequences = []
+        emit_us = []
+        arrivals = []
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            probe = record.get("probe")
+            arrival = get_path(record, self.arrival_field)
+            if not isinstance(probe, dict) or arrival is None:
+                self.unprobed += 1
+                continue
+            run_ids.append(probe["run_id"].encode("utf-8"))
+            sequences.append(probe["seq"])
+            emit_us.append(probe["emit_us"])
+            arrivals.append(arrival)
+        if not run_ids:
+            return
+        if isinstance(arrivals[0], str):
+            arrival_us = parse_timestamps(arrivals).astype(np.int64)
+        else:
+            arrival_us = (np.array(arrivals, dtype=np.float64) * 1000000).astype(
+                np.int64
+            )
+        self.add(
+            np.array(run_ids),
+            np.array(sequences, dtype=np.int64),
+            np.array(emit_us, dtype=np.int64),
+            arrival_us,
+        )
+
+    def add(self, run_ids, sequences, emit_us, arrival_us):
+        arrival_us = np.broadcast_to(arrival_us, sequences.shape)
+        for run_id in np.unique(run_ids):
+            name = run_id.decode("utf-8")
+            if self.run_id is not None and name != self.run_id:
+                continue
+            selected = run_ids == run_id
+            if name not in self.runs:
+                self.runs[name] = RunStats(name)
+            self.runs[name].add(
+                sequences[selected], emit_us[selected], arrival_us[selected]
+            )
+
+    def report(self, expected: int = None) -> dict:
+        return {
+            "lines": self.lines,
+            "unprobed": self.unprobed,
+            "runs": {name: run.report(expected) for name, run in self.runs.items()},
+        }
+
+
+def read_stream(
+    file,
+    collector: ProbeCollector,
+    follow: bool = False,
+    idle_s: float = DEFAULT_IDLE_S,
+):
+    """Feed a binary stream by blocks of whole lines. When following, wait
+    for more until nothing came for ``idle_s``"""
+    rest = b""
+    idle_since = time.monotonic()
+    while True:
+        data = file.read(READ_SIZE)
+        if not data:
+            if not follow or time.monotonic() - idle_since >= idle_s:
+                break
+            time.sleep(POLL_S)
+            continue
+        idle_since = time.monotonic()
+        data = rest + data
+        end = data.rfind(b"\n") + 1
+        collector.feed(data[:end])
+        rest = data[end:]
+    collector.feed(rest)
+
+
+def listen(
+    url: str,
+    collector: ProbeCollector,
+    idle_s: float = DEFAULT_IDLE_S,
+    duration_s: float = None,
+):
+    """Receive json lines on tcp://host:port or udp://host:port, as a mock of
+    the endpoint the records are sent to, until nothing came for ``idle_s``
+    since the first records, or for ``duration_s``"""
+    address = urlparse(url)
+    if address.scheme not in ("tcp", "udp"):
+        raise Exception("Unknown endpoint {}".format(url))
+    kind = socket.SOCK_STREAM if address.scheme == "tcp" else socket.SOCK_DGRAM
+    server = socket.socket(socket.AF_INET, kind)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((address.hostname, address.port))
+    if address.scheme == "tcp":
+        server.listen()
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    rests = {}
+    start = time.monotonic()
+    last_data = None
+    try:
+        while True:
+            now = time.monotonic()
+            if duration_s is not None and now - start >= duration_s:
+                break
+            if last_data is not None and now - last_data >= idle_s:
+                break
+            for key, _ in selector.select(POLL_S):
+                connection = key.fileobj
+                if address.scheme == "udp":
+                    # Datagrams hold whole lines
+                    collector.feed(connection.recv(1 << 16))
+                    last_data = time.monotonic()
+                elif connection is server:
+                    client, _ = server.accept()
+                    selector.register(client, selectors.EVENT_READ)
+                    rests[client] = b""
+                else:
+                    data = connection.recv(READ_SIZE)
+                    last_data = time.monotonic()
+                    if not data:
+                        collector.feed(rests.pop(connection))
+                        selector.unregister(connection)
+                        connection.close()
+                        continue
+                    data = rests[connection] + data
+                    end = data.rfind(b"\n") + 1
+                    collector.feed(data[:end])
+                    rests[connection] = data[end:]
+    finally:
+        for connection, rest in rests.items():
+            collector.feed(rest)
+            connection.close()
+        selector.close()
+        server.close()
@@ -0,0 +1,118 @@
+import json
+import sys
+from optparse import OptionParser
+
+from project.probe.Collector import DEFAULT_IDLE_S, ProbeCollector, listen, read_stream
+
+parser = OptionParser(usage="%prog [options] [file ...]")
+parser.add_option(
+    "-l",
+    "--listen",
+    action="store",
+    type="string",
+    dest="listen",
+    help="Receive the records on tcp://host:port or udp://host:port",
+)
+parser.add_option(
+    "-f",
+    "--follow",
+    action="store_true",
+    dest="follow",
+    default=False,
+    help="Keep reading the files as they grow",
+)
+parser.add_option(
+    "-i",
+    "--idle-s",
+    action="store",
+    type="float",
+    dest="idle_s",
+    default=DEFAULT_IDLE_S,
+    help="Stop following or listening after this many seconds without records",
+)
+parser.add_option(
+    "-d",
+    "--duration-s",
+    action="store",
+    type="float",
+    dest="duration_s",
+    help="Stop listening after this many seconds",
+)
+parser.add_option(
+    "-e",
+    "--expected",
+    action="store",
+    type="int",
+    dest="expected",
+    help="Records sent by the run, to count the lost last ones",
+)
+parser.add_option(
+    "-a",
+    "--arrival-field",
+    action="store",
+    type="string",
+    dest="arrival_field",
+    help="Field holding the arrival time of the records, "
+    "when they are read rather than received",
+)
+parser.add_option(
+    "-r",
+    "--run-id",
+    action="store",
+    type="string",
+    dest="run_id",
+    help="Only measure this run",
+)
+parser.add_option(
+    "-o",
+    "--output",
+    action="store",
+    type="string",
+    dest="output",
+    help="Path of the JSON report",
+)
+
+options, args = parser.parse_args()
+if bool(options.listen) == bool(args):
+    parser.error("give either files to read or an endpoint to listen on")
+
+collector = ProbeCollector(options.arrival_field, options.run_id)
+if options.listen:
+    listen(options.listen, collector, options.idle_s, options.duration_s)
+for path in args:
+    if path == "-":
+        read_stream(sys.stdin.buffer, collector, options.follow, options.idle_s)
+        continue
+    with open(path, "rb") as file:
+        read_stream(file, collector, options.follow, options.idle_s)
+
+report = collector.report(options.expected)
+if options.output:
+    with open(options.output, "w") as file:
+        file.write(json.dumps(report, indent=4))
+
+for run in report["runs"].values():
+    latency = run["latency_ms"]
+    print(
+        "{}: {} received, {} duplicates, {} missing in {} gaps ({:.4%} lost)".format(
+            run["run_id"],
+            run["received"],
+            run["duplicates"],
+            run["missing"],
+            run["gap_count"],
+            run["loss_ratio"],
+        )
+    )
+    print(
+        "{}: latency ms min {:.3f} p50 {:.3f} p99 {:.3f} max {:.3f}, "
+        "{:.1f} records/s over {} s".format(
+            run["run_id"],
+            latency["min"],
+            latency["p50"],
+            latency["p99"],
+            latency["max"],
+            run["throughput"]["mean_per_s"],
+            run["throughput"]["seconds"],
+        )
+    )
+exit(1 if any(run["missing"] for run in report["runs"].values()) else 0)
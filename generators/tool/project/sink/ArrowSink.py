@@ -0,0 +1,24 @@
+from project.sink.ColumnarSink import ColumnarSink
+from project.utils.Serializer import DEFAULT_ENCODER
+
+
+class ArrowSink(ColumnarSink):
+    """Arrow IPC files partitioned by day, memory mappable by the readers"""
+
+    extension = "arrow"
+
+    def __init__(
+        self,
+        directory: str,
+        partition_field: str = None,
+        compression: str = None,
+        encoder: str = DEFAULT_ENCODER,
+    ):
+        super().__init__(directory, partition_field, encoder)
+        self.compression = compression
+
+    def open_writer(self, path: str, schema):
+        import pyarrow as pa
+
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        return pa.ipc.new_file(path, schema, options=options)
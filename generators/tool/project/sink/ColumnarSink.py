@@ -0,0 +1,127 @@
+import os
+import uuid
+
+import numpy as np
+
+from project.sink.SinkI import SinkI
+from project.utils.Columnar import RecordBlock, nest_fields
+from project.utils.Serializer import DEFAULT_ENCODER
+
+# Fields holding the timestamp of the records, the first one found is used
+PARTITION_FIELDS = ("@timestamp", "event_timestamp")
+
+
+def block_to_table(block: RecordBlock):
+    """Arrow table of a block, dotted fields becoming nested structs as in
+    the json records"""
+    import pyarrow as pa
+
+    fields = tuple(block.columns)
+
+    def build(node):
+        names = []
+        arrays = []
+        for name, value in node.items():
+            if isinstance(value, dict):
+                children_names, children = build(value)
+                arrays.append(pa.StructArray.from_arrays(children, children_names))
+            else:
+                arrays.append(pa.array(block.column(fields[value])))
+            names.append(name)
+        return names, arrays
+
+    names, arrays = build(nest_fields(fields))
+    return pa.Table.from_arrays(arrays, names)
+
+
+def chunk_to_table(chunk):
+    import pyarrow as pa
+
+    if isinstance(chunk, RecordBlock):
+        return block_to_table(chunk)
+    return pa.Table.from_pylist(chunk)
+
+
+def partition_days(table, field: str) -> np.ndarray:
+    """yyyy.MM.dd day of every record, from its timestamp string"""
+    if field is None:
+        return np.full(table.num_rows, "", dtype="U10")
+    timestamps = table.column(field).to_numpy(zero_copy_only=False)
+    return np.char.replace(np.asarray(timestamps, dtype="U10"), "-", ".")
+
+
+class ColumnarSink(SinkI):
+    """Write the records as columnar files partitioned by day, in
+    ``directory``/day=yyyy.MM.dd/, as the daily indices are.
+
+    Every sink writes files of its own, so several of them, e.g. the shards
+    of a parallel run, can write to the same directory.
+    """
+
+    extension = None
+
+    def __init__(
+        self,
+        directory: str,
+        partition_field: str = None,
+        encoder: str = DEFAULT_ENCODER,
+    ):
+        super().__init__(encoder)
+        self.directory = directory
+        self.partition_field = partition_field
+        self.prefix = uuid.uuid4().hex[:12]
+        self.writers = {}
+        self.paths = []
+
+    def open_writer(self, path: str, schema):
+        raise NotImplementedError
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        self.bytes = sum(os.path.getsize(path) for path in self.paths)
+
+    def write_encoded(self, data: bytes, records: int):
+        raise NotImplementedError("{} writes chunks, not json".format(type(self)))
+
+    def writer(self, day: str, schema):
+        # One file per day and per schema, as blocks of a generator may hold
+        # different fields
+        key = (day, schema.to_string())
+        if key not in self.writers:
+            directory = self.directory
+            if day:
+                directory = os.path.join(directory, "day={}".format(day))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(
+                directory,
+                "part-{}-{:05d}.{}".format(
+                    self.prefix, len(self.paths), self.extension
+                ),
+            )
+            self.paths.append(path)
+            self.writers[key] = self.open_writer(path, schema)
+        return self.writers[key]
+
+    def encode(self, chunk):
+        return chunk_to_table(chunk)
+
+    def write_encoded_chunk(self, table, records: int):
+        import pyarrow as pa
+
+        if not records:
+            return
+        if self.partition_field is None:
+            self.partition_field = next(
+                (field for field in PARTITION_FIELDS if field in table.column_names),
+                None,
+            )
+        days = partition_days(table, self.partition_field)
+        unique_days = np.unique(days)
+        for day in unique_days:
+            part = table
+            if len(unique_days) > 1:
+                part = table.filter(pa.array(days == day))
+            self.writer(str(day), part.schema).write_table(part)
+        self.records += records
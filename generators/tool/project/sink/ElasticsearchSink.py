@@ -0,0 +1,127 @@
+import queue
+import threading
+
+from project.sink.SinkI import SinkI
+from project.utils.Serializer import DEFAULT_ENCODER
+
+# Seconds a blocked producer waits before checking the bulk thread again
+PUT_TIMEOUT_S = 0.1
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(nodes, port, login: str = "", password: str = "", maxsize: int = 10):
+    """Elasticsearch client shared by every sink of the process for the same
+    cluster and credentials, keeping its connection pool alive between bulks
+    """
+    from elasticsearch import Elasticsearch
+
+    if isinstance(nodes, str):
+        nodes = [nodes]
+    key = (tuple(nodes), int(port), login, password)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = Elasticsearch(
+                hosts=[{"host": node, "port": int(port)} for node in nodes],
+                http_auth=(login, password),
+                maxsize=maxsize,
+            )
+        return _clients[key]
+
+
+class ElasticsearchSink(SinkI):
+    """Index the records with parallel bulk requests.
+
+    Written lines are queued to a single parallel_bulk run fed by a
+    streaming action generator, so bulk requests stay full and concurrent
+    across chunks. The queue is bounded to apply backpressure on generation.
+    """
+
+    def __init__(
+        self,
+        index: str,
+        nodes=("localhost",),
+        port: int = 9200,
+        login: str = "",
+        password: str = "",
+        chunk_size: int = 500,
+        thread_count: int = 4,
+        queue_size: int = 8,
+        encoder: str = DEFAULT_ENCODER,
+        client=None,
+    ):
+        super().__init__(encoder)
+        self.index = index
+        self.chunk_size = chunk_size
+        self.thread_count = thread_count
+        self.client = client or get_client(
+            nodes, port, login, password, maxsize=thread_count
+        )
+        self.queue = queue.Queue(queue_size)
+        self.thread = None
+        self.error = None
+        # The bulk thread took the end of the records off the queue
+        self.finished = False
+        self.indexed = 0
+
+    def actions(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                self.finished = True
+                return
+            yield from data.decode("utf-8").splitlines()
+
+    def bulk(self):
+        from elasticsearch import helpers
+
+        try:
+            for ok, item in helpers.parallel_bulk(
+                self.client,
+                self.actions(),
+                thread_count=self.thread_count,
+                chunk_size=self.chunk_size,
+                index=self.index,
+                request_timeout=60,
+            ):
+                self.indexed += 1
+        except Exception as error:
+            self.error = error
+            # Free the queued records, nobody takes them anymore; the
+            # producer stops waiting on the queue once the error is set
+            while not self.finished:
+                try:
+                    self.finished = self.queue.get_nowait() is None
+                except queue.Empty:
+                    break
+
+    def open(self):
+        self.thread = threading.Thread(target=self.bulk, daemon=True)
+        self.thread.start()
+
+    def raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def put(self, data):
+        """Queue data for the bulk thread, unless it failed"""
+        while self.error is None:
+            try:
+                self.queue.put(data, timeout=PUT_TIMEOUT_S)
+                return
+            except queue.Full:
+                pass
+
+    def close(self):
+        if self.thread is not None:
+            self.put(None)
+            self.thread.join()
+            self.thread = None
+        self.raise_error()
+
+    def write_encoded(self, data: bytes, records: int):
+        self.raise_error()
+        if data:
+            self.put(data)
+            self.raise_error()
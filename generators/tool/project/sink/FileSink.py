@@ -0,0 +1,22 @@
+from project.sink.SinkI import SinkI
+from project.utils.Serializer import DEFAULT_ENCODER, JsonLinesWriter
+
+
+class FileSink(SinkI):
+    """Append the records to the output_logs file of the use case"""
+
+    def __init__(self, output_path: str, encoder: str = DEFAULT_ENCODER):
+        super().__init__(encoder)
+        self.writer = JsonLinesWriter(output_path, encoder)
+
+    def open(self):
+        self.writer.open()
+
+    def close(self):
+        self.writer.close()
+
+    def flush(self):
+        self.writer.flush()
+
+    def write_encoded(self, data: bytes, records: int):
+        self.writer.write_encoded(data, records)
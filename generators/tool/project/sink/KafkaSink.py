@@ -0,0 +1,51 @@
+from project.sink.SinkI import SinkI
+from project.utils.Serializer import DEFAULT_ENCODER
+
+
+class KafkaSink(SinkI):
+    """Produce one Kafka message per record, batched and compressed by the
+    producer, as filebeat would in front of the kafka_input of the channels
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        bootstrap_servers="localhost:9092",
+        compression_type: str = "gzip",
+        batch_size: int = 1 << 20,
+        linger_ms: int = 50,
+        acks=1,
+        encoder: str = DEFAULT_ENCODER,
+        producer_factory=None,
+    ):
+        super().__init__(encoder)
+        self.topic = topic
+        self.settings = {
+            "bootstrap_servers": bootstrap_servers,
+            "compression_type": compression_type,
+            "batch_size": batch_size,
+            "linger_ms": linger_ms,
+            "acks": acks,
+        }
+        self.producer_factory = producer_factory
+        self.producer = None
+
+    def open(self):
+        if self.producer_factory is None:
+            from kafka import KafkaProducer
+
+            self.producer_factory = KafkaProducer
+        self.producer = self.producer_factory(**self.settings)
+
+    def close(self):
+        if self.producer is not None:
+            self.producer.flush()
+            self.producer.close()
+            self.producer = None
+
+    def flush(self):
+        self.producer.flush()
+
+    def write_encoded(self, data: bytes, records: int):
+        for line in data.splitlines():
+            self.producer.send(self.topic, value=line)
@@ -0,0 +1,23 @@
+from project.sink.ColumnarSink import ColumnarSink
+from project.utils.Serializer import DEFAULT_ENCODER
+
+
+class ParquetSink(ColumnarSink):
+    """Parquet files partitioned by day, read by Spark without json parsing"""
+
+    extension = "parquet"
+
+    def __init__(
+        self,
+        directory: str,
+        partition_field: str = None,
+        compression: str = "snappy",
+        encoder: str = DEFAULT_ENCODER,
+    ):
+        super().__init__(directory, partition_field, encoder)
+        self.compression = compression
+
+    def open_writer(self, path: str, schema):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema, compression=self.compression)
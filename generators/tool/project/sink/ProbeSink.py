@@ -0,0 +1,64 @@
+import time
+import uuid
+
+import numpy as np
+
+from project.sink.SinkI import SinkI
+from project.utils.Columnar import RecordBlock
+
+PROBE_FIELD = "probe"
+
+
+class ProbeSink(SinkI):
+    """Stamp every record with a probe before writing it to ``sink``.
+
+    The probe holds the id of the run, the sequence number of the record in
+    the run, from 0, and the wall clock in microseconds since the epoch when
+    its chunk was encoded, just before it is written: project.probe reads
+    them back wherever the records arrive to measure latency and loss.
+    """
+
+    def __init__(self, sink: SinkI, run_id: str = None, clock=time.time):
+        self.sink = sink
+        self.run_id = run_id or uuid.uuid4().hex
+        self.clock = clock
+        self.sequence = 0
+        self.records = 0
+        self.bytes = 0
+
+    def open(self):
+        self.sink.open()
+
+    def close(self):
+        self.sink.close()
+
+    def flush(self):
+        self.sink.flush()
+
+    def stamp(self, chunk):
+        size = len(chunk)
+        sequence = np.arange(self.sequence, self.sequence + size)
+        self.sequence += size
+        emit_us = int(self.clock() * 1000000)
+        if isinstance(chunk, RecordBlock):
+            block = RecordBlock(dict(chunk.columns), size)
+            block.insert_column(PROBE_FIELD + ".run_id", self.run_id)
+            block.insert_column(PROBE_FIELD + ".seq", sequence)
+            block.insert_column(PROBE_FIELD + ".emit_us", emit_us)
+            return block
+        return [
+            {
+                **record,
+                PROBE_FIELD: {"run_id": self.run_id, "seq": seq, "emit_us": emit_us},
+            }
+            for record, seq in zip(chunk, sequence.tolist())
+        ]
+
+    def encode(self, chunk):
+        return self.sink.encode(self.stamp(chunk))
+
+    def write_encoded_chunk(self, data, records: int):
+        written = self.sink.bytes
+        self.sink.write_encoded_chunk(data, records)
+        self.records += records
+        self.bytes += self.sink.bytes - written
@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from project.sink.SinkI import SinkI
+from project.utils.Compression import BackgroundCompressor, resolve_compression
+from project.utils.Serializer import DEFAULT_BUFFER_SIZE, DEFAULT_ENCODER
+
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class RotatingFileSink(SinkI):
+    """Write the records to output_logs, rolled into numbered segments.
+
+    The segment being written is always output_logs, so filebeat keeps
+    tailing the same path. Once it holds ``max_records`` records, reaches
+    ``max_bytes`` bytes (checked between chunks) or is ``max_age_s`` old, it
+    is renamed to radar_data-00001.log, radar_data-00002.log..., then
+    compressed on a background thread if ``compression`` is gzip or zstd.
+    Segments are listed in output_logs.manifest.json with their first record
+    and record count.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_records: int = None,
+        max_age_s: float = None,
+        compression: str = None,
+        encoder: str = DEFAULT_ENCODER,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        clock=time.monotonic,
+    ):
+        super().__init__(encoder)
+        self.output_path = output_path
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.max_age_s = max_age_s
+        self.compression = resolve_compression(compression)
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self.manifest_path = output_path + ".manifest.json"
+        self.manifest_lock = threading.Lock()
+        self.segments = []
+        self.file = None
+        self.compressor = None
+
+    def open(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as file:
+                self.segments = json.loads(file.read())["segments"]
+        if self.compression is not None:
+            self.compressor = BackgroundCompressor(self.compression, self.compressed)
+        self.open_segment()
+
+    def open_segment(self):
+        self.file = open(self.output_path, "ab", buffering=self.buffer_size)
+        self.segment_records = 0
+        self.segment_bytes = self.file.tell()
+        self.segment_opened = self.clock()
+
+    def close(self):
+        if self.file is not None:
+            self.roll(reopen=False)
+        if self.compressor is not None:
+            self.compressor.close()
+            self.compressor = None
+
+    def flush(self):
+        self.file.flush()
+
+    def should_roll(self) -> bool:
+        if self.segment_bytes == 0:
+            return False
+        return (
+            (self.max_bytes is not None and self.segment_bytes >= self.max_bytes)
+            or (
+                self.max_records is not None
+                and self.segment_records >= self.max_records
+            )
+            or (
+                self.max_age_s is not None
+                and self.clock() - self.segment_opened >= self.max_age_s
+            )
+        )
+
+    def roll(self, reopen: bool = True):
+        """Close the current segment and move it to the next numbered path"""
+        self.file.close()
+        self.file = None
+        if self.segment_bytes:
+            base, extension = os.path.splitext(self.output_path)
+            with self.manifest_lock:
+                number = len(self.segments) + 1
+                path = "{}-{:05d}{}".format(base, number, extension)
+                os.replace(self.output_path, path)
+                first_record = sum(segment["records"] for segment in self.segments)
+                self.segments.append(
+                    {
+                        "path": path,
+                        "first_record": first_record,
+                        "records": self.segment_records,
+                        "bytes": self.segment_bytes,
+                        "compressed_path": None,
+                        "compressed_bytes": None,
+                    }
+                )
+                self.write_manifest()
+            if self.compressor is not None:
+                self.compressor.submit(path)
+        if reopen:
+            self.open_segment()
+
+    def compressed(self, path: str, compressed_path: str):
+        with self.manifest_lock:
+            for segment in self.segments:
+                if segment["path"] == path:
+                    segment["compressed_path"] = compressed_path
+                    segment["compressed_bytes"] = os.path.getsize(compressed_path)
+            self.write_manifest()
+
+    def write_manifest(self):
+        temporary = self.manifest_path + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(json.dumps({"segments": self.segments}, indent=4))
+        os.replace(temporary, self.manifest_path)
+
+    def write_encoded(self, data: bytes, records: int):
+        self.file.write(data)
+        self.segment_records += records
+        self.segment_bytes += len(data)
+
+    def write_lines(self, data: bytes, records: int):
+        """Write json lines holding ``records`` records, rolling between lines
+        so that segments hold at most max_records records"""
+        view = memoryview(data)
+        newlines = None
+        position = 0
+        written = 0
+        while written < records:
+            if self.should_roll():
+                self.roll()
+            count = records - written
+            if self.max_records is not None:
+                count = min(count, self.max_records - self.segment_records)
+            end = len(data)
+            if count < records - written:
+                if newlines is None:
+                    newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+                end = int(newlines[written + count - 1]) + 1
+            self.write_encoded(view[position:end], count)
+            position = end
+            written += count
+        self.records += records
+        self.bytes += len(data)
+
+    def write_encoded_chunk(self, data: bytes, records: int):
+        self.write_lines(data, records)
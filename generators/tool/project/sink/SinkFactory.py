@@ -0,0 +1,73 @@
+import os
+from urllib.parse import urlparse
+
+from project.sink.FileSink import FileSink
+from project.sink.SinkI import SinkI
+from project.utils.Serializer import DEFAULT_ENCODER
+
+COLUMNAR_SINKS = ("parquet", "arrow")
+
+
+class SinkFactory:
+    @staticmethod
+    def SinkResolve(sink, output_path: str):
+        """Bind a parquet or arrow sink to the directory of ``output_path``,
+        /data/radar_data.log writing to /data/radar_data.parquet/"""
+        if isinstance(sink, str) and sink in COLUMNAR_SINKS:
+            sink = {"type": sink}
+        if isinstance(sink, dict) and sink.get("type") in COLUMNAR_SINKS:
+            if "directory" not in sink:
+                directory = "{}.{}".format(
+                    os.path.splitext(output_path)[0], sink["type"]
+                )
+                sink = {**sink, "directory": directory}
+        return sink
+
+    @staticmethod
+    def SinkBuild(sink, output_path: str, encoder: str = DEFAULT_ENCODER) -> SinkI:
+        """Sink from its description.
+
+        Either file, stdout, tcp://host:port or udp://host:port, or the
+        "sink" dict of a use case, such as {"type": "elasticsearch",
+        "index": ...}, {"type": "kafka", "topic": ...}, {"type":
+        "rotating", "max_bytes": ...} or {"type": "parquet", "directory":
+        ...}. parquet and arrow need pyarrow.
+        """
+        sink = SinkFactory.SinkResolve(sink, output_path)
+        if isinstance(sink, dict):
+            settings = dict(sink)
+            sink_type = settings.pop("type")
+            if sink_type == "elasticsearch":
+                from project.sink.ElasticsearchSink import ElasticsearchSink
+
+                return ElasticsearchSink(encoder=encoder, **settings)
+            if sink_type == "kafka":
+                from project.sink.KafkaSink import KafkaSink
+
+                return KafkaSink(encoder=encoder, **settings)
+            if sink_type == "rotating":
+                from project.sink.RotatingFileSink import RotatingFileSink
+
+                return RotatingFileSink(output_path, encoder=encoder, **settings)
+            if sink_type == "parquet":
+                from project.sink.ParquetSink import ParquetSink
+
+                return ParquetSink(encoder=encoder, **settings)
+            if sink_type == "arrow":
+                from project.sink.ArrowSink import ArrowSink
+
+                return ArrowSink(encoder=encoder, **settings)
+            return SinkFactory.SinkBuild(sink_type, output_path, encoder)
+
+        if sink == "file":
+            return FileSink(output_path, encoder)
+        if sink == "stdout":
+            from project.sink.StdoutSink import StdoutSink
+
+            return StdoutSink(encoder)
+        url = urlparse(sink)
+        if url.scheme in ("tcp", "udp"):
+            from project.sink.SocketSink import SocketSink
+
+            return SocketSink(url.scheme, url.hostname, url.port, encoder)
+        raise Exception("Unknown sink {}".format(sink))
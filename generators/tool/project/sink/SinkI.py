@@ -0,0 +1,43 @@
+from project.utils.Serializer import DEFAULT_ENCODER, ChunkEncoder
+
+
+class SinkI:
+    """Destination of the generated records, written chunk by chunk"""
+
+    def __init__(self, encoder: str = DEFAULT_ENCODER):
+        self.chunk_encoder = ChunkEncoder(encoder)
+        self.records = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def write_encoded(self, data: bytes, records: int):
+        """Send json lines holding ``records`` records"""
+        raise NotImplementedError
+
+    def encode(self, chunk):
+        """Encode a chunk for write_encoded_chunk, which a pipeline does on a
+        thread of its own"""
+        return self.chunk_encoder.encode(chunk)
+
+    def write_encoded_chunk(self, data, records: int):
+        self.write_encoded(data, records)
+        self.records += records
+        self.bytes += len(data)
+
+    def write(self, chunk):
+        self.write_encoded_chunk(self.encode(chunk), len(chunk))
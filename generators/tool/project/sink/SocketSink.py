@@ -0,0 +1,45 @@
+import socket
+
+from project.sink.SinkI import SinkI
+from project.utils.Serializer import DEFAULT_ENCODER
+
+MAX_DATAGRAM_SIZE = 65000
+
+
+class SocketSink(SinkI):
+    """Send the json lines to a tcp stream or as udp datagrams"""
+
+    def __init__(
+        self, protocol: str, host: str, port: int, encoder: str = DEFAULT_ENCODER
+    ):
+        super().__init__(encoder)
+        if protocol not in ("tcp", "udp"):
+            raise Exception("Unknown socket protocol {}".format(protocol))
+        self.protocol = protocol
+        self.address = (host, port)
+        self.socket = None
+
+    def open(self):
+        if self.protocol == "tcp":
+            self.socket = socket.create_connection(self.address)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def write_encoded(self, data: bytes, records: int):
+        if self.protocol == "tcp":
+            self.socket.sendall(data)
+            return
+        # Whole lines only, as many as fit in a datagram
+        datagram = b""
+        for line in data.splitlines(keepends=True):
+            if datagram and len(datagram) + len(line) > MAX_DATAGRAM_SIZE:
+                self.socket.sendto(datagram, self.address)
+                datagram = b""
+            datagram += line
+        if datagram:
+            self.socket.sendto(datagram, self.address)
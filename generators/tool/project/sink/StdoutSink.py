@@ -0,0 +1,11 @@
+import sys
+
+from project.sink.SinkI import SinkI
+
+
+class StdoutSink(SinkI):
+    def flush(self):
+        sys.stdout.buffer.flush()
+
+    def write_encoded(self, data: bytes, records: int):
+        sys.stdout.buffer.write(data)
@@ -1,11 +1,43 @@
 import unittest
 
+from project.test.moduleTest.benchmark_test import BenchmarkTest
+from project.test.moduleTest.cache_test import CacheTest
+from project.test.moduleTest.columnar_test import ColumnarTest
+from project.test.moduleTest.dataset_profile_test import DatasetProfileTest
+from project.test.moduleTest.live_test import LiveTest
+from project.test.moduleTest.metrics_test import MetricsTest
 from project.test.moduleTest.module_test import ModuleTest
+from project.test.moduleTest.parallel_test import ParallelTest
+from project.test.moduleTest.pipeline_test import PipelineTest
+from project.test.moduleTest.probe_test import ProbeTest
+from project.test.moduleTest.reader_test import ReaderTest
+from project.test.moduleTest.rollup_test import RollupTest
+from project.test.moduleTest.serializer_test import SerializerTest
+from project.test.moduleTest.sink_test import SinkTest
+from project.test.moduleTest.spatial_index_test import SpatialIndexTest
+from project.test.moduleTest.utils_test import UtilsTest
 
 
 def moduleTestBuilder():
     testChainsBuilder = unittest.TestSuite()
-    testsChainsObject = [ModuleTest("testMessage")]
+    testsChainsObject = [
+        ModuleTest("testMessage"),
+        unittest.defaultTestLoader.loadTestsFromTestCase(UtilsTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(ColumnarTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(SerializerTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(ParallelTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(LiveTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(SinkTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(BenchmarkTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(CacheTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(ReaderTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(MetricsTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(PipelineTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(SpatialIndexTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(RollupTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(ProbeTest),
+        unittest.defaultTestLoader.loadTestsFromTestCase(DatasetProfileTest),
+    ]
 
     for obj in testsChainsObject:
         testChainsBuilder.addTest(obj)
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from project.benchmark.Benchmark import (
+    COLD_START_KEY,
+    compare_to_baseline,
+    load_baseline,
+    run_case,
+    save_baseline,
+)
+
+TOOL_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+
+class BenchmarkTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def testRunCase(self):
+        output_path = os.path.join(self.directory.name, "radar.log")
+        result = run_case("Radar", "small", output_path)
+        self.assertEqual(result["records"], 10000)
+        self.assertGreater(result["records_per_s"], 0)
+        self.assertGreater(result["mb_per_s"], 0)
+
+    def testCompareToBaseline(self):
+        baseline_path = os.path.join(self.directory.name, "baseline.json")
+        report = {
+            "results": [
+                {"generator": "Radar", "scale": "small", "records_per_s": 1000},
+                {"generator": "Usage", "scale": "small", "records_per_s": 1000},
+            ]
+        }
+        save_baseline(report, baseline_path)
+        baseline = load_baseline(baseline_path)
+        self.assertEqual(baseline, {"Radar/small": 1000, "Usage/small": 1000})
+
+        report["results"][0]["records_per_s"] = 850
+        report["results"][1]["records_per_s"] = 750
+        regressions = compare_to_baseline(report, baseline, 0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("Usage/small"))
+        self.assertEqual(load_baseline(os.path.join(self.directory.name, "no")), {})
+
+    def testColdStartBudget(self):
+        baseline_path = os.path.join(self.directory.name, "baseline.json")
+        report = {"results": [], "cold_start": {"seconds": 0.2}}
+        save_baseline(report, baseline_path)
+        baseline = load_baseline(baseline_path)
+        self.assertEqual(baseline, {COLD_START_KEY: 0.2})
+        report["cold_start"]["seconds"] = 0.23
+        self.assertEqual(compare_to_baseline(report, baseline, 0.2), [])
+        report["cold_start"]["seconds"] = 0.25
+        self.assertEqual(len(compare_to_baseline(report, baseline, 0.2)), 1)
+
+    def testDisabledUseCasesAreNotImported(self):
+        configuration_path = os.path.join(self.directory.name, "config.json")
+        output_path = os.path.join(self.directory.name, "linear.log")
+        with open(configuration_path, "w") as file:
+            file.write(
+                json.dumps(
+                    {
+                        "use_case": {
+                            "linear": {
+                                "enabled": False,
+                                "payload": [],
+                                "output_logs": output_path,
+                                "module": "project.generator.LinearValues",
+                                "class": "LinearValues",
+                            }
+                        }
+                    }
+                )
+            )
+        # The entry point only imports numpy to generate something
+        code = (
+            "import sys, runpy; sys.argv = ['project', '-c', {!r}];"
+            "exit_code = 0\n"
+            "try:\n    runpy.run_module('project', run_name='__main__')\n"
+            "except SystemExit as error:\n    exit_code = error.code\n"
+            "print('numpy' in sys.modules, exit_code)".format(configuration_path)
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=TOOL_ROOT,
+        ).stdout
+        self.assertEqual("False 0", output.strip())
+        self.assertFalse(os.path.exists(output_path))
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.utils.Cache import DatasetCache, output_offset, use_case_key
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.use_case = {
+            "payload": [
+                {
+                    "schedule_time_s": 3600,
+                    "sample_number": 500,
+                    "x_start_value": 0,
+                    "y_start_value": 0,
+                    "x_end_value": 1000,
+                    "y_end_value": 100,
+                    "type": "project",
+                }
+            ],
+            "output_logs": os.path.join(self.directory.name, "linear.log"),
+            "module": "project.generator.LinearValues",
+            "class": "LinearValues",
+            "seed": 42,
+            "start_time": "2024-01-01T00:00:00",
+        }
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def generate(self, cache: DatasetCache) -> bytes:
+        if not cache.load(self.use_case):
+            offset = output_offset(self.use_case)
+            GeneratorFactory.GeneratorFromUseCase(self.use_case).generateDataset(
+                self.use_case["payload"], self.use_case["output_logs"]
+            )
+            cache.store(self.use_case, offset=offset)
+        with open(self.use_case["output_logs"], "rb") as file:
+            data = file.read()
+        os.remove(self.use_case["output_logs"])
+        return data
+
+    def testKey(self):
+        key = use_case_key(self.use_case)
+        self.assertEqual(key, use_case_key(dict(self.use_case)))
+        self.assertNotEqual(key, use_case_key({**self.use_case, "seed": 43}))
+        self.assertIsNone(use_case_key({**self.use_case, "seed": None}))
+        self.assertIsNone(use_case_key({**self.use_case, "sink": "stdout"}))
+        # Shards are seeded with the name of the use case
+        self.assertEqual(key, use_case_key(self.use_case, None))
+        self.assertNotEqual(
+            use_case_key(self.use_case, "linear"),
+            use_case_key(self.use_case, "linear_eu"),
+        )
+
+    def testLoadWhatWasStored(self):
+        for compress in (False, True):
+            cache = DatasetCache(
+                os.path.join(self.directory.name, str(compress)), compress=compress
+            )
+            self.assertFalse(cache.load(self.use_case))
+            generated = self.generate(cache)
+            self.assertTrue(cache.load(self.use_case))
+            os.remove(self.use_case["output_logs"])
+            self.assertEqual(generated, self.generate(cache))
+
+    def testRenamedUseCaseMisses(self):
+        cache = DatasetCache(os.path.join(self.directory.name, "cache"))
+        self.assertFalse(cache.load(self.use_case, "linear"))
+        GeneratorFactory.GeneratorFromUseCase(self.use_case, "linear").generateDataset(
+            self.use_case["payload"], self.use_case["output_logs"]
+        )
+        cache.store(self.use_case, "linear")
+        os.remove(self.use_case["output_logs"])
+        self.assertTrue(cache.load(self.use_case, "linear"))
+        os.remove(self.use_case["output_logs"])
+        self.assertFalse(cache.load(self.use_case, "linear_eu"))
+        self.assertFalse(os.path.exists(self.use_case["output_logs"]))
+
+    def testEvictLeastRecentlyUsed(self):
+        cache = DatasetCache(os.path.join(self.directory.name, "cache"), 0)
+        self.generate(cache)
+        self.assertEqual([], os.listdir(cache.directory))
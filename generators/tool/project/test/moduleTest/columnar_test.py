@@ -0,0 +1,56 @@
+import datetime
+import unittest
+import uuid
+
+import numpy as np
+
+from project.utils.Columnar import (
+    TIMESTAMP_EVENT,
+    TIMESTAMP_STR,
+    RecordBlock,
+    datetime_range,
+    format_timestamps,
+    parse_timestamps,
+    uuid_column,
+)
+
+
+class ColumnarTest(unittest.TestCase):
+    def testRows(self):
+        block = RecordBlock(
+            {"coord.x": np.array([1.5, 2.5]), "coord.y": [3, 4], "id": "a"}, 2
+        )
+        self.assertEqual(
+            [
+                {"coord": {"x": 1.5, "y": 3}, "id": "a"},
+                {"coord": {"x": 2.5, "y": 4}, "id": "a"},
+            ],
+            block.rows(),
+        )
+
+    def testTimestamps(self):
+        start = datetime.datetime(2020, 12, 1, 10, 0, 0, 250000)
+        expected = [start + datetime.timedelta(seconds=i * 0.75) for i in range(3, 9)]
+        values = datetime_range(start, 0.75, 3, 9)
+        self.assertEqual(
+            [str(t) for t in expected],
+            format_timestamps(values, TIMESTAMP_STR).tolist(),
+        )
+        self.assertEqual(
+            [t.strftime("%Y-%m-%dT%H:%M:%S.000Z") for t in expected],
+            format_timestamps(values, TIMESTAMP_EVENT).tolist(),
+        )
+        np.testing.assert_array_equal(
+            parse_timestamps(format_timestamps(values, TIMESTAMP_STR)), values
+        )
+        np.testing.assert_array_equal(
+            parse_timestamps(format_timestamps(values, TIMESTAMP_EVENT)),
+            values.astype("datetime64[s]"),
+        )
+
+    def testUuids(self):
+        base = uuid.uuid1()
+        ids = [uuid.UUID(i) for i in uuid_column(base.int, 0, 1000)]
+        self.assertEqual(base, ids[0])
+        self.assertEqual(1000, len(set(ids)))
+        self.assertTrue(all(i.version == 1 for i in ids))
@@ -0,0 +1,214 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.utils.DatasetProfile import HyperLogLog, Moments
+from project.utils.Parallel import run_parallel
+from project.utils.Utils import load_json_file
+
+
+class DatasetProfileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def profile(self, use_case: dict, name: str) -> dict:
+        use_case = {
+            "output_logs": self.path(name + ".log"),
+            "seed": 5,
+            "start_time": "2024-01-01T00:00:00",
+            "chunk_size": 1000,
+            "dataset_profile": True,
+            **use_case,
+        }
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+        generator.generateDataset(use_case["payload"], use_case["output_logs"])
+        with open(self.path(name + ".profile.json")) as file:
+            return json.load(file)
+
+    def testHyperLogLog(self):
+        sketch = HyperLogLog()
+        sketch.add(np.arange(50000))
+        other = HyperLogLog()
+        other.add(np.array(["id-{}".format(i) for i in range(30000)]))
+        # Already counted
+        other.add(np.arange(20000))
+        sketch.merge(HyperLogLog.from_dict(other.to_dict()))
+        self.assertAlmostEqual(sketch.count(), 80000, delta=80000 * 0.05)
+        small = HyperLogLog()
+        small.add(np.array(["a", "bb", "a", "ccc"]))
+        small.add(np.array(["bb"], dtype="U2"))
+        self.assertEqual(small.count(), 3)
+
+    def testMoments(self):
+        values = np.random.default_rng(0).normal(3, 2, 10001)
+        moments = Moments()
+        for chunk in np.array_split(values, 7):
+            moments.add(chunk)
+        self.assertEqual(moments.count, len(values))
+        self.assertAlmostEqual(moments.mean, values.mean())
+        self.assertAlmostEqual(moments.variance(), values.var())
+
+    def testLinearCorrelations(self):
+        payload = [
+            {
+                "schedule_time_s": 1,
+                "sample_number": 3000,
+                "x_start_value": 0,
+                "x_end_value": 10,
+                "y_start_value": 20,
+                "y_end_value": 0,
+                "type": "negative",
+            },
+            {
+                "schedule_time_s": 1,
+                "sample_number": 2000,
+                "x_start_value": 0,
+                "x_end_value": 10,
+                "y_start_value": 5,
+                "y_end_value": 5,
+                "type": "none",
+            },
+        ]
+        report = self.profile(
+            {
+                "payload": payload,
+                "module": "project.generator.LinearValues",
+                "class": "LinearValues",
+            },
+            "linear",
+        )
+        self.assertEqual(report["records"], 5000)
+        negative = report["groups"]["negative"]["correlations"]["x:y"]
+        self.assertAlmostEqual(negative["pearson"], -1)
+        self.assertAlmostEqual(negative["slope"], -2)
+        self.assertAlmostEqual(negative["intercept"], 20)
+        # y is constant
+        self.assertIsNone(report["groups"]["none"]["correlations"]["x:y"]["pearson"])
+        self.assertEqual(report["distinct"]["corr_type"], 2)
+
+    def testGroupsPastLimit(self):
+        payload = [
+            {
+                "schedule_time_s": 1,
+                "sample_number": 100,
+                "x_start_value": 0,
+                "x_end_value": 10,
+                "y_start_value": 0,
+                "y_end_value": 10,
+                "type": corr_type,
+            }
+            for corr_type in ("a", "b", "c")
+        ]
+        report = self.profile(
+            {
+                "payload": payload,
+                "module": "project.generator.LinearValues",
+                "class": "LinearValues",
+                "dataset_profile": {"max_groups": 2},
+            },
+            "linear",
+        )
+        self.assertTrue(report["truncated"])
+        self.assertEqual(sorted(report["groups"]), ["a", "b"])
+        self.assertEqual(report["other_groups"]["records"], 100)
+        self.assertEqual(report["records"], 300)
+
+    def usage(self, rate: float, life_s: float, name: str) -> dict:
+        return self.profile(
+            {
+                "payload": [
+                    {
+                        "iteration_number": 2000,
+                        "schedule_time_s": 60,
+                        "average_life_esperancy_s": life_s,
+                        "average_flow_rate": rate,
+                    }
+                ],
+                "module": "project.generator.Usage",
+                "class": "Usage",
+            },
+            name,
+        )
+
+    def testUsagePoissonArrivals(self):
+        # Many iterations have neither new users nor requests at rate 0.3
+        for rate, life_s in ((0.3, 2), (1, 10), (2, 10)):
+            report = self.usage(rate, life_s, "usage-{}".format(rate))
+            arrivals = report["counts"]["new_users"]
+            self.assertEqual(arrivals["keys"], 2000)
+            # Users living less than a second are not born
+            mean = rate * np.exp(-1 / life_s)
+            self.assertAlmostEqual(arrivals["mean"], mean, delta=0.1 * mean)
+            self.assertAlmostEqual(arrivals["dispersion"], 1, delta=0.15)
+        self.assertNotIn("iteration", load_json_file(self.path("usage-2.log"))[0])
+        duration = report["fields"]["http.response.duration"]
+        self.assertAlmostEqual(duration["mean"], 20000, delta=1)
+        self.assertAlmostEqual(duration["std"], 10, delta=0.5)
+
+    def testRadarMatchesRecords(self):
+        use_case = {
+            "payload": [
+                {"sample_size_by_radar": 2000, "radar_number": 3, "frequency_s": 1}
+            ],
+            "module": "project.generator.Radar",
+            "class": "Radar",
+        }
+        report = self.profile(use_case, "radar")
+        records = load_json_file(self.path("radar.log"))
+        distances = np.array([record["coord"]["distance"] for record in records])
+        distance = report["fields"]["coord.distance"]
+        self.assertEqual(distance["count"], len(records))
+        self.assertAlmostEqual(distance["mean"], distances.mean())
+        self.assertAlmostEqual(distance["std"], distances.std())
+        self.assertEqual(distance["min"], distances.min())
+        self.assertAlmostEqual(distance["p50"], np.median(distances), delta=0.02 * 300)
+        # Plots stay within the coverage of their radar
+        self.assertLessEqual(
+            distance["max"], report["fields"]["radar.coverage.distance"]["max"]
+        )
+        self.assertAlmostEqual(
+            report["distinct"]["plots.id"], len(records), delta=len(records) * 0.05
+        )
+        self.assertEqual(report["distinct"]["radar.id"], 3)
+
+    def testParallelProfile(self):
+        use_case = {
+            "payload": [
+                {"sample_size_by_radar": 1000, "radar_number": 2, "frequency_s": 1}
+            ]
+            * 3,
+            "module": "project.generator.Radar",
+            "class": "Radar",
+        }
+        serial = self.profile(use_case, "radar")
+        # The same use case, writing elsewhere
+        run_parallel(
+            {
+                "radar": {
+                    **use_case,
+                    "output_logs": self.path("parallel.log"),
+                    "seed": 5,
+                    "start_time": "2024-01-01T00:00:00",
+                    "chunk_size": 1000,
+                    "dataset_profile": True,
+                }
+            },
+            2,
+        )
+        with open(self.path("parallel.profile.json")) as file:
+            parallel = json.load(file)
+        self.assertEqual(parallel["records"], serial["records"])
+        self.assertEqual(parallel["distinct"], serial["distinct"])
+        for field, stats in serial["fields"].items():
+            for name, value in stats.items():
+                self.assertAlmostEqual(parallel["fields"][field][name], value)
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+
+from project.sink.SinkI import SinkI
+from project.utils.Columnar import TIMESTAMP_EVENT, RecordBlock
+from project.utils.Live import PacedEmitter, RateSchedule
+
+
+class ListSink(SinkI):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class LiveTest(unittest.TestCase):
+    def testRateSchedule(self):
+        schedule = RateSchedule(
+            100, ramp_s=10, burst_rate=1000, burst_every_s=60, burst_s=5
+        )
+        self.assertEqual(50, schedule.rate_at(5))
+        self.assertEqual(100, schedule.rate_at(30))
+        self.assertEqual(1000, schedule.rate_at(62))
+
+    def testEmitsAtTargetRate(self):
+        clock = FakeClock()
+        sink = ListSink()
+        emitter = PacedEmitter(
+            "test",
+            sink,
+            RateSchedule(500),
+            "event_timestamp",
+            TIMESTAMP_EVENT,
+            clock=clock.clock,
+            sleep=clock.sleep,
+        )
+        chunks = (
+            RecordBlock({"event_timestamp": "old", "x": np.arange(0, 300)}, 300)
+            for _ in range(0, 10)
+        )
+        report = emitter.run(chunks, duration_s=2)
+
+        self.assertAlmostEqual(1000, report.emitted, delta=10)
+        self.assertEqual(report.emitted, sum(len(chunk) for chunk in sink.chunks))
+        self.assertTrue(
+            all(chunk.columns["event_timestamp"] != "old" for chunk in sink.chunks)
+        )
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.utils.Metrics import RunMetrics, run_instrumented
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.use_case = {
+            "payload": [
+                {
+                    "schedule_time_s": 3600,
+                    "sample_number": sample_number,
+                    "x_start_value": 0,
+                    "y_start_value": 0,
+                    "x_end_value": 1000,
+                    "y_end_value": 100,
+                    "type": "project",
+                }
+                for sample_number in (300, 200)
+            ],
+            "module": "project.generator.LinearValues",
+            "class": "LinearValues",
+            "chunk_size": 100,
+            "seed": 42,
+            "start_time": "2024-01-01T00:00:00",
+        }
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def testRunInstrumented(self):
+        metrics = RunMetrics()
+        use_case = {**self.use_case, "output_logs": self.path("instrumented.log")}
+        run_instrumented(use_case, "linear", metrics, "tracemalloc", self.path("p"))
+        metrics.stop()
+        GeneratorFactory.GeneratorFromUseCase(self.use_case, "linear").generateDataset(
+            self.use_case["payload"], self.path("plain.log")
+        )
+
+        # Instrumentation does not change what is written
+        with open(self.path("instrumented.log"), "rb") as instrumented, open(
+            self.path("plain.log"), "rb"
+        ) as plain:
+            self.assertEqual(instrumented.read(), plain.read())
+
+        report = metrics.report()["use_case"]["linear"]
+        self.assertEqual(report["records"], 500)
+        self.assertEqual([entry["records"] for entry in report["payload"]], [300, 200])
+        self.assertEqual([entry["chunks"] for entry in report["payload"]], [3, 2])
+        self.assertEqual(report["bytes"], os.path.getsize(self.path("plain.log")))
+        self.assertGreater(report["tracemalloc_peak_bytes"], 0)
+        self.assertTrue(os.path.exists(self.path("p/linear.tracemalloc.txt")))
+
+    def testPipelineInstrumented(self):
+        metrics = RunMetrics()
+        use_case = {
+            **self.use_case,
+            "output_logs": self.path("instrumented.log"),
+            "pipeline": True,
+            "dataset_profile": True,
+        }
+        run_instrumented(use_case, "linear", metrics)
+        metrics.stop()
+        GeneratorFactory.GeneratorFromUseCase(self.use_case, "linear").generateDataset(
+            self.use_case["payload"], self.path("plain.log")
+        )
+
+        with open(self.path("instrumented.log"), "rb") as instrumented, open(
+            self.path("plain.log"), "rb"
+        ) as plain:
+            self.assertEqual(instrumented.read(), plain.read())
+        self.assertTrue(os.path.exists(self.path("instrumented.profile.json")))
+
+        report = metrics.report()["use_case"]["linear"]
+        self.assertEqual([entry["records"] for entry in report["payload"]], [300, 200])
+        self.assertEqual(report["pipeline"]["stages"]["write"]["records"], 500)
+        self.assertEqual(report["bytes"], os.path.getsize(self.path("plain.log")))
+        self.assertGreaterEqual(report["close_s"], 0)
+
+    def testExport(self):
+        metrics = RunMetrics()
+        use_case = {**self.use_case, "output_logs": self.path("linear.log")}
+        run_instrumented(use_case, "linear", metrics)
+        metrics.stop()
+
+        metrics.save(self.path("metrics.json"))
+        with open(self.path("metrics.json"), "r") as file:
+            report = json.loads(file.read())
+        self.assertEqual(report["use_case"]["linear"]["records"], 500)
+
+        metrics.save(self.path("metrics.prom"))
+        with open(self.path("metrics.prom"), "r") as file:
+            lines = file.read().splitlines()
+        self.assertIn("# TYPE generator_records_total counter", lines)
+        self.assertIn(
+            'generator_records_total{use_case="linear",payload="1"} 200', lines
+        )
+        # Without tracemalloc the peak is not reported
+        self.assertFalse(
+            any(line.startswith("generator_tracemalloc_peak_bytes{") for line in lines)
+        )
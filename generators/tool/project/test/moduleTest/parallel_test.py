@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import unittest
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.generator.Radar import Radar
+from project.utils.Parallel import run_parallel
+
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.use_cases = {
+            "radar": {
+                "payload": [
+                    {"sample_size_by_radar": 300, "radar_number": 4, "frequency_s": 60}
+                ],
+                "output_logs": os.path.join(self.directory.name, "radar.log"),
+                "module": "project.generator.Radar",
+                "class": "Radar",
+                "chunk_size": 100,
+                "start_time": "2024-01-01T00:00:00",
+            }
+        }
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def generate(self, workers: int) -> list:
+        run_parallel(self.use_cases, workers, root_seed=42)
+        with open(self.use_cases["radar"]["output_logs"]) as file:
+            records = [json.loads(line) for line in file]
+        os.remove(self.use_cases["radar"]["output_logs"])
+        return [record["coord"] for record in records]
+
+    def testShards(self):
+        radar = Radar()
+        radar.shard_size = 1000
+        conf = {"sample_size_by_radar": 300, "radar_number": 10, "frequency_s": 60}
+        self.assertEqual(
+            [3, 3, 3, 1], [shard["radar_number"] for shard in radar.shards(conf)]
+        )
+
+    def testSameRecordsWhateverTheWorkers(self):
+        records = self.generate(1)
+        self.assertEqual(1200, len(records))
+        self.assertEqual(records, self.generate(3))
+
+    def testSerialIsParallel(self):
+        use_case = self.use_cases["radar"]
+        run_parallel(self.use_cases, 2, root_seed=42)
+        with open(use_case["output_logs"], "rb") as file:
+            parallel = file.read()
+        os.remove(use_case["output_logs"])
+
+        generator = GeneratorFactory.GeneratorFromUseCase(
+            {**use_case, "seed": 42}, "radar"
+        )
+        generator.generateDataset(use_case["payload"], use_case["output_logs"])
+        with open(use_case["output_logs"], "rb") as file:
+            self.assertEqual(parallel, file.read())
+        self.assertIn(b'"@timestamp": "2024-01-01 00:00:00"', parallel)
+
+    def testRegenerateOneShard(self):
+        generator = GeneratorFactory.GeneratorFromUseCase(
+            {**self.use_cases["radar"], "seed": 7}, "radar"
+        )
+        generator.shard_size = 600
+        payload = self.use_cases["radar"]["payload"]
+        whole_path = os.path.join(self.directory.name, "whole.log")
+        shard_path = os.path.join(self.directory.name, "shard.log")
+
+        self.assertEqual(1200, generator.generateDataset(payload, whole_path))
+        shards = generator.shards(payload[0])
+        self.assertEqual(2, len(shards))
+        self.assertEqual(
+            600,
+            generator.writeChunks(generator.generateShard(shards[1], 0, 1), shard_path),
+        )
+        with open(whole_path, "rb") as whole, open(shard_path, "rb") as shard:
+            self.assertTrue(whole.read().endswith(shard.read()))
+
+    def testFleetShardsAreTimeSteps(self):
+        use_case = {
+            "payload": [
+                {
+                    "aircraft_number": 30,
+                    "duration_h": 1,
+                    "frequency_s": 60,
+                    "shape": "mixed",
+                }
+            ],
+            "output_logs": os.path.join(self.directory.name, "fleet.log"),
+            "module": "project.generator.Fleet",
+            "class": "Fleet",
+            "chunk_size": 100,
+            "seed": 3,
+            "start_time": "2024-01-01T00:00:00",
+        }
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, "fleet")
+        generator.shard_size = 500
+        self.assertEqual(4, len(generator.shards(use_case["payload"][0])))
+        serial_path = os.path.join(self.directory.name, "serial.log")
+        self.assertEqual(
+            1800, generator.generateDataset(use_case["payload"], serial_path)
+        )
+
+        # Every shard flies the same fleet, so sharded runs write the same plots
+        run_parallel({"fleet": use_case}, 3)
+        with open(serial_path, "rb") as serial, open(
+            use_case["output_logs"], "rb"
+        ) as parallel:
+            self.assertEqual(serial.read(), parallel.read())
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.sink.SinkFactory import SinkFactory
+from project.utils.Pipeline import Pipeline
+from project.utils.Utils import iter_random_radar_plots
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.use_case = {
+            "payload": [
+                {"sample_size_by_radar": 500, "radar_number": 6, "frequency_s": 60}
+            ],
+            "module": "project.generator.Radar",
+            "class": "Radar",
+            "chunk_size": 200,
+            "seed": 11,
+            "start_time": "2024-01-01T00:00:00",
+        }
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def generate(self, name: str, pipeline) -> bytes:
+        path = os.path.join(self.directory.name, name)
+        generator = GeneratorFactory.GeneratorFromUseCase(
+            {**self.use_case, "pipeline": pipeline}, "radar"
+        )
+        self.assertEqual(
+            3000, generator.generateDataset(self.use_case["payload"], path)
+        )
+        with open(path, "rb") as file:
+            return file.read()
+
+    def testSameOutput(self):
+        self.assertEqual(
+            self.generate("serial.log", False), self.generate("pipeline.log", 2)
+        )
+
+    def testStageStats(self):
+        path = os.path.join(self.directory.name, "radar.log")
+        with SinkFactory.SinkBuild("file", path) as sink:
+            pipeline = Pipeline(sink, queue_size=2)
+            records = pipeline.run(iter_random_radar_plots(100, 10, 60, chunk_size=50))
+        self.assertEqual(1000, records)
+        report = pipeline.report()
+        self.assertIn(report["bottleneck"], ("generate", "encode", "write"))
+        for stage in report["stages"].values():
+            self.assertEqual(20, stage["chunks"])
+            self.assertEqual(1000, stage["records"])
+            self.assertLessEqual(stage["queue_depth_max"], 2)
+        self.assertEqual(os.path.getsize(path), report["stages"]["write"]["bytes"])
+
+    def testGeneratorFailure(self):
+        def chunks():
+            yield from iter_random_radar_plots(100, 1, 60, chunk_size=10)
+            raise ValueError("generation failed")
+
+        path = os.path.join(self.directory.name, "radar.log")
+        threads = threading.active_count()
+        with SinkFactory.SinkBuild("file", path) as sink:
+            pipeline = Pipeline(sink, queue_size=1)
+            with self.assertRaises(ValueError):
+                pipeline.run(chunks())
+        # Every stage thread is stopped
+        self.assertEqual(threads, threading.active_count())
@@ -0,0 +1,142 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.probe.Collector import (
+    GAP_BLOCK_SIZE,
+    ProbeCollector,
+    SequenceBitmap,
+    listen,
+    read_stream,
+)
+from project.utils.Utils import load_json_file
+
+
+def probe_line(sequence: int, emit_us: int, run_id: str = "0a1b") -> bytes:
+    record = {
+        "message": "hello",
+        "probe": {"run_id": run_id, "seq": sequence, "emit_us": emit_us},
+    }
+    return json.dumps(record).encode("utf-8") + b"\n"
+
+
+class ProbeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.use_case = {
+            "payload": [
+                {
+                    "iteration_number": 5,
+                    "schedule_time_s": 600,
+                    "average_life_esperancy_s": 10,
+                    "average_flow_rate": 5,
+                }
+            ],
+            "output_logs": os.path.join(self.directory.name, "usage.log"),
+            "module": "project.generator.Usage",
+            "class": "Usage",
+            "seed": 3,
+            "chunk_size": 100,
+            "probe": "0a1b",
+        }
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def generate(self, use_case: dict):
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, "usage")
+        generator.generateDataset(use_case["payload"], use_case["output_logs"])
+
+    def testStampedRecords(self):
+        self.generate(self.use_case)
+        records = load_json_file(self.use_case["output_logs"])
+        self.assertEqual(
+            [record["probe"]["seq"] for record in records], list(range(len(records)))
+        )
+        self.assertEqual({record["probe"]["run_id"] for record in records}, {"0a1b"})
+
+        collector = ProbeCollector()
+        with open(self.use_case["output_logs"], "rb") as file:
+            read_stream(file, collector)
+        run = collector.report()["runs"]["0a1b"]
+        self.assertEqual(run["unique"], len(records))
+        self.assertEqual(run["missing"], 0)
+        self.assertEqual(collector.unprobed, 0)
+
+    def testLossAndDuplicates(self):
+        clock = iter([10.0, 12.5])
+        collector = ProbeCollector(clock=lambda: next(clock))
+        sent = [s for s in range(100) if s not in (7, 8, 50)]
+        collector.feed(b"".join(probe_line(s, 9000000) for s in sent[:60]))
+        collector.feed(b"".join(probe_line(s, 9000000) for s in sent[50:] + [3]))
+        report = collector.report(expected=105)
+        run = report["runs"]["0a1b"]
+        self.assertEqual(run["received"], len(sent) + 11)
+        self.assertEqual(run["unique"], len(sent))
+        self.assertEqual(run["duplicates"], 11)
+        self.assertEqual(run["missing"], 8)
+        self.assertEqual(run["gap_count"], 3)
+        self.assertEqual(run["gaps"], [[7, 9], [50, 51], [100, 105]])
+        self.assertEqual(run["latency_ms"]["min"], 1000.0)
+        self.assertEqual(run["latency_ms"]["max"], 3500.0)
+        self.assertAlmostEqual(run["latency_ms"]["p99"], 3500.0, delta=35)
+        self.assertEqual(run["throughput"]["per_s"], [60, 0, 48])
+
+    def testGapsAcrossBlocks(self):
+        bitmap = SequenceBitmap()
+        seen = list(range(0, GAP_BLOCK_SIZE - 5)) + [GAP_BLOCK_SIZE + 3]
+        self.assertEqual(bitmap.add(seen), 0)
+        self.assertEqual(
+            bitmap.gaps(GAP_BLOCK_SIZE + 6),
+            (
+                10,
+                2,
+                [
+                    [GAP_BLOCK_SIZE - 5, GAP_BLOCK_SIZE + 3],
+                    [GAP_BLOCK_SIZE + 4, GAP_BLOCK_SIZE + 6],
+                ],
+            ),
+        )
+
+    def testArrivalField(self):
+        collector = ProbeCollector(arrival_field="ingest.time")
+        lines = [
+            {
+                "probe": {"run_id": "0a1b", "seq": 0, "emit_us": 1704067200000000},
+                "ingest": {"time": "2024-01-01T00:00:00.250Z"},
+            },
+            {"message": "no probe"},
+        ]
+        collector.feed(b"\n".join(json.dumps(line).encode() for line in lines))
+        run = collector.report()["runs"]["0a1b"]
+        self.assertEqual(run["latency_ms"]["max"], 250.0)
+        self.assertEqual(collector.unprobed, 1)
+
+    def testListen(self):
+        with socket.socket() as probe_socket:
+            probe_socket.bind(("127.0.0.1", 0))
+            port = probe_socket.getsockname()[1]
+        collector = ProbeCollector()
+        listener = threading.Thread(
+            target=listen,
+            args=("tcp://127.0.0.1:{}".format(port), collector, 0.5, 30),
+        )
+        listener.start()
+        use_case = {**self.use_case, "sink": "tcp://127.0.0.1:{}".format(port)}
+        for _ in range(50):
+            try:
+                self.generate(use_case)
+                break
+            except ConnectionRefusedError:
+                threading.Event().wait(0.05)
+        listener.join()
+        self.generate(self.use_case)
+        expected = len(load_json_file(self.use_case["output_logs"]))
+        run = collector.report()["runs"]["0a1b"]
+        self.assertEqual(run["unique"], expected)
+        self.assertEqual(run["missing"], 0)
+        self.assertGreaterEqual(run["latency_ms"]["min"], 0)
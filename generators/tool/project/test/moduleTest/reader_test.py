@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from project.utils.Reader import JsonLinesReader, build_line_index
+from project.utils.Utils import load_json_file
+
+
+class ReaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "records.log")
+        self.records = [{"id": i, "value": "x" * i} for i in range(100)]
+        with open(self.path, "w") as file:
+            for record in self.records:
+                file.write(json.dumps(record) + "\n")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def testBuildLineIndex(self):
+        data = b'{"a": 1}\n\n{"a": 2}'
+        self.assertEqual(build_line_index(data).tolist(), [[0, 8], [10, 18]])
+        self.assertEqual(build_line_index(b"").shape, (0, 2))
+
+    def testIndexAcrossBlocks(self):
+        data = b'{"a": 1}\n\n{"a": 22}\n{"a": 3}'
+        for block_size in (1, 5, 9, 10, 64):
+            self.assertEqual(
+                build_line_index(data, block_size).tolist(),
+                [[0, 8], [10, 19], [20, 28]],
+            )
+
+    def testRandomAccess(self):
+        with JsonLinesReader(self.path) as reader:
+            self.assertEqual(len(reader), 100)
+            self.assertEqual(reader[42], self.records[42])
+            self.assertEqual(reader[-1], self.records[-1])
+            self.assertEqual(reader[10:20:3], self.records[10:20:3])
+            self.assertEqual(list(reader.range(95)), self.records[95:])
+            self.assertEqual(list(reader), self.records)
+            chunks = list(reader.chunks(30))
+        self.assertEqual([len(chunk) for chunk in chunks], [30, 30, 30, 10])
+        self.assertEqual(load_json_file(self.path), self.records)
+
+    def testPersistedIndex(self):
+        with JsonLinesReader(self.path) as reader:
+            self.assertEqual(len(reader), 100)
+        self.assertTrue(os.path.exists(self.path + ".idx"))
+        reader = JsonLinesReader(self.path)
+        stat = os.stat(self.path)
+        index = reader.load_index(stat)
+        self.assertEqual(len(index), 100)
+        # Mapped, not read in memory
+        self.assertIsInstance(index, np.memmap)
+
+        # An index of another version of the file is rebuilt
+        with open(self.path, "a") as file:
+            file.write(json.dumps({"id": 100}) + "\n")
+        with JsonLinesReader(self.path) as reader:
+            self.assertEqual(len(reader), 101)
+            self.assertEqual(reader[100], {"id": 100})
+
+    def testEmptyFile(self):
+        open(self.path, "w").close()
+        with JsonLinesReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(list(reader), [])
@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.utils.Parallel import run_parallel
+from project.utils.Rollup import QuantileSketch
+from project.utils.Utils import load_json_file
+
+
+class RollupTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.use_case = {
+            "payload": [
+                {
+                    "iteration_number": 10,
+                    "schedule_time_s": 3600,
+                    "average_life_esperancy_s": 10,
+                    "average_flow_rate": 5,
+                }
+            ]
+            * 2,
+            "output_logs": self.path("usage.log"),
+            "module": "project.generator.Usage",
+            "class": "Usage",
+            "seed": 7,
+            "start_time": "2024-01-01T00:00:00",
+            "chunk_size": 200,
+            "rollup": {
+                "output_logs": self.path("usage_rollup.log"),
+                "interval_s": 3600,
+            },
+        }
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def generate(self, use_case: dict):
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, "usage")
+        generator.generateDataset(use_case["payload"], use_case["output_logs"])
+        return load_json_file(use_case["output_logs"]), load_json_file(
+            use_case["rollup"]["output_logs"]
+        )
+
+    def testQuantileSketch(self):
+        rng = np.random.default_rng(0)
+        values = np.concatenate((rng.lognormal(3, 2, 20000), -rng.exponential(5, 500)))
+        sketch = QuantileSketch(0.01)
+        sketch.add(values[:10000])
+        other = QuantileSketch(0.01)
+        other.add(values[10000:])
+        sketch.merge(QuantileSketch.from_dict(other.to_dict()))
+        self.assertEqual(sketch.count(), len(values))
+        quantiles = [0.01, 0.1, 0.5, 0.9, 0.99]
+        expected = np.quantile(values, quantiles, method="lower")
+        np.testing.assert_allclose(sketch.quantiles(quantiles), expected, rtol=0.01)
+
+    def testUsageSummaries(self):
+        records, summaries = self.generate(self.use_case)
+        requests = [record for record in records if "http" in record]
+        self.assertEqual(
+            sum(summary["rollup"]["count"] for summary in summaries), len(requests)
+        )
+        tool = "tool-3"
+        durations = [
+            record["http"]["response"]["duration"]
+            for record in requests
+            if record["user"]["tool"] == tool
+        ]
+        tool_summaries = [
+            summary for summary in summaries if summary["user"]["tool"] == tool
+        ]
+        self.assertEqual(
+            sum(
+                summary["http"]["response"]["duration"]["count"]
+                for summary in tool_summaries
+            ),
+            len(durations),
+        )
+        self.assertEqual(
+            min(
+                summary["http"]["response"]["duration"]["min"]
+                for summary in tool_summaries
+            ),
+            min(durations),
+        )
+        codes = sum(
+            sum(summary["http"]["response"]["code"]["histogram"].values())
+            for summary in tool_summaries
+        )
+        self.assertEqual(codes, len(durations))
+        # Summaries are written bucket after bucket
+        buckets = [summary["event_timestamp"] for summary in summaries]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def testPartialSummariesMerge(self):
+        _, summaries = self.generate(self.use_case)
+        use_case = {
+            **self.use_case,
+            "output_logs": self.path("parallel.log"),
+            "rollup": {
+                "output_logs": self.path("parallel_rollup.log"),
+                "interval_s": 3600,
+            },
+        }
+        run_parallel({"usage": use_case}, 2)
+        merged = load_json_file(self.path("parallel_rollup.log"))
+        self.assertEqual(len(merged), len(summaries))
+        for summary, other in zip(summaries, merged):
+            self.assertEqual(summary["rollup"], other["rollup"])
+            self.assertEqual(
+                summary["http"]["response"]["code"], other["http"]["response"]["code"]
+            )
+            self.assertEqual(
+                summary["http"]["response"]["duration"]["sketch"],
+                other["http"]["response"]["duration"]["sketch"],
+            )
+
+    def testBoundedGroups(self):
+        use_case = {
+            **self.use_case,
+            "rollup": {
+                "output_logs": self.path("usage_rollup.log"),
+                "interval_s": 3600,
+                "max_groups": 20,
+            },
+        }
+        records, summaries = self.generate(use_case)
+        self.assertEqual(
+            sum(summary["rollup"]["count"] for summary in summaries),
+            sum(1 for record in records if "http" in record),
+        )
+        # Late records of written buckets start partial summaries
+        keys = {
+            (summary["event_timestamp"], summary["user"]["tool"])
+            for summary in summaries
+        }
+        self.assertGreater(len(summaries), len(keys))
+
+    def testAircraftSensorStats(self):
+        use_case = {
+            "payload": [
+                {
+                    "aircraft_number": 5,
+                    "max_cycle_number": 20,
+                    "cycle_schedule_s": 43200,
+                }
+            ],
+            "output_logs": self.path("aircraft.log"),
+            "module": "project.generator.Aircraft",
+            "class": "Aircraft",
+            "seed": 1,
+            "start_time": "2024-01-01T00:00:00",
+            "pipeline": True,
+            "rollup": {"output_logs": self.path("aircraft_rollup.log")},
+        }
+        records, summaries = self.generate(use_case)
+        for summary in summaries:
+            sensors = [
+                record["sensor"]
+                for record in records
+                if record["aircraft"]["id"] == summary["aircraft"]["id"]
+                and record["event_timestamp"][:10] == summary["event_timestamp"][:10]
+            ]
+            self.assertEqual(summary["rollup"]["count"], len(sensors))
+            self.assertEqual(summary["sensor"]["min"], min(sensors))
+            self.assertEqual(summary["sensor"]["max"], max(sensors))
+            self.assertAlmostEqual(summary["sensor"]["mean"], np.mean(sensors))
@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from project.utils.Columnar import RecordBlock
+from project.utils.Serializer import JsonLinesWriter, encode_block
+from project.utils.Utils import (
+    iter_linear_aircraft_sensor_values,
+    iter_random_radar_plots,
+)
+
+
+class SerializerTest(unittest.TestCase):
+    def testTemplateMatchesJsonDumps(self):
+        blocks = list(iter_random_radar_plots(50, 2, 60, chunk_size=20))
+        blocks += list(iter_linear_aircraft_sensor_values(10, 20, 3600))
+        blocks.append(
+            RecordBlock(
+                {
+                    "name": 'a "quoted" 100% {value}',
+                    "values.float": np.array([0.1, np.nan, -np.inf]),
+                    "values.int": np.array([1, -2, 3]),
+                    "values.text": np.array(["é", "\n", ""]),
+                },
+                3,
+            )
+        )
+        for block in blocks:
+            expected = "".join(json.dumps(record) + "\n" for record in block.rows())
+            self.assertEqual(expected.encode("utf-8"), encode_block(block))
+
+    def testWriterAppendsRowsAndBlocks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.log")
+            with JsonLinesWriter(path) as writer:
+                writer.write([{"x": np.float64(1.5), "y": np.int64(2)}])
+                writer.write(RecordBlock({"x": np.array([2.5]), "y": 3}, 1))
+            with JsonLinesWriter(path, "json") as writer:
+                writer.write(RecordBlock({"x": np.array([3.5]), "y": 4}, 1))
+
+            with open(path) as file:
+                records = [json.loads(line) for line in file]
+            self.assertEqual(
+                [{"x": 1.5, "y": 2}, {"x": 2.5, "y": 3}, {"x": 3.5, "y": 4}], records
+            )
+            self.assertEqual(1, writer.records)
@@ -0,0 +1,276 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from project.sink.SinkFactory import SinkFactory
+from project.utils.Utils import (
+    collect_records,
+    iter_random_radar_plots,
+    iter_random_tool_user,
+)
+
+try:
+    import elasticsearch
+    import elasticsearch.helpers
+except ImportError:
+    elasticsearch = None
+
+try:
+    import pyarrow
+    import pyarrow.dataset
+except ImportError:
+    pyarrow = None
+
+
+class BulkHandler(BaseHTTPRequestHandler):
+    """Stand-in for the _bulk endpoint of Elasticsearch"""
+
+    documents = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        lines = body.splitlines()
+        items = []
+        for action, source in zip(lines[0::2], lines[1::2]):
+            BulkHandler.documents.append((self.path, json.loads(source)))
+            items.append({"index": {"status": 201}})
+        response = json.dumps({"took": 1, "errors": False, "items": items})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.end_headers()
+        self.wfile.write(response.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class FailingBulkHandler(BaseHTTPRequestHandler):
+    """_bulk endpoint rejecting every document"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        items = [
+            {"index": {"status": 400, "error": {"type": "mapper_parsing_exception"}}}
+            for _ in body.splitlines()[0::2]
+        ]
+        response = json.dumps({"took": 1, "errors": True, "items": items})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.end_headers()
+        self.wfile.write(response.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeProducer:
+    def __init__(self, **settings):
+        self.settings = settings
+        self.messages = []
+        self.closed = False
+
+    def send(self, topic, value):
+        self.messages.append((topic, value))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class SinkTest(unittest.TestCase):
+    @unittest.skipIf(elasticsearch is None, "elasticsearch is not installed")
+    def testElasticsearchSink(self):
+        server = HTTPServer(("127.0.0.1", 0), BulkHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        BulkHandler.documents = []
+        try:
+            sink = SinkFactory.SinkBuild(
+                {
+                    "type": "elasticsearch",
+                    "index": "radar-report",
+                    "nodes": ["127.0.0.1"],
+                    "port": server.server_address[1],
+                    "chunk_size": 100,
+                    "thread_count": 2,
+                },
+                None,
+            )
+            with sink:
+                for chunk in iter_random_radar_plots(150, 3, 60, chunk_size=70):
+                    sink.write(chunk)
+        finally:
+            server.shutdown()
+
+        self.assertEqual(450, sink.indexed)
+        self.assertEqual(450, len(BulkHandler.documents))
+        self.assertTrue(
+            all(path == "/radar-report/_bulk" for path, _ in BulkHandler.documents)
+        )
+        self.assertEqual(3, len({d["radar"]["id"] for _, d in BulkHandler.documents}))
+
+    @unittest.skipIf(elasticsearch is None, "elasticsearch is not installed")
+    def testElasticsearchSinkFailure(self):
+        server = HTTPServer(("127.0.0.1", 0), FailingBulkHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        errors = []
+
+        def index(chunk_size: int, chunks: int):
+            sink = SinkFactory.SinkBuild(
+                {
+                    "type": "elasticsearch",
+                    "index": "radar-report",
+                    "nodes": ["127.0.0.1"],
+                    "port": server.server_address[1],
+                    "chunk_size": chunk_size,
+                    "thread_count": 1,
+                    "queue_size": 1,
+                },
+                None,
+            )
+            try:
+                with sink:
+                    for chunk in iter_random_radar_plots(
+                        chunks * 10, 1, 60, chunk_size=10
+                    ):
+                        sink.write(chunk)
+            except elasticsearch.helpers.BulkIndexError as error:
+                errors.append(error)
+
+        try:
+            # The only bulk is sent by close, then while records still come
+            for chunk_size, chunks in ((1000, 3), (10, 200)):
+                runner = threading.Thread(
+                    target=index, args=(chunk_size, chunks), daemon=True
+                )
+                runner.start()
+                runner.join(30)
+                self.assertFalse(runner.is_alive())
+        finally:
+            server.shutdown()
+        self.assertEqual(2, len(errors))
+
+    def testKafkaSink(self):
+        producers = []
+
+        def factory(**settings):
+            producers.append(FakeProducer(**settings))
+            return producers[-1]
+
+        sink = SinkFactory.SinkBuild(
+            {"type": "kafka", "topic": "radar-report", "compression_type": "lz4"},
+            None,
+        )
+        sink.producer_factory = factory
+        with sink:
+            for chunk in iter_random_radar_plots(20, 2, 60):
+                sink.write(chunk)
+
+        self.assertEqual("lz4", producers[0].settings["compression_type"])
+        self.assertTrue(producers[0].closed)
+        self.assertEqual(40, len(producers[0].messages))
+        topic, value = producers[0].messages[0]
+        self.assertEqual("radar-report", topic)
+        self.assertIn("coverage", json.loads(value)["radar"])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def testColumnarSinks(self):
+        chunks = list(
+            iter_random_radar_plots(
+                1500, 2, 60, chunk_size=400, start_time="2024-01-01T23:00:00"
+            )
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for sink_type, file_format in (("parquet", "parquet"), ("arrow", "ipc")):
+                output_path = os.path.join(directory, "radar.log")
+                with SinkFactory.SinkBuild(sink_type, output_path) as sink:
+                    for chunk in chunks:
+                        sink.write(chunk)
+
+                dataset_directory = os.path.join(directory, "radar." + sink_type)
+                self.assertEqual(
+                    ["day=2024.01.01", "day=2024.01.02"],
+                    sorted(os.listdir(dataset_directory)),
+                )
+                table = pyarrow.dataset.dataset(
+                    dataset_directory, format=file_format, partitioning="hive"
+                ).to_table()
+                self.assertEqual(3000, sink.records)
+                self.assertEqual(3000, table.num_rows)
+                records = sorted(
+                    table.drop(["day"]).to_pylist(),
+                    key=lambda record: record["plots"]["id"],
+                )
+                expected = sorted(
+                    collect_records(chunks), key=lambda record: record["plots"]["id"]
+                )
+                self.assertEqual(expected, records)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def testColumnarSinkSchemas(self):
+        # New users and their requests hold different fields
+        with tempfile.TemporaryDirectory() as directory:
+            sink = SinkFactory.SinkBuild(
+                {"type": "parquet", "directory": directory}, None
+            )
+            with sink:
+                for chunk in iter_random_tool_user(5, 60, 10, 3, rng=1):
+                    sink.write(chunk)
+            self.assertEqual(2, len(sink.paths))
+
+    def testRotatingFileSink(self):
+        chunks = list(iter_random_radar_plots(1000, 3, 60, chunk_size=400))
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "radar_data.log")
+            sink = SinkFactory.SinkBuild(
+                {"type": "rotating", "max_records": 700, "compression": "gzip"},
+                output_path,
+            )
+            with sink:
+                for chunk in chunks:
+                    sink.write(chunk)
+
+            with open(output_path + ".manifest.json") as file:
+                segments = json.loads(file.read())["segments"]
+            self.assertEqual(
+                [700, 700, 700, 700, 200], [s["records"] for s in segments]
+            )
+            self.assertEqual(
+                [0, 700, 1400, 2100, 2800], [s["first_record"] for s in segments]
+            )
+            self.assertEqual(
+                os.path.join(directory, "radar_data-00002.log.gz"),
+                segments[1]["compressed_path"],
+            )
+            self.assertFalse(os.path.exists(output_path))
+            records = []
+            for segment in segments:
+                with gzip.open(segment["compressed_path"], "rt") as file:
+                    records += [json.loads(line) for line in file]
+            self.assertEqual(collect_records(chunks), records)
+
+    def testRotatingFileSinkBySize(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_path = os.path.join(directory, "radar_data.log")
+            sink = SinkFactory.SinkBuild(
+                {"type": "rotating", "max_bytes": 30000}, output_path
+            )
+            with sink:
+                for chunk in iter_random_radar_plots(100, 3, 60, chunk_size=50):
+                    sink.write(chunk)
+            self.assertEqual(
+                sorted(
+                    ["radar_data-0000{}.log".format(i) for i in range(1, 4)]
+                    + ["radar_data.log.manifest.json"]
+                ),
+                sorted(os.listdir(directory)),
+            )
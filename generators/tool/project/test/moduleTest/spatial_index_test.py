@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.utils.Columnar import RecordBlock
+from project.utils.SpatialIndex import (
+    GRID_SUFFIX,
+    OUTSIDE,
+    SpatialIndex,
+    load_topology,
+    polygon_edges,
+)
+
+WORLD_MAP = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "..", "..", "data", "world_map.json"
+)
+
+
+class SpatialIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        # The grid is written next to the map, keep the repository clean
+        self.path = os.path.join(self.directory.name, "world_map.json")
+        shutil.copy(WORLD_MAP, self.path)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def testLookup(self):
+        index = SpatialIndex.load(self.path)
+        # Paris, Berlin, Madrid, Tokyo, Sydney, Denver, the Atlantic ocean
+        lon = [2.35, 13.4, -3.7, 139.7, 151.2, -105.0, -30.0]
+        lat = [48.85, 52.5, 40.4, 35.7, -33.9, 39.7, 40.0]
+        self.assertEqual(
+            index.lookup(lon, lat).tolist(), [250, 276, 724, 392, 36, 840, OUTSIDE]
+        )
+        # Off the map
+        self.assertEqual(index.lookup([0.0], [-89.0]).tolist(), [OUTSIDE])
+
+    def testMatchesRayCasting(self):
+        topology = load_topology(self.path)
+        index = SpatialIndex.build(topology)
+        edges, owners, ids = polygon_edges(topology, "countries")
+        rng = np.random.default_rng(0)
+        lon = rng.uniform(-180, 180, 500)
+        lat = rng.uniform(-85, 85, 500)
+        found = index.lookup(lon, lat)
+        for x, y, country in zip(lon, lat, found):
+            crossing = (edges[:, 1] > y) != (edges[:, 3] > y)
+            x1, y1, x2, y2 = edges[crossing].T
+            right = x1 + (y - y1) * (x2 - x1) / (y2 - y1) > x
+            inside = np.bincount(owners[crossing][right], minlength=len(ids)) % 2
+            expected = ids[inside.argmax()] if inside.any() else OUTSIDE
+            self.assertEqual(country, expected)
+
+    def testPersistedGrid(self):
+        built = SpatialIndex.load(self.path)
+        self.assertTrue(os.path.exists(self.path + GRID_SUFFIX))
+        loaded = SpatialIndex.load(self.path)
+        np.testing.assert_array_equal(loaded.owners, built.owners)
+        np.testing.assert_array_equal(loaded.cell_edges, built.cell_edges)
+
+        # A grid of another version of the map is rebuilt
+        with open(self.path + GRID_SUFFIX, "r+b") as file:
+            file.truncate(10)
+        self.assertEqual(SpatialIndex.load(self.path).lookup([2.35], [48.85]), [250])
+
+    def testInsertColumn(self):
+        block = RecordBlock({"coord.lon": [1], "plots.id": [2], "@timestamp": [3]}, 1)
+        block.insert_column("coord.country", [4])
+        block.insert_column("source", "radar")
+        self.assertEqual(
+            list(block.columns),
+            ["coord.lon", "coord.country", "plots.id", "@timestamp", "source"],
+        )
+
+    def testEnrichedRadarPlots(self):
+        use_case = {
+            "module": "project.generator.Radar",
+            "class": "Radar",
+            "seed": 1,
+            "countries": self.path,
+            "chunk_size": 50,
+        }
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, "radar")
+        payload = [
+            {
+                "sample_size_by_radar": 40,
+                "radar_number": 2,
+                "frequency_s": 1,
+                "sites": [{"lon": 2.35, "lat": 48.85}, {"lon": -30.0, "lat": 40.0}],
+            }
+        ]
+        index = SpatialIndex.load(self.path)
+        for chunk in generator.generateStream(payload):
+            for record in chunk.rows():
+                self.assertEqual(
+                    record["radar"]["country"],
+                    250 if record["radar"]["location"]["lon"] == 2.35 else OUTSIDE,
+                )
+                location = record["coord"]["location"]
+                self.assertEqual(
+                    record["coord"]["country"],
+                    index.lookup([location["lon"]], [location["lat"]])[0],
+                )
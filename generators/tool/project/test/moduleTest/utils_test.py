@@ -0,0 +1,161 @@
+import math
+import unittest
+
+import numpy as np
+
+from project.utils.Geo import EARTH_RADIUS_KM, great_circle_points, project_polar
+from project.utils.Utils import (
+    collect_records,
+    generate_linear_values,
+    generate_random_radar_plots,
+    iter_fleet_points,
+    iter_random_shape_points,
+    generate_random_tool_user,
+    iter_linear_values,
+    iter_random_radar_plots,
+    linspace_chunk,
+)
+
+
+class UtilsTest(unittest.TestCase):
+    def testLinspaceChunk(self):
+        expected = np.linspace(3, 17, 11)
+        values = np.concatenate(
+            [linspace_chunk(3, 17, 11, 0, 4), linspace_chunk(3, 17, 11, 4, 11)]
+        )
+        self.assertEqual(expected.tolist(), values.tolist())
+
+    def testChunksAreBounded(self):
+        chunks = list(iter_random_radar_plots(25, 2, 60, chunk_size=10))
+        self.assertEqual([10, 10, 10, 10, 10], [len(chunk) for chunk in chunks])
+        # Blocks span radars, whose fields are constant in a block of one radar
+        self.assertTrue(chunks[0].is_constant("radar.id"))
+        self.assertEqual(2, len(set(chunks[2].column("radar.id"))))
+
+    def testProjectPolar(self):
+        degree = math.degrees(100 / EARTH_RADIUS_KM)
+        lon, lat = project_polar(
+            179.5, 0.0, np.array([0.0, 90.0, 180.0, 270.0]), np.full(4, 100.0)
+        )
+        np.testing.assert_allclose(lat, [degree, 0, -degree, 0], atol=1e-9)
+        # East of the antimeridian wraps to negative longitudes
+        np.testing.assert_allclose(
+            lon, [179.5, 179.5 + degree - 360, 179.5, 179.5 - degree], atol=1e-9
+        )
+
+    def testRadarPlotsProjection(self):
+        sites = [{"lon": 2.35, "lat": 48.85}, {"lon": -0.12, "lat": 51.5}]
+        records = generate_random_radar_plots(100, 4, 60, sites=sites)
+        for record in records:
+            site = sites[0] if record["radar"]["location"]["lon"] == 2.35 else sites[1]
+            self.assertEqual(site["lat"], record["radar"]["location"]["lat"])
+            # Equirectangular distance, close enough at these ranges
+            lon = math.radians(record["coord"]["location"]["lon"] - site["lon"])
+            lat = math.radians(record["coord"]["location"]["lat"] - site["lat"])
+            x = lon * math.cos(
+                math.radians(site["lat"] + record["coord"]["location"]["lat"]) / 2
+            )
+            distance = EARTH_RADIUS_KM * math.hypot(x, lat)
+            self.assertAlmostEqual(
+                record["coord"]["distance"], distance, delta=0.01 * distance
+            )
+            self.assertLessEqual(
+                record["coord"]["distance"], record["radar"]["coverage"]["distance"]
+            )
+
+    def testListApiMatchesChunks(self):
+        conf = {
+            "schedule_time_s": 60,
+            "sample_number": 42,
+            "x_start_value": 0,
+            "x_end_value": 10,
+            "y_start_value": 5,
+            "y_end_value": 1,
+            "type": "project",
+        }
+        records = generate_linear_values(**conf)
+        chunks = collect_records(iter_linear_values(**conf, chunk_size=5))
+        self.assertEqual(
+            [(r["x"], r["y"]) for r in records], [(r["x"], r["y"]) for r in chunks]
+        )
+
+    def testUsageUsersLiveTheirLife(self):
+        iteration_number = 30
+        records = generate_random_tool_user(iteration_number, 3600, 5, 3)
+        born = {}
+        lives = {}
+        for record in records:
+            if "http" in record:
+                lives.setdefault(record["user"]["id"], set()).add(record["life"])
+            else:
+                born[record["user"]["id"]] = record["life"]
+
+        self.assertTrue(born)
+        for user, life in born.items():
+            self.assertGreater(life, 0)
+            self.assertTrue(lives.get(user, set()) <= set(range(1, life)))
+        self.assertTrue(set(lives) <= set(born))
+
+    def testFleetPoints(self):
+        chunks = list(iter_fleet_points(7, 1, 60, shape="mixed", chunk_size=50, rng=1))
+        self.assertEqual(420, sum(len(chunk) for chunk in chunks))
+        records = collect_records(chunks)
+        # Interleaved aircraft, in time order
+        self.assertEqual(
+            ["aeronef-{}".format(i) for i in range(1, 8)] * 2,
+            [record["aeronef"]["id"] for record in records[:14]],
+        )
+        timestamps = [record["@timestamp"] for record in records]
+        self.assertEqual(sorted(timestamps), timestamps)
+        self.assertEqual(60, len(set(timestamps)))
+
+    def testFleetRoutesMatchTracks(self):
+        fleet = collect_records(
+            iter_fleet_points(
+                4, 1, 60, shape="curvy", rng=5, start_time="2024-01-01T00:00:00"
+            )
+        )
+        aircraft = [
+            record for record in fleet if record["aeronef"]["id"] == "aeronef-2"
+        ]
+        first = aircraft[0]["coord"]
+        last = aircraft[-1]["coord"]
+        track = collect_records(
+            iter_random_shape_points(
+                first["longitude"],
+                last["longitude"],
+                # The curve ends one degree above the end of the route
+                first["latitude"] - 1,
+                last["latitude"] - 1,
+                1,
+                60,
+                "aeronef-2",
+                shape="curvy",
+                start_time="2024-01-01T00:00:00",
+            )
+        )
+        for plot, point in zip(aircraft, track):
+            self.assertEqual(plot["@timestamp"], point["@timestamp"])
+            for field in ("longitude", "latitude", "altitude"):
+                self.assertAlmostEqual(plot["coord"][field], point["coord"][field])
+
+    def testGreatCircleRoutes(self):
+        chunks = list(
+            iter_fleet_points(
+                1, 1, 60, shape="great_circle", area=(-74.0, 40.7, -74.0, 40.7)
+            )
+        )
+        records = collect_records(chunks)
+        self.assertEqual(60, len(records))
+        # A route from a point to itself stays there
+        self.assertAlmostEqual(-74.0, records[30]["coord"]["longitude"])
+        lon, lat = great_circle_points(
+            np.array([-74.0]),
+            np.array([40.7]),
+            np.array([2.35]),
+            np.array([48.85]),
+            0.5,
+        )
+        # Paris - New York flies north of both ends
+        self.assertGreater(lat[0], 48.85)
+        self.assertTrue(-74.0 < lon[0] < 2.35)
@@ -0,0 +1,151 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_CACHE_MAX_MB = 10240
+COPY_BUFFER_SIZE = 1 << 22
+# Use case entries changing the records written
+KEY_FIELDS = (
+    "module",
+    "class",
+    "payload",
+    "seed",
+    "start_time",
+    "chunk_size",
+    "encoder",
+    "countries",
+)
+
+_tool_version = None
+
+
+def tool_version() -> str:
+    """Digest of the sources of the tool, changes whenever the code writing
+    the datasets does"""
+    global _tool_version
+    if _tool_version is None:
+        digest = hashlib.sha256()
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for package in ("generator", "utils"):
+            directory = os.path.join(root, package)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".py"):
+                    digest.update(name.encode("utf-8"))
+                    with open(os.path.join(directory, name), "rb") as file:
+                        digest.update(file.read())
+        _tool_version = digest.hexdigest()
+    return _tool_version
+
+
+def use_case_key(use_case: dict, name: str = None) -> str:
+    """Hash of everything the records of a use case depend on, its name
+    seeding its shards too, None if they are not reproducible: not seeded,
+    starting now, or not written to a file alone"""
+    if use_case.get("seed") is None or use_case.get("start_time") is None:
+        return None
+    if use_case.get("sink", "file") != "file":
+        return None
+    # Only output_logs is cached, not the summaries and profiles written next
+    # to it, and probes are stamped anew by every run
+    if (
+        use_case.get("rollup")
+        or use_case.get("dataset_profile")
+        or use_case.get("probe")
+    ):
+        return None
+    entries = {field: use_case.get(field) for field in KEY_FIELDS}
+    entries["name"] = name
+    entries["version"] = tool_version()
+    return hashlib.sha256(
+        json.dumps(entries, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class DatasetCache:
+    """Finished outputs of use cases, stored by the hash of the use case.
+
+    Entries are evicted least recently used first once they take more than
+    ``max_bytes``; every hit refreshes the modification time of its entry.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_CACHE_MAX_MB << 20,
+        compress: bool = False,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, key: str) -> str:
+        """Existing entry of the key, compressed or not, else where to store it"""
+        plain = os.path.join(self.directory, key + ".log")
+        compressed = plain + ".gz"
+        if os.path.exists(compressed) or (self.compress and not os.path.exists(plain)):
+            return compressed
+        return plain
+
+    def load(self, use_case: dict, name: str = None) -> bool:
+        """Append the cached output of the use case to its output_logs, if any"""
+        key = use_case_key(use_case, name)
+        if key is None:
+            return False
+        path = self.entry_path(key)
+        try:
+            source = gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+        except FileNotFoundError:
+            return False
+        with source, open(use_case["output_logs"], "ab") as output:
+            shutil.copyfileobj(source, output, COPY_BUFFER_SIZE)
+        os.utime(path)
+        return True
+
+    def store(self, use_case: dict, name: str = None, offset: int = 0):
+        """Store what was appended to output_logs after ``offset``"""
+        key = use_case_key(use_case, name)
+        if key is None or not os.path.exists(use_case["output_logs"]):
+            return
+        path = self.entry_path(key)
+        # Written aside then renamed, so a reader never sees half an entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with open(use_case["output_logs"], "rb") as source, os.fdopen(
+                descriptor, "wb"
+            ) as file:
+                source.seek(offset)
+                if path.endswith(".gz"):
+                    with gzip.GzipFile(
+                        fileobj=file, mode="wb", compresslevel=1
+                    ) as compressed:
+                        shutil.copyfileobj(source, compressed, COPY_BUFFER_SIZE)
+                else:
+                    shutil.copyfileobj(source, file, COPY_BUFFER_SIZE)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".log") or name.endswith(".log.gz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+
+def output_offset(use_case: dict) -> int:
+    """Size of output_logs before generating, the records are appended after"""
+    path = use_case["output_logs"]
+    return os.path.getsize(path) if os.path.exists(path) else 0
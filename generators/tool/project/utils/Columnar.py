@@ -0,0 +1,254 @@
+import datetime
+import uuid
+
+import numpy as np
+
+TIMESTAMP_STR = "str"
+TIMESTAMP_EVENT = "event"
+
+_UUID_DASHES = (8, 13, 18, 23)
+_UUID_HEX_POSITIONS = [i for i in range(0, 36) if i not in _UUID_DASHES]
+_NODE_MASK = (1 << 48) - 1
+
+_row_builders = {}
+
+
+class RecordBlock:
+    """A chunk of records stored column by column.
+
+    Columns are keyed by the dotted path of the field in the output record
+    ("coord.degree" -> {"coord": {"degree": ...}}), in output order. A column
+    is either a sequence of ``size`` values or a single value shared by every
+    record of the block.
+    """
+
+    def __init__(self, columns: dict, size: int):
+        self.columns = columns
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def is_constant(self, field: str) -> bool:
+        return not isinstance(self.columns[field], (np.ndarray, list))
+
+    def column(self, field: str):
+        value = self.columns[field]
+        if self.is_constant(field):
+            return [value] * self.size
+        return value
+
+    def insert_column(self, field: str, value):
+        """Add a column after the last one of its parent object, as the row
+        builders and json templates expect fields of an object together"""
+        parent = field.rpartition(".")[0]
+        fields = list(self.columns)
+        position = len(fields)
+        if parent:
+            siblings = [
+                number
+                for number, name in enumerate(fields)
+                if name.startswith(parent + ".")
+            ]
+            if siblings:
+                position = siblings[-1] + 1
+        fields.insert(position, field)
+        self.columns = {
+            name: value if name == field else self.columns[name] for name in fields
+        }
+
+    def slice(self, start: int, end: int):
+        return RecordBlock(
+            {
+                field: value if self.is_constant(field) else value[start:end]
+                for field, value in self.columns.items()
+            },
+            min(end, self.size) - start,
+        )
+
+    def rows(self) -> list:
+        fields = tuple(self.columns)
+        constants = tuple(self.is_constant(field) for field in fields)
+        builder = compile_row_builder(fields, constants)
+        values = [
+            self.columns[field]
+            for field, constant in zip(fields, constants)
+            if constant
+        ]
+        columns = [
+            _to_list(self.columns[field])
+            for field, constant in zip(fields, constants)
+            if not constant
+        ]
+        if not columns:
+            return [builder(*values) for _ in range(0, self.size)]
+        return [builder(*values, *row) for row in zip(*columns)]
+
+
+def chunk_rows(chunk) -> list:
+    if isinstance(chunk, RecordBlock):
+        return chunk.rows()
+    return chunk
+
+
+def slice_chunk(chunk, start: int, end: int):
+    if isinstance(chunk, RecordBlock):
+        return chunk.slice(start, end)
+    return chunk[start:end]
+
+
+def nest_fields(fields) -> dict:
+    """{"a.b": x, "a.c": y, "d": z} layout -> {"a": {"b": x, "c": y}, "d": z}"""
+    layout = {}
+    for index, field in enumerate(fields):
+        keys = field.split(".")
+        node = layout
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = index
+    return layout
+
+
+def compile_row_builder(fields: tuple, constants: tuple):
+    """Compile a function building one nested record from flat field values.
+
+    The function takes the constant values first, then one value per
+    varying column, so a block builds each record with a single call.
+    """
+    key = (fields, constants)
+    if key not in _row_builders:
+        names = {}
+        for index, constant in enumerate(constants):
+            if constant:
+                names[index] = "c{}".format(len(names))
+        for index, constant in enumerate(constants):
+            if not constant:
+                names[index] = "v{}".format(index)
+
+        def render(node):
+            return "{{{}}}".format(
+                ", ".join(
+                    "{}: {}".format(
+                        repr(name),
+                        render(value) if isinstance(value, dict) else names[value],
+                    )
+                    for name, value in node.items()
+                )
+            )
+
+        arguments = [names[i] for i, c in enumerate(constants) if c] + [
+            names[i] for i, c in enumerate(constants) if not c
+        ]
+        source = "lambda {}: {}".format(
+            ", ".join(arguments), render(nest_fields(fields))
+        )
+        _row_builders[key] = eval(source)
+    return _row_builders[key]
+
+
+def _to_list(column) -> list:
+    if isinstance(column, np.ndarray):
+        return column.tolist()
+    return column
+
+
+def datetime_offsets(start: datetime.datetime, step_s, indices: np.ndarray):
+    """datetime64[us] values start + i * step_s for i in indices"""
+    offsets = indices * (step_s * 1000000)
+    return np.datetime64(start, "us") + np.round(offsets).astype("timedelta64[us]")
+
+
+def datetime_range(start: datetime.datetime, step_s, chunk_start: int, chunk_end: int):
+    """datetime64[us] values start + i * step_s for i in [chunk_start, chunk_end)"""
+    return datetime_offsets(start, step_s, np.arange(chunk_start, chunk_end))
+
+
+def format_timestamps(values: np.ndarray, style: str = TIMESTAMP_STR) -> np.ndarray:
+    """Render datetime64 values as the generators always did.
+
+    TIMESTAMP_STR matches str(datetime) and TIMESTAMP_EVENT matches
+    strftime("%Y-%m-%dT%H:%M:%S.000Z").
+    """
+    if style == TIMESTAMP_EVENT:
+        return np.char.add(np.datetime_as_string(values, unit="s"), ".000Z")
+
+    whole_seconds = values.astype("int64") % 1000000 == 0
+    if whole_seconds.all():
+        rendered = np.datetime_as_string(values, unit="s")
+    else:
+        rendered = np.datetime_as_string(values, unit="us")
+        if whole_seconds.any():
+            rendered = rendered.astype("U26")
+            rendered[whole_seconds] = np.datetime_as_string(
+                values[whole_seconds], unit="s"
+            )
+    width = rendered.dtype.itemsize // 4
+    characters = rendered.view("U1").reshape(len(rendered), width)
+    characters[:, 10] = " "
+    return rendered
+
+
+def parse_timestamps(values) -> np.ndarray:
+    """datetime64[us] values of timestamps rendered by format_timestamps"""
+    values = np.asarray(values)
+    width = values.dtype.itemsize // 4
+    if values.dtype.kind != "U" or width < 19:
+        return values.astype("datetime64[us]")
+    # Digits are read at their fixed positions, numpy parsing each string
+    # is several times slower
+    digits = values.view(np.uint32).reshape(len(values), width).astype(np.int64) - 48
+
+    def number(start: int, end: int) -> np.ndarray:
+        result = digits[:, start]
+        for position in range(start + 1, end):
+            result = result * 10 + digits[:, position]
+        return result
+
+    months = (number(0, 4) - 1970) * 12 + number(5, 7) - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    days += number(8, 10) - 1
+    seconds = (
+        days * 86400 + number(11, 13) * 3600 + number(14, 16) * 60 + number(17, 19)
+    )
+    microseconds = np.zeros(len(values), dtype=np.int64)
+    # Fractions are up to 6 digits after the dot, missing or padded with
+    # the Z of TIMESTAMP_EVENT or the zeros of shorter strings
+    scale = 100000
+    for position in range(20, min(width, 26)):
+        digit = digits[:, position]
+        microseconds += np.where((digit >= 0) & (digit <= 9), digit, 0) * scale
+        scale //= 10
+    return (seconds * 1000000 + microseconds).astype("datetime64[us]")
+
+
+def new_uuid_base(rng: np.random.Generator) -> int:
+    """Random (version 4) uuid drawn from rng, so seeded runs get the same ids"""
+    return uuid.UUID(bytes=rng.bytes(16), version=4).int
+
+
+def new_uuid(rng: np.random.Generator) -> str:
+    return str(uuid.UUID(int=new_uuid_base(rng)))
+
+
+def uuid_column(base: int, chunk_start: int, chunk_end: int) -> np.ndarray:
+    """Render the compact ids [chunk_start, chunk_end) of a base uuid as strings.
+
+    Id i is the base uuid with i added to its 48 bits node field, so every
+    id keeps the version and variant of the base.
+    """
+    size = chunk_end - chunk_start
+    high = np.uint64(base >> 64)
+    clock_seq = np.uint64((base >> 48) & 0xFFFF)
+    node = (
+        np.arange(chunk_start, chunk_end, dtype=np.uint64)
+        + np.uint64(base & _NODE_MASK)
+    ) & np.uint64(_NODE_MASK)
+
+    words = np.empty((size, 2), dtype=">u8")
+    words[:, 0] = high
+    words[:, 1] = (clock_seq << np.uint64(48)) | node
+    digits = np.frombuffer(words.tobytes().hex().encode("ascii"), dtype=np.uint8)
+
+    rendered = np.full((size, 36), ord("-"), dtype=np.uint8)
+    rendered[:, _UUID_HEX_POSITIONS] = digits.reshape(size, 32)
+    return rendered.view("S36").ravel().astype("U36")
@@ -0,0 +1,84 @@
+import gzip
+import os
+import queue
+import shutil
+import threading
+
+COPY_BUFFER_SIZE = 1 << 22
+EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_zstd(path: str):
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(
+        open(path, "wb"), closefd=True
+    )
+
+
+def _open_gzip(path: str):
+    return gzip.open(path, "wb", compresslevel=6)
+
+
+_OPENERS = {"gzip": _open_gzip, "zstd": _open_zstd}
+
+
+def resolve_compression(name: str) -> str:
+    """gzip or zstd, zstd falling back to gzip when zstandard is not installed"""
+    if name is None:
+        return None
+    if name not in _OPENERS:
+        raise Exception("Unknown compression {}".format(name))
+    if name == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("Compression zstd is not installed, default gzip")
+            return "gzip"
+    return name
+
+
+def compress_file(path: str, compression: str) -> str:
+    """Compress a file next to itself, remove it and return the new path"""
+    compressed_path = path + EXTENSIONS[compression]
+    temporary = compressed_path + ".tmp"
+    with open(path, "rb") as source, _OPENERS[compression](temporary) as target:
+        shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+    os.replace(temporary, compressed_path)
+    os.remove(path)
+    return compressed_path
+
+
+class BackgroundCompressor:
+    """Compress files one after the other on a thread of its own, so writers
+    never wait for the compression of what they closed"""
+
+    def __init__(self, compression: str, on_compressed=None):
+        self.compression = compression
+        self.on_compressed = on_compressed
+        self.files = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            path = self.files.get()
+            if path is None:
+                return
+            try:
+                compressed_path = compress_file(path, self.compression)
+                if self.on_compressed is not None:
+                    self.on_compressed(path, compressed_path)
+            except Exception as error:
+                self.error = error
+
+    def submit(self, path: str):
+        self.files.put(path)
+
+    def close(self):
+        """Wait for the files submitted to be compressed"""
+        self.files.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,690 @@
+import base64
+import json
+import math
+import os
+
+import numpy as np
+
+from project.utils.Columnar import RecordBlock
+from project.utils.Rollup import (
+    DEFAULT_ALPHA,
+    DEFAULT_PERCENTILES,
+    QuantileSketch,
+    chunk_column,
+    python_value,
+)
+
+PROFILE_SUFFIX = ".profile.json"
+# Registers of the HyperLogLog sketches, 2^12 count within about 1.6 %
+DEFAULT_PRECISION = 12
+DEFAULT_MAX_GROUPS = 1000
+# Distinct values counted by every counts entry
+DEFAULT_MAX_KEYS = 100000
+PROFILE_OPTIONS = (
+    "group_by",
+    "fields",
+    "distinct",
+    "correlations",
+    "counts",
+    "percentiles",
+    "alpha",
+    "precision",
+    "max_groups",
+    "max_keys",
+)
+FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def hash_values(values) -> np.ndarray:
+    """64 bits hashes of numbers or strings, the same in every process"""
+    values = np.asarray(values)
+    if values.dtype.kind == "O":
+        values = values.astype(str)
+    if values.dtype.kind in "US":
+        # Strings as rows of 64 bits words, zero padded to a whole word
+        size = values.dtype.itemsize
+        words = np.zeros((len(values), (size + 7) // 8 * 8), dtype=np.uint8)
+        words[:, :size] = np.ascontiguousarray(values).view(np.uint8).reshape(-1, size)
+        words = np.ascontiguousarray(words.view(np.uint64).T)
+        hashes = np.full(len(values), FNV_OFFSET)
+        mixed = np.empty_like(hashes)
+        for column in words:
+            # Words of padding only, as arrays of wider strings have, are
+            # left out
+            np.bitwise_xor(hashes, column, out=mixed)
+            np.multiply(mixed, FNV_PRIME, out=mixed)
+            np.copyto(hashes, mixed, where=column != 0)
+    elif values.dtype.kind == "f":
+        # 0.0 and -0.0 are the same value
+        hashes = (values.astype(np.float64) + 0.0).view(np.uint64)
+    else:
+        hashes = values.astype(np.int64).view(np.uint64)
+    # splitmix64 finalizer, spreading the bits over the whole word
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def bit_length(values: np.ndarray) -> np.ndarray:
+    """Bit length of 64 bits unsigned integers"""
+    high = values >> np.uint64(32)
+    low = values & np.uint64(0xFFFFFFFF)
+    # Exact, 32 bits numbers are exact floats
+    return np.where(
+        high > 0,
+        32 + np.frexp(high.astype(np.float64))[1],
+        np.frexp(low.astype(np.float64))[1],
+    )
+
+
+class HyperLogLog:
+    """Mergeable sketch counting the distinct values it was given, within
+    about 1.04 / sqrt(2^precision)"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        hashes = hash_values(values)
+        shift = np.uint64(64 - self.precision)
+        registers = (hashes >> shift).astype(np.intp)
+        rest = hashes << np.uint64(self.precision)
+        ranks = np.minimum(64 - bit_length(rest) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, registers, ranks.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise Exception(
+                "Sketches of precision {} and {}".format(
+                    self.precision, other.precision
+                )
+            )
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        size = len(self.registers)
+        estimate = (
+            0.7213
+            / (1 + 1.079 / size)
+            * size**2
+            / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        )
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            # Linear counting is closer for few values
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> dict:
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(self.registers.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, sketch: dict) -> "HyperLogLog":
+        result = cls(sketch["precision"])
+        result.registers = np.frombuffer(
+            base64.b64decode(sketch["registers"]), dtype=np.uint8
+        ).copy()
+        return result
+
+
+class Moments:
+    """Count, min, max, mean and sum of squared deviations of a stream of
+    numbers, merged chunk after chunk as Welford's algorithm does"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        mean = float(values.mean())
+        self.merge_moments(
+            len(values),
+            mean,
+            float(np.square(values - mean).sum()),
+            float(values.min()),
+            float(values.max()),
+        )
+
+    def merge_moments(self, count, mean, m2, low, high):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def merge(self, other: "Moments"):
+        if other.count:
+            self.merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+
+    def variance(self):
+        return self.m2 / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, moments: dict) -> "Moments":
+        result = cls()
+        result.__dict__.update(moments)
+        return result
+
+
+class Comoments:
+    """Moments of two fields and the sum of the products of their deviations,
+    giving their Pearson correlation and linear regression"""
+
+    def __init__(self):
+        self.x = Moments()
+        self.y = Moments()
+        self.c = 0.0
+
+    def add(self, x: np.ndarray, y: np.ndarray):
+        if len(x) == 0:
+            return
+        other = Comoments()
+        other.x.add(x)
+        other.y.add(y)
+        other.c = float(((x - other.x.mean) * (y - other.y.mean)).sum())
+        self.merge(other)
+
+    def merge(self, other: "Comoments"):
+        total = self.x.count + other.x.count
+        if total:
+            self.c += (
+                other.c
+                + (other.x.mean - self.x.mean)
+                * (other.y.mean - self.y.mean)
+                * self.x.count
+                * other.x.count
+                / total
+            )
+        self.x.merge(other.x)
+        self.y.merge(other.y)
+
+    def report(self) -> dict:
+        spread = self.x.m2 * self.y.m2
+        return {
+            "count": self.x.count,
+            "pearson": self.c / math.sqrt(spread) if spread > 0 else None,
+            "slope": self.c / self.x.m2 if self.x.m2 > 0 else None,
+            "intercept": (
+                self.y.mean - self.c / self.x.m2 * self.x.mean
+                if self.x.m2 > 0
+                else None
+            ),
+        }
+
+    def to_dict(self) -> dict:
+        return {"x": self.x.to_dict(), "y": self.y.to_dict(), "c": self.c}
+
+    @classmethod
+    def from_dict(cls, comoments: dict) -> "Comoments":
+        result = cls()
+        result.x = Moments.from_dict(comoments["x"])
+        result.y = Moments.from_dict(comoments["y"])
+        result.c = comoments["c"]
+        return result
+
+
+class GroupProfile:
+    """Profile of the records of one group"""
+
+    def __init__(self, profile: "DatasetProfile"):
+        self.profile = profile
+        self.records = 0
+        # Values that are not numbers, such as NaN, by field
+        self.missing = {}
+        self.moments = {}
+        self.sketches = {}
+        self.distinct = {}
+        self.comoments = {}
+        # Records by value of the field of every counts entry, or moments
+        # of the records by chunk of the ones without a field
+        self.counts = {}
+        self.sizes = {}
+
+    def add_numbers(self, field: str, values: np.ndarray):
+        values = values.astype(np.float64)
+        valid = ~np.isnan(values)
+        if not valid.all():
+            self.missing[field] = self.missing.get(field, 0) + int((~valid).sum())
+            values = values[valid]
+        if field not in self.moments:
+            self.moments[field] = Moments()
+            self.sketches[field] = QuantileSketch(self.profile.alpha)
+        self.moments[field].add(values)
+        self.sketches[field].add(values)
+
+    def add_distinct(self, field: str, values: np.ndarray):
+        if field not in self.distinct:
+            self.distinct[field] = HyperLogLog(self.profile.precision)
+        self.distinct[field].add(values)
+
+    def add_pair(self, pair: tuple, x: np.ndarray, y: np.ndarray):
+        x = x.astype(np.float64)
+        y = y.astype(np.float64)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        if pair not in self.comoments:
+            self.comoments[pair] = Comoments()
+        self.comoments[pair].add(x[valid], y[valid])
+
+    def add_counts(self, name: str, keys, counts):
+        counted = self.counts.setdefault(name, {})
+        for key, count in zip(keys, counts):
+            if key in counted:
+                counted[key] += count
+            elif len(counted) < self.profile.max_keys:
+                counted[key] = count
+            else:
+                self.profile.truncated.add(name)
+
+    def add_size(self, name: str, size: int):
+        if name not in self.sizes:
+            self.sizes[name] = Moments()
+        self.sizes[name].add(np.array([size], dtype=np.float64))
+
+    def merge(self, other: "GroupProfile"):
+        self.records += other.records
+        for field, missing in other.missing.items():
+            self.missing[field] = self.missing.get(field, 0) + missing
+        for field, moments in other.moments.items():
+            if field not in self.moments:
+                self.moments[field] = Moments()
+                self.sketches[field] = QuantileSketch(self.profile.alpha)
+            self.moments[field].merge(moments)
+            self.sketches[field].merge(other.sketches[field])
+        for field, sketch in other.distinct.items():
+            if field not in self.distinct:
+                self.distinct[field] = HyperLogLog(self.profile.precision)
+            self.distinct[field].merge(sketch)
+        for pair, comoments in other.comoments.items():
+            if pair not in self.comoments:
+                self.comoments[pair] = Comoments()
+            self.comoments[pair].merge(comoments)
+        for name, counted in other.counts.items():
+            self.add_counts(name, counted.keys(), counted.values())
+        for name, moments in other.sizes.items():
+            if name not in self.sizes:
+                self.sizes[name] = Moments()
+            self.sizes[name].merge(moments)
+
+    def report(self) -> dict:
+        fields = {}
+        for field, moments in self.moments.items():
+            variance = moments.variance()
+            quantiles = self.sketches[field].quantiles(
+                [p / 100 for p in self.profile.percentiles]
+            )
+            fields[field] = {
+                "count": moments.count,
+                "missing": self.missing.get(field, 0),
+                "min": moments.min if moments.count else None,
+                "max": moments.max if moments.count else None,
+                "mean": moments.mean if moments.count else None,
+                "std": math.sqrt(variance) if variance is not None else None,
+                **{
+                    # The exact extremes are tighter than the buckets holding them
+                    "p{:g}".format(percentile): (
+                        min(max(value, moments.min), moments.max)
+                        if value is not None
+                        else None
+                    )
+                    for percentile, value in zip(self.profile.percentiles, quantiles)
+                },
+            }
+        counts = {}
+        for name in list(self.counts) + list(self.sizes):
+            if name in self.counts:
+                counted = self.counts[name]
+                moments = Moments()
+                moments.add(np.fromiter(counted.values(), np.float64, len(counted)))
+            else:
+                moments = self.sizes[name]
+            variance = moments.variance()
+            counts[name] = {
+                "keys": moments.count,
+                "truncated": name in self.profile.truncated,
+                "min": moments.min if moments.count else None,
+                "max": moments.max if moments.count else None,
+                "mean": moments.mean if moments.count else None,
+                "variance": variance,
+                # Variance over mean, 1 for Poisson counts
+                "dispersion": (
+                    variance / moments.mean if moments.count and moments.mean else None
+                ),
+            }
+        return {
+            "records": self.records,
+            "fields": fields,
+            "distinct": {
+                field: sketch.count() for field, sketch in self.distinct.items()
+            },
+            "correlations": {
+                "{}:{}".format(*pair): comoments.report()
+                for pair, comoments in self.comoments.items()
+            },
+            "counts": counts,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "records": self.records,
+            "missing": self.missing,
+            "moments": {
+                field: moments.to_dict() for field, moments in self.moments.items()
+            },
+            "sketches": {
+                field: sketch.to_dict() for field, sketch in self.sketches.items()
+            },
+            "distinct": {
+                field: sketch.to_dict() for field, sketch in self.distinct.items()
+            },
+            "comoments": [
+                [list(pair), comoments.to_dict()]
+                for pair, comoments in self.comoments.items()
+            ],
+            # Pairs keep the types of the keys
+            "counts": {
+                name: [[key, count] for key, count in counted.items()]
+                for name, counted in self.counts.items()
+            },
+            "sizes": {name: moments.to_dict() for name, moments in self.sizes.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, profile: "DatasetProfile", state: dict) -> "GroupProfile":
+        result = cls(profile)
+        result.records = state["records"]
+        result.missing = dict(state["missing"])
+        result.moments = {
+            field: Moments.from_dict(moments)
+            for field, moments in state["moments"].items()
+        }
+        result.sketches = {
+            field: QuantileSketch.from_dict(sketch)
+            for field, sketch in state["sketches"].items()
+        }
+        result.distinct = {
+            field: HyperLogLog.from_dict(sketch)
+            for field, sketch in state["distinct"].items()
+        }
+        result.comoments = {
+            tuple(pair): Comoments.from_dict(comoments)
+            for pair, comoments in state["comoments"]
+        }
+        result.counts = {
+            name: {key: count for key, count in counted}
+            for name, counted in state["counts"].items()
+        }
+        result.sizes = {
+            name: Moments.from_dict(moments) for name, moments in state["sizes"].items()
+        }
+        return result
+
+
+def chunk_fields(chunk) -> list:
+    """Dotted fields of the records of a chunk"""
+    if isinstance(chunk, RecordBlock):
+        return list(chunk.columns)
+
+    def leaves(record: dict, prefix: str):
+        for key, value in record.items():
+            if isinstance(value, dict):
+                yield from leaves(value, prefix + key + ".")
+            else:
+                yield prefix + key
+
+    return list(leaves(chunk[0], "")) if chunk else []
+
+
+def profile_column(chunk, field: str):
+    """Values of a field for every record of a chunk, None if it is missing"""
+    if isinstance(chunk, RecordBlock) and field in chunk.columns:
+        if chunk.is_constant(field):
+            return np.full(len(chunk), chunk.columns[field])
+        return np.asarray(chunk.columns[field])
+    return chunk_column(chunk, field)
+
+
+class DatasetProfile:
+    """Profile of the records of a stream, gathered in one pass as they are
+    written, in constant memory, and saved as a json report.
+
+    Numeric fields get their count, min, max, mean, standard deviation
+    (merged chunk after chunk as Welford's algorithm does) and
+    ``percentiles`` from a QuantileSketch; ``distinct`` fields the number of
+    their distinct values, from a HyperLogLog sketch; ``correlations``
+    pairs of numeric fields their Pearson correlation and regression line.
+    ``counts`` entries, {"name": {"by": field, "where": field, "without":
+    field}}, count the records by value of their ``by`` field (up to
+    ``max_keys`` values), or by chunk without one, empty chunks included,
+    in the chunks holding their ``where`` field and not their ``without``
+    one, and give the mean, variance and dispersion of the counts.
+    ``fields`` and ``distinct`` default to all the numeric fields, and all
+    the integer and string fields.
+
+    Records are profiled by group of values of the ``group_by`` fields, and
+    the whole profile is the merge of the groups. Past ``max_groups``, the
+    records of new groups are profiled together, as "other_groups", and the
+    report is flagged "truncated". Everything merges, so
+    the profiles of shards saved with save_state merge into the profile of
+    the whole stream.
+    """
+
+    def __init__(
+        self,
+        output: str,
+        group_by=(),
+        fields=None,
+        distinct=None,
+        correlations=(),
+        counts=None,
+        percentiles=DEFAULT_PERCENTILES,
+        alpha: float = DEFAULT_ALPHA,
+        precision: int = DEFAULT_PRECISION,
+        max_groups: int = DEFAULT_MAX_GROUPS,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        partial: bool = False,
+    ):
+        self.output = output
+        self.group_by = tuple(group_by)
+        self.fields = None if fields is None else tuple(fields)
+        self.distinct = None if distinct is None else tuple(distinct)
+        self.correlations = tuple(tuple(pair) for pair in correlations)
+        self.counts = dict(counts or {})
+        self.percentiles = tuple(percentiles)
+        self.alpha = alpha
+        self.precision = precision
+        self.max_groups = max_groups
+        self.max_keys = max_keys
+        # Save the mergeable state rather than the report
+        self.partial = partial
+        # group values -> GroupProfile
+        self.groups = {}
+        # Records of the groups past max_groups
+        self.overflow = None
+        # counts entries past max_keys
+        self.truncated = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self.partial:
+            self.save_state(self.output)
+            return
+        with open(self.output, "w") as file:
+            file.write(json.dumps(self.report(), indent=4))
+
+    def stream(self, chunks):
+        """Yield the chunks, profiling them on the way"""
+        for chunk in chunks:
+            self.observe(chunk)
+            yield chunk
+
+    def group(self, key: tuple) -> GroupProfile:
+        if key not in self.groups:
+            if len(self.groups) == self.max_groups:
+                if self.overflow is None:
+                    self.overflow = GroupProfile(self)
+                return self.overflow
+            self.groups[key] = GroupProfile(self)
+        return self.groups[key]
+
+    def observe(self, chunk):
+        if not self.group_by:
+            # Empty chunks count too, as chunks of no record
+            return self.observe_group(self.group(()), chunk)
+        if len(chunk) == 0:
+            return
+        columns = [profile_column(chunk, field) for field in self.group_by]
+        if any(values is None for values in columns):
+            return
+        codes = []
+        keys = []
+        for values in columns:
+            values, inverse = np.unique(values, return_inverse=True)
+            keys.append(values)
+            codes.append(inverse.ravel())
+        groups, inverse = np.unique(
+            np.ravel_multi_index(codes, [len(values) for values in keys]),
+            return_inverse=True,
+        )
+        for number, group in enumerate(
+            zip(*np.unravel_index(groups, [len(values) for values in keys]))
+        ):
+            key = tuple(python_value(values[code]) for values, code in zip(keys, group))
+            selected = (
+                None if len(groups) == 1 else np.flatnonzero(inverse.ravel() == number)
+            )
+            self.observe_group(self.group(key), chunk, selected)
+
+    def observe_group(self, group: GroupProfile, chunk, selected=None):
+        """Profile the records of a chunk, or the ``selected`` ones"""
+        cache = {}
+
+        def column(field: str):
+            if field not in cache:
+                values = profile_column(chunk, field)
+                if values is not None and selected is not None:
+                    values = values[selected]
+                cache[field] = values
+            return cache[field]
+
+        group_records = len(chunk) if selected is None else len(selected)
+        group.records += group_records
+        fields = chunk_fields(chunk)
+        for field in fields if self.fields is None else self.fields:
+            values = column(field)
+            if values is not None and values.ndim == 1 and values.dtype.kind in "iuf":
+                group.add_numbers(field, values)
+        for field in fields if self.distinct is None else self.distinct:
+            values = column(field)
+            if values is not None and values.ndim == 1 and values.dtype.kind in "iuUS":
+                group.add_distinct(field, values)
+        for pair in self.correlations:
+            x, y = column(pair[0]), column(pair[1])
+            if x is not None and y is not None:
+                group.add_pair(pair, x, y)
+        for name, entry in self.counts.items():
+            if "where" in entry and column(entry["where"]) is None:
+                continue
+            if "without" in entry and column(entry["without"]) is not None:
+                continue
+            if "by" not in entry:
+                group.add_size(name, group_records)
+                continue
+            values = column(entry["by"])
+            if values is not None:
+                keys, counts = np.unique(values, return_counts=True)
+                group.add_counts(name, keys.tolist(), counts.tolist())
+
+    def merged(self) -> GroupProfile:
+        """Profile of all the groups"""
+        merged = GroupProfile(self)
+        for group in self.groups.values():
+            merged.merge(group)
+        if self.overflow is not None:
+            merged.merge(self.overflow)
+        return merged
+
+    def report(self) -> dict:
+        report = self.merged().report()
+        if self.group_by:
+            report["group_by"] = list(self.group_by)
+            report["groups"] = {
+                ",".join(str(value) for value in key): group.report()
+                for key, group in sorted(self.groups.items())
+            }
+            report["truncated"] = self.overflow is not None
+            if self.overflow is not None:
+                report["other_groups"] = self.overflow.report()
+        return report
+
+    def save_state(self, path: str):
+        with open(path, "w") as file:
+            file.write(
+                json.dumps(
+                    {
+                        "groups": [
+                            [list(key), group.to_dict()]
+                            for key, group in self.groups.items()
+                        ],
+                        "overflow": (
+                            None if self.overflow is None else self.overflow.to_dict()
+                        ),
+                        "truncated": sorted(self.truncated),
+                    }
+                )
+            )
+
+    def merge_state(self, path: str):
+        """Merge the profile saved by save_state, such as the one of a shard"""
+        with open(path) as file:
+            state = json.load(file)
+        self.truncated.update(state["truncated"])
+        for key, group in state["groups"]:
+            self.group(tuple(key)).merge(GroupProfile.from_dict(self, group))
+        if state["overflow"] is not None:
+            if self.overflow is None:
+                self.overflow = GroupProfile(self)
+            self.overflow.merge(GroupProfile.from_dict(self, state["overflow"]))
+
+
+def build_dataset_profile(spec: dict, generator, output: str) -> DatasetProfile:
+    """Profile of a use case: ``spec`` is its "dataset_profile" entry, True
+    or a dict over the dataset_profile_defaults of its generator, written to
+    its "output", next to ``output`` by default"""
+    spec = {
+        "output": os.path.splitext(output)[0] + PROFILE_SUFFIX,
+        **generator.dataset_profile_defaults,
+        **(spec if isinstance(spec, dict) else {}),
+    }
+    return DatasetProfile(
+        spec["output"],
+        partial=spec.get("partial", False),
+        **{option: spec[option] for option in PROFILE_OPTIONS if option in spec},
+    )
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Mean radius of the earth, as used by Elasticsearch geo distances
+EARTH_RADIUS_KM = 6371.0088
+
+
+def normalize_longitude(lon: np.ndarray) -> np.ndarray:
+    """Longitudes in degrees brought back to [-180, 180)"""
+    return (lon + 540.0) % 360.0 - 180.0
+
+
+def project_polar(lon, lat, bearing_deg: np.ndarray, distance_km: np.ndarray) -> tuple:
+    """lon, lat in degrees of the points ``distance_km`` away from the sites
+    lon, lat along ``bearing_deg`` (clockwise from the north), on a spherical
+    earth. Sites are scalars or arrays broadcast with the polar coordinates.
+    """
+    lon1 = np.radians(lon)
+    lat1 = np.radians(lat)
+    bearing = np.radians(bearing_deg)
+    angle = np.asarray(distance_km) / EARTH_RADIUS_KM
+    sin_lat1 = np.sin(lat1)
+    cos_lat1 = np.cos(lat1)
+    sin_angle = np.sin(angle)
+    cos_angle = np.cos(angle)
+
+    sin_lat2 = np.clip(
+        sin_lat1 * cos_angle + cos_lat1 * sin_angle * np.cos(bearing), -1.0, 1.0
+    )
+    lat2 = np.arcsin(sin_lat2)
+    lon2 = lon1 + np.arctan2(
+        np.sin(bearing) * sin_angle * cos_lat1, cos_angle - sin_lat1 * sin_lat2
+    )
+    return normalize_longitude(np.degrees(lon2)), np.degrees(lat2)
+
+
+def unit_vectors(lon, lat) -> np.ndarray:
+    """(..., 3) cartesian coordinates of lon, lat on the unit sphere"""
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), -1)
+
+
+def great_circle_points(lon1, lat1, lon2, lat2, fraction: np.ndarray) -> tuple:
+    """lon, lat in degrees of the points at ``fraction`` of the great circle
+    routes from lon1, lat1 to lon2, lat2"""
+    start = unit_vectors(lon1, lat1)
+    end = unit_vectors(lon2, lat2)
+    angle = np.arccos(np.clip(np.sum(start * end, axis=-1), -1.0, 1.0))
+    sin_angle = np.sin(angle)
+    # Routes between the same points stay there
+    moving = sin_angle > 1e-12
+    safe_sin = np.where(moving, sin_angle, 1.0)
+    start_weight = np.where(moving, np.sin((1 - fraction) * angle) / safe_sin, 1.0)
+    end_weight = np.where(moving, np.sin(fraction * angle) / safe_sin, 0.0)
+    points = start * start_weight[..., None] + end * end_weight[..., None]
+    lon = np.degrees(np.arctan2(points[..., 1], points[..., 0]))
+    lat = np.degrees(
+        np.arctan2(points[..., 2], np.hypot(points[..., 0], points[..., 1]))
+    )
+    return lon, lat
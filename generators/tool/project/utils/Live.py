@@ -0,0 +1,231 @@
+import datetime
+import sys
+import threading
+import time
+
+import numpy as np
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.utils.Columnar import RecordBlock, format_timestamps, slice_chunk
+
+DEFAULT_RATE = 1000
+TICK_S = 0.01
+REPORT_EVERY_S = 10
+
+
+class RateSchedule:
+    """Target events per second over time.
+
+    The rate ramps up linearly from 0 during ``ramp_s`` seconds, then holds
+    ``rate``. If ``burst_every_s`` is set, the rate becomes ``burst_rate``
+    during the first ``burst_s`` seconds of every period.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        ramp_s: float = 0,
+        burst_rate: float = None,
+        burst_every_s: float = None,
+        burst_s: float = 0,
+    ):
+        self.rate = rate
+        self.ramp_s = ramp_s
+        self.burst_rate = burst_rate
+        self.burst_every_s = burst_every_s
+        self.burst_s = burst_s
+
+    def rate_at(self, elapsed_s: float) -> float:
+        rate = self.rate
+        if (
+            self.burst_every_s
+            and self.burst_rate is not None
+            and elapsed_s % self.burst_every_s < self.burst_s
+        ):
+            rate = self.burst_rate
+        if self.ramp_s and elapsed_s < self.ramp_s:
+            rate = rate * elapsed_s / self.ramp_s
+        return rate
+
+
+class LiveReport:
+    def __init__(self, name: str):
+        self.name = name
+        self.emitted = 0
+        self.expected = 0.0
+        self.elapsed_s = 0.0
+        self.max_lag_s = 0.0
+        self.total_lag_s = 0.0
+        self.batches = 0
+
+    @property
+    def achieved_rate(self) -> float:
+        return self.emitted / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def target_rate(self) -> float:
+        return self.expected / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def mean_lag_s(self) -> float:
+        return self.total_lag_s / self.batches if self.batches else 0.0
+
+    def __str__(self) -> str:
+        return (
+            "{}: {} events in {:.1f}s, {:.1f} events/s for a target of {:.1f}, "
+            "lag mean {:.3f}s max {:.3f}s, backlog {} events".format(
+                self.name,
+                self.emitted,
+                self.elapsed_s,
+                self.achieved_rate,
+                self.target_rate,
+                self.mean_lag_s,
+                self.max_lag_s,
+                max(0, int(self.expected) - self.emitted),
+            )
+        )
+
+
+def stamp(chunk, field: str, style: str, now: datetime.datetime):
+    """Set the timestamp of every record of the chunk to the wall clock"""
+    value = format_timestamps(np.array([np.datetime64(now, "us")]), style)[0]
+    if isinstance(chunk, RecordBlock):
+        return RecordBlock({**chunk.columns, field: str(value)}, len(chunk))
+    for record in chunk:
+        record[field] = str(value)
+    return chunk
+
+
+class PacedEmitter:
+    """Emit chunks of records to a sink at the rate of a RateSchedule.
+
+    Emission is scheduled on absolute ticks of the monotonic clock, so time
+    lost generating or writing is caught up on the next ticks instead of
+    drifting the rate.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sink,
+        schedule: RateSchedule,
+        timestamp_field: str,
+        timestamp_style: str,
+        tick_s: float = TICK_S,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.sink = sink
+        self.schedule = schedule
+        self.timestamp_field = timestamp_field
+        self.timestamp_style = timestamp_style
+        self.tick_s = tick_s
+        self.clock = clock
+        self.sleep = sleep
+        self.report = LiveReport(name)
+
+    def run(self, chunks, duration_s: float = None) -> LiveReport:
+        start = self.clock()
+        due_s = 0.0
+        credit = 0.0
+        next_report_s = REPORT_EVERY_S
+
+        for chunk in chunks:
+            position = 0
+            while position < len(chunk):
+                elapsed_s = self.clock() - start
+                if duration_s is not None and elapsed_s >= duration_s:
+                    self.report.elapsed_s = elapsed_s
+                    return self.report
+                if credit < 1 and due_s > elapsed_s:
+                    self.sleep(due_s - elapsed_s)
+                    continue
+
+                while due_s <= elapsed_s:
+                    events = self.schedule.rate_at(due_s) * self.tick_s
+                    credit += events
+                    self.report.expected += events
+                    due_s += self.tick_s
+
+                count = min(int(credit), len(chunk) - position)
+                if count:
+                    batch = slice_chunk(chunk, position, position + count)
+                    batch = stamp(
+                        batch,
+                        self.timestamp_field,
+                        self.timestamp_style,
+                        datetime.datetime.utcnow(),
+                    )
+                    self.sink.write(batch)
+                    self.sink.flush()
+                    position += count
+                    credit -= count
+                    # Events still due, the last one emitted is late by as much
+                    rate = self.schedule.rate_at(elapsed_s)
+                    lag_s = int(credit) / rate if rate else 0.0
+                    self.report.emitted += count
+                    self.report.batches += 1
+                    self.report.total_lag_s += lag_s
+                    self.report.max_lag_s = max(self.report.max_lag_s, lag_s)
+
+                if elapsed_s >= next_report_s:
+                    self.report.elapsed_s = elapsed_s
+                    print(self.report, file=sys.stderr)
+                    next_report_s += REPORT_EVERY_S
+
+        self.report.elapsed_s = self.clock() - start
+        return self.report
+
+
+def run_live(emitters: list, streams: list, duration_s: float = None) -> list:
+    """Run one PacedEmitter per use case concurrently, each in its own thread"""
+    reports = [None] * len(emitters)
+
+    def run(index):
+        with emitters[index].sink:
+            reports[index] = emitters[index].run(streams[index], duration_s)
+
+    threads = [
+        threading.Thread(target=run, args=(index,)) for index in range(len(emitters))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for report in reports:
+        print(report, file=sys.stderr)
+    return reports
+
+
+def run_live_use_cases(
+    use_cases: dict,
+    sink: str = None,
+    rate: float = DEFAULT_RATE,
+    ramp_s: float = 0,
+    duration_s: float = None,
+) -> list:
+    """Replay every use case at its rate, set by the "live" entry of the use
+    case or else by ``rate`` and ``ramp_s``, to ``sink`` or else to the sink
+    of the use case. With a duration, payloads are generated again and again
+    until it is over.
+    """
+    emitters = []
+    streams = []
+    for name, use_case in use_cases.items():
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+        schedule = RateSchedule(
+            **{"rate": rate, "ramp_s": ramp_s, **use_case.get("live", {})}
+        )
+        emitters.append(
+            PacedEmitter(
+                name,
+                generator.buildSink(use_case["output_logs"], sink),
+                schedule,
+                generator.timestamp_field,
+                generator.timestamp_style,
+            )
+        )
+        streams.append(
+            generator.generateStream(use_case["payload"], duration_s is not None)
+        )
+    return run_live(emitters, streams, duration_s)
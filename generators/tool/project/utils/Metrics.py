@@ -0,0 +1,359 @@
+import contextlib
+import io
+import json
+import os
+import resource
+import time
+
+from project.generator.GeneratorFactory import GeneratorFactory
+
+PROFILERS = ("cprofile", "tracemalloc")
+PROMETHEUS_EXTENSIONS = (".prom", ".txt")
+# Lines of the profiles printed at the end of every use case
+PROFILE_TOP = 20
+
+
+def peak_rss_bytes() -> int:
+    """High-water mark of the resident memory of the process so far"""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class EntryMetrics:
+    """Time spent generating and writing the records of one payload entry"""
+
+    def __init__(self, payload_index: int):
+        self.payload_index = payload_index
+        self.generate_s = 0.0
+        self.write_s = 0.0
+        self.records = 0
+        self.bytes = 0
+        self.chunks = 0
+
+    def report(self) -> dict:
+        return {
+            "payload_index": self.payload_index,
+            "generate_s": self.generate_s,
+            "write_s": self.write_s,
+            "records": self.records,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+        }
+
+
+class UseCaseMetrics:
+    """Phases of one use case: building the generator, its payload entries,
+    closing the sink, and the memory high-water mark at its end"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.build_s = 0.0
+        self.close_s = 0.0
+        self.bytes = 0
+        self.peak_rss_bytes = 0
+        self.tracemalloc_peak_bytes = None
+        self.pipeline = None
+        self.entries = []
+
+    def entry(self, payload_index: int) -> EntryMetrics:
+        entry = EntryMetrics(payload_index)
+        self.entries.append(entry)
+        return entry
+
+    def timed(self, chunks, sink=None):
+        """Yield the chunks, timing how long they take to be generated and
+        how long the consumer takes to write them, or to queue them when
+        it is a pipeline, for the last payload entry started, and counting
+        the bytes they take in ``sink``"""
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            generated = time.perf_counter()
+            if chunk is None and not self.entries:
+                return
+            entry = self.entries[-1]
+            entry.generate_s += generated - start
+            if chunk is None:
+                return
+            entry.records += len(chunk)
+            entry.chunks += 1
+            written = sink.bytes if sink is not None else 0
+            yield chunk
+            entry.write_s += time.perf_counter() - generated
+            if sink is not None:
+                entry.bytes += sink.bytes - written
+
+    def report(self) -> dict:
+        generate_s = sum(entry.generate_s for entry in self.entries)
+        write_s = sum(entry.write_s for entry in self.entries)
+        records = sum(entry.records for entry in self.entries)
+        seconds = self.build_s + generate_s + write_s + self.close_s
+        if self.pipeline is not None:
+            # Stages overlap, the pipeline took as long as the slowest one
+            seconds = self.build_s + self.pipeline["seconds"] + self.close_s
+        return {
+            "build_s": self.build_s,
+            "generate_s": generate_s,
+            "write_s": write_s,
+            "close_s": self.close_s,
+            "seconds": seconds,
+            "records": records,
+            "bytes": self.bytes,
+            "records_per_s": records / seconds if seconds else 0.0,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "tracemalloc_peak_bytes": self.tracemalloc_peak_bytes,
+            "pipeline": self.pipeline,
+            "payload": [entry.report() for entry in self.entries],
+        }
+
+
+class RunMetrics:
+    """Metrics of a run, exported as json or in the Prometheus text format"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.use_cases = {}
+
+    def use_case(self, name: str) -> UseCaseMetrics:
+        self.use_cases[name] = UseCaseMetrics(name)
+        return self.use_cases[name]
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self.start
+
+    def report(self) -> dict:
+        return {
+            "seconds": self.seconds,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "use_case": {
+                name: use_case.report() for name, use_case in self.use_cases.items()
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        report = self.report()
+        lines = []
+
+        def metric(name, kind, description, samples):
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+            for labels, value in samples:
+                if value is None:
+                    continue
+                labels = ",".join(
+                    '{}="{}"'.format(key, label) for key, label in labels.items()
+                )
+                lines.append(
+                    "{}{} {}".format(name, "{" + labels + "}" if labels else "", value)
+                )
+
+        use_cases = report["use_case"]
+        metric(
+            "generator_run_seconds",
+            "gauge",
+            "Duration of the run",
+            [({}, report["seconds"])],
+        )
+        metric(
+            "generator_phase_seconds",
+            "gauge",
+            "Seconds spent in each phase of a use case",
+            [
+                ({"use_case": name, "phase": phase}, use_case[phase + "_s"])
+                for name, use_case in use_cases.items()
+                for phase in ("build", "generate", "write", "close")
+            ],
+        )
+        metric(
+            "generator_payload_seconds",
+            "gauge",
+            "Seconds spent generating and writing each payload entry",
+            [
+                (
+                    {
+                        "use_case": name,
+                        "payload": entry["payload_index"],
+                        "phase": phase,
+                    },
+                    entry[phase + "_s"],
+                )
+                for name, use_case in use_cases.items()
+                for entry in use_case["payload"]
+                for phase in ("generate", "write")
+            ],
+        )
+        metric(
+            "generator_records_total",
+            "counter",
+            "Records written by each payload entry",
+            [
+                (
+                    {"use_case": name, "payload": entry["payload_index"]},
+                    entry["records"],
+                )
+                for name, use_case in use_cases.items()
+                for entry in use_case["payload"]
+            ],
+        )
+        metric(
+            "generator_bytes_total",
+            "counter",
+            "Bytes written by each use case",
+            [
+                ({"use_case": name}, use_case["bytes"])
+                for name, use_case in use_cases.items()
+            ],
+        )
+        metric(
+            "generator_peak_rss_bytes",
+            "gauge",
+            "Resident memory high-water mark at the end of each use case",
+            [
+                ({"use_case": name}, use_case["peak_rss_bytes"])
+                for name, use_case in use_cases.items()
+            ],
+        )
+        metric(
+            "generator_tracemalloc_peak_bytes",
+            "gauge",
+            "Peak of the memory allocated by python during each use case",
+            [
+                ({"use_case": name}, use_case["tracemalloc_peak_bytes"])
+                for name, use_case in use_cases.items()
+            ],
+        )
+        stages = [
+            (name, stage, stats)
+            for name, use_case in use_cases.items()
+            if use_case["pipeline"] is not None
+            for stage, stats in use_case["pipeline"]["stages"].items()
+        ]
+        for field, metric_name, description in (
+            ("busy_s", "busy_seconds", "Seconds each pipeline stage spent working"),
+            ("starved_s", "starved_seconds", "Seconds each stage waited for input"),
+            ("blocked_s", "blocked_seconds", "Seconds each stage waited for room"),
+            ("records_per_s", "records_per_second", "Records per busy second"),
+            ("queue_depth_mean", "queue_depth_mean", "Mean depth of the output queue"),
+            ("queue_depth_max", "queue_depth_max", "Max depth of the output queue"),
+        ):
+            metric(
+                "generator_pipeline_" + metric_name,
+                "gauge",
+                description,
+                [
+                    ({"use_case": name, "stage": stage}, stats[field])
+                    for name, stage, stats in stages
+                ],
+            )
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: str):
+        """Json, or the Prometheus text format for .prom and .txt paths"""
+        if path.endswith(PROMETHEUS_EXTENSIONS):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.report(), indent=4) + "\n"
+        with open(path, "w") as file:
+            file.write(content)
+
+
+class Profiler:
+    """Profile one use case with cProfile or tracemalloc, the profile being
+    written to ``directory``/<use case>.prof or <use case>.tracemalloc.txt
+    and its top lines printed"""
+
+    def __init__(self, kind: str, directory: str, name: str, metrics: UseCaseMetrics):
+        if kind not in PROFILERS:
+            raise Exception("Unknown profiler {}".format(kind))
+        self.kind = kind
+        self.directory = directory
+        self.name = name
+        self.metrics = metrics
+        self.profile = None
+
+    def __enter__(self):
+        if self.kind == "cprofile":
+            import cProfile
+
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            import tracemalloc
+
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *args):
+        import pstats
+        import tracemalloc
+
+        os.makedirs(self.directory, exist_ok=True)
+        if self.kind == "cprofile":
+            self.profile.disable()
+            path = os.path.join(self.directory, "{}.prof".format(self.name))
+            self.profile.dump_stats(path)
+            output = io.StringIO()
+            pstats.Stats(self.profile, stream=output).sort_stats(
+                "cumulative"
+            ).print_stats(PROFILE_TOP)
+            text = output.getvalue()
+        else:
+            self.metrics.tracemalloc_peak_bytes = tracemalloc.get_traced_memory()[1]
+            statistics = tracemalloc.take_snapshot().statistics("lineno")
+            tracemalloc.stop()
+            path = os.path.join(self.directory, "{}.tracemalloc.txt".format(self.name))
+            text = "\n".join(str(statistic) for statistic in statistics)
+            with open(path, "w") as file:
+                file.write(text + "\n")
+            text = "\n".join(text.split("\n")[:PROFILE_TOP])
+        print("{}: {} profile in {}".format(self.name, self.kind, path))
+        print(text)
+
+
+def run_instrumented(
+    use_case: dict,
+    name: str,
+    metrics: RunMetrics,
+    profile: str = None,
+    profile_directory: str = ".",
+) -> UseCaseMetrics:
+    """Generate the dataset of a use case through generateDataset, timing
+    every phase of every payload entry, and profiling it if ``profile``"""
+    use_case_metrics = metrics.use_case(name)
+    profiler = contextlib.nullcontext()
+    if profile is not None:
+        profiler = Profiler(profile, profile_directory, name, use_case_metrics)
+    with profiler:
+        start = time.perf_counter()
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+        use_case_metrics.build_s = time.perf_counter() - start
+        writing = {}
+
+        def timed(chunks, sink, pipeline):
+            writing.update(sink=sink, pipeline=pipeline, start=time.perf_counter())
+            # A pipeline writes the chunks later than it takes them, their
+            # bytes are only known in total
+            return use_case_metrics.timed(chunks, sink if pipeline is None else None)
+
+        generator.generateDataset(
+            use_case["payload"],
+            use_case["output_logs"],
+            timed,
+            use_case_metrics.entry,
+        )
+        end = time.perf_counter()
+        pipeline = writing["pipeline"]
+        if pipeline is not None:
+            use_case_metrics.pipeline = pipeline.report()
+            written_s = pipeline.seconds
+        else:
+            written_s = sum(
+                entry.generate_s + entry.write_s for entry in use_case_metrics.entries
+            )
+        # What is left once every chunk is written, closing the sink
+        use_case_metrics.close_s = max(end - writing["start"] - written_s, 0.0)
+        use_case_metrics.bytes = writing["sink"].bytes
+    use_case_metrics.peak_rss_bytes = peak_rss_bytes()
+    return use_case_metrics
@@ -0,0 +1,186 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from project.generator.GeneratorFactory import GeneratorFactory
+from project.sink.SinkFactory import SinkFactory
+
+
+def plan_shards(use_cases: dict, parts_directories: dict) -> list:
+    """One task per shard of every payload entry of every use case, in output order"""
+    tasks = []
+    for name, use_case in use_cases.items():
+        generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+        for payload_index, conf in enumerate(use_case["payload"]):
+            for shard_index, shard in enumerate(generator.shards(conf)):
+                part = os.path.join(
+                    parts_directories[name],
+                    "{}-{:05d}-{:05d}.part".format(name, payload_index, shard_index),
+                )
+                tasks.append((name, use_case, shard, payload_index, shard_index, part))
+    return tasks
+
+
+ROLLUP_PART_SUFFIX = ".rollup"
+PROFILE_PART_SUFFIX = ".profile"
+
+
+def generate_shard(task):
+    name, use_case, conf, payload_index, shard_index, part = task
+    if use_case.get("rollup"):
+        # Summaries of the shard, merged with the ones of the other shards
+        use_case = {
+            **use_case,
+            "rollup": {
+                **use_case["rollup"],
+                "output_logs": part + ROLLUP_PART_SUFFIX,
+                "sink": "file",
+            },
+        }
+    if use_case.get("dataset_profile"):
+        # Mergeable profile of the shard
+        spec = use_case["dataset_profile"]
+        use_case = {
+            **use_case,
+            "dataset_profile": {
+                **(spec if isinstance(spec, dict) else {}),
+                "output": part + PROFILE_PART_SUFFIX,
+                "partial": True,
+            },
+        }
+    generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+    generator.writeChunks(
+        generator.generateShard(conf, payload_index, shard_index), part
+    )
+    return part
+
+
+def merge_parts(parts: list, output_path: str):
+    with open(output_path, "ab") as output:
+        for part in parts:
+            if os.path.exists(part):
+                with open(part, "rb") as file:
+                    shutil.copyfileobj(file, output, 1 << 22)
+                os.remove(part)
+
+
+def merge_parts_to_sink(parts: list, sink):
+    """Write json lines parts through a sink rolling between lines"""
+    with sink:
+        for part in parts:
+            if os.path.exists(part):
+                with open(part, "rb") as file:
+                    rest = b""
+                    for data in iter(lambda: file.read(1 << 22), b""):
+                        data = rest + data
+                        end = data.rfind(b"\n") + 1
+                        sink.write_lines(data[:end], data.count(b"\n", 0, end))
+                        rest = data[end:]
+                os.remove(part)
+
+
+def merge_rollup_parts(parts: list, rollup):
+    """Merge the summaries of the same groups of every shard and write them"""
+    from project.utils.Reader import JsonLinesReader
+
+    with rollup:
+        for part in parts:
+            path = part + ROLLUP_PART_SUFFIX
+            if os.path.exists(path):
+                with JsonLinesReader(path, persist_index=False) as summaries:
+                    rollup.merge_summaries(summaries)
+                os.remove(path)
+
+
+def merge_profile_parts(parts: list, profile):
+    """Merge the profiles of every shard and write the report"""
+    with profile:
+        for part in parts:
+            path = part + PROFILE_PART_SUFFIX
+            if os.path.exists(path):
+                profile.merge_state(path)
+                os.remove(path)
+
+
+def is_rotating(sink) -> bool:
+    return isinstance(sink, dict) and sink.get("type") == "rotating"
+
+
+def run_parallel(use_cases: dict, workers: int, root_seed: int = None) -> int:
+    """Generate every use case over a pool of ``workers`` processes.
+
+    Use cases, payload entries and the shards of a payload entry are
+    generated concurrently into part files, then appended in order to the
+    output of their use case. Use cases without a seed of their own are
+    seeded with ``root_seed``, drawn and printed if None, so the output is
+    the same as a serial run with that seed.
+    """
+    for name, use_case in use_cases.items():
+        if use_case.get("probe"):
+            # Shards would number their records from 0 each
+            raise Exception("{}: probes are stamped by serial runs".format(name))
+    if root_seed is None:
+        root_seed = np.random.SeedSequence().entropy
+        print("Root seed: {}".format(root_seed))
+    use_cases = {
+        name: {"seed": root_seed, **use_case} for name, use_case in use_cases.items()
+    }
+    # Sinks writing files of their own write them where a serial run would
+    for use_case in use_cases.values():
+        if "sink" in use_case:
+            use_case["sink"] = SinkFactory.SinkResolve(
+                use_case["sink"], use_case["output_logs"]
+            )
+    # Rotating outputs are rolled while merging plain parts
+    shard_use_cases = {
+        name: (
+            {**use_case, "sink": "file"}
+            if is_rotating(use_case.get("sink"))
+            else use_case
+        )
+        for name, use_case in use_cases.items()
+    }
+
+    # Parts are written next to their output so merging them stays on one disk
+    parts_directories = {
+        name: tempfile.mkdtemp(
+            prefix=".generator-parts-",
+            dir=os.path.dirname(os.path.abspath(use_case["output_logs"])),
+        )
+        for name, use_case in use_cases.items()
+    }
+    try:
+        tasks = plan_shards(shard_use_cases, parts_directories)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(generate_shard, task) for task in tasks]
+            for name, use_case in use_cases.items():
+                parts = [
+                    future.result()
+                    for future, task in zip(futures, tasks)
+                    if task[0] == name
+                ]
+                if is_rotating(use_case.get("sink")):
+                    generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+                    merge_parts_to_sink(
+                        parts,
+                        SinkFactory.SinkBuild(
+                            generator.sink, use_case["output_logs"], generator.encoder
+                        ),
+                    )
+                else:
+                    merge_parts(parts, use_case["output_logs"])
+                if use_case.get("rollup"):
+                    generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+                    merge_rollup_parts(parts, generator.buildRollup())
+                if use_case.get("dataset_profile"):
+                    generator = GeneratorFactory.GeneratorFromUseCase(use_case, name)
+                    merge_profile_parts(
+                        parts, generator.buildDatasetProfile(use_case["output_logs"])
+                    )
+    finally:
+        for directory in parts_directories.values():
+            shutil.rmtree(directory, ignore_errors=True)
+    return root_seed
@@ -0,0 +1,185 @@
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 4
+STAGES = ("generate", "encode", "write")
+# Seconds a blocked stage waits before checking whether another one failed
+POLL_S = 0.1
+
+_END = object()
+
+
+class PipelineStopped(Exception):
+    pass
+
+
+class StageStats:
+    """Time a stage spent working, waiting for its input (starved) and
+    waiting for room in its output queue (blocked), and the depth of its
+    output queue"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.chunks = 0
+        self.records = 0
+        self.bytes = 0
+        self.busy_s = 0.0
+        self.starved_s = 0.0
+        self.blocked_s = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def queued(self, depth: int):
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    def report(self, seconds: float) -> dict:
+        return {
+            "chunks": self.chunks,
+            "records": self.records,
+            "bytes": self.bytes,
+            "busy_s": self.busy_s,
+            "starved_s": self.starved_s,
+            "blocked_s": self.blocked_s,
+            "utilization": self.busy_s / seconds if seconds else 0.0,
+            "records_per_s": self.records / self.busy_s if self.busy_s else 0.0,
+            "queue_depth_mean": self.depth_total / self.chunks if self.chunks else 0.0,
+            "queue_depth_max": self.depth_max,
+        }
+
+
+class Pipeline:
+    """Generate, encode and write chunks concurrently.
+
+    Chunks are generated and encoded on threads of their own and written on
+    the calling thread, through bounded queues of ``queue_size`` chunks: a
+    stage running ahead blocks until the next one catches up, so at most
+    2 * queue_size chunks are in flight. The busiest stage is the
+    bottleneck of the run.
+    """
+
+    def __init__(self, sink, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.sink = sink
+        self.queue_size = queue_size
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self.stopped = threading.Event()
+        self.error = None
+        self.seconds = 0.0
+
+    def put(self, stage: StageStats, output: queue.Queue, item):
+        start = time.perf_counter()
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                output.put(item, timeout=POLL_S)
+                break
+            except queue.Full:
+                pass
+        stage.blocked_s += time.perf_counter() - start
+        if item is not _END:
+            stage.queued(output.qsize())
+
+    def get(self, stage: StageStats, source: queue.Queue):
+        start = time.perf_counter()
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                item = source.get(timeout=POLL_S)
+                break
+            except queue.Empty:
+                pass
+        stage.starved_s += time.perf_counter() - start
+        return item
+
+    def stage(self, function, *args):
+        """Run a stage on its thread, stopping the others if it fails"""
+        try:
+            function(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as error:
+            self.error = error
+            self.stopped.set()
+
+    def generate(self, chunks, output: queue.Queue):
+        stage = self.stats["generate"]
+        chunks = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, _END)
+            stage.busy_s += time.perf_counter() - start
+            if chunk is not _END:
+                stage.chunks += 1
+                stage.records += len(chunk)
+            self.put(stage, output, chunk)
+            if chunk is _END:
+                return
+
+    def encode(self, source: queue.Queue, output: queue.Queue):
+        stage = self.stats["encode"]
+        while True:
+            chunk = self.get(stage, source)
+            if chunk is _END:
+                self.put(stage, output, _END)
+                return
+            start = time.perf_counter()
+            data = self.sink.encode(chunk)
+            stage.busy_s += time.perf_counter() - start
+            stage.chunks += 1
+            stage.records += len(chunk)
+            self.put(stage, output, (data, len(chunk)))
+
+    def write(self, source: queue.Queue):
+        stage = self.stats["write"]
+        while True:
+            item = self.get(stage, source)
+            if item is _END:
+                return
+            data, records = item
+            start = time.perf_counter()
+            written = self.sink.bytes
+            self.sink.write_encoded_chunk(data, records)
+            stage.busy_s += time.perf_counter() - start
+            stage.chunks += 1
+            stage.records += records
+            stage.bytes += self.sink.bytes - written
+
+    def run(self, chunks) -> int:
+        """Write every chunk to the sink, return the number of records"""
+        start = time.perf_counter()
+        generated = queue.Queue(maxsize=self.queue_size)
+        encoded = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(
+                target=self.stage, args=(self.generate, chunks, generated), daemon=True
+            ),
+            threading.Thread(
+                target=self.stage, args=(self.encode, generated, encoded), daemon=True
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self.stage(self.write, encoded)
+        finally:
+            self.stopped.set()
+            for thread in threads:
+                thread.join()
+            self.seconds = time.perf_counter() - start
+        if self.error is not None:
+            raise self.error
+        return self.stats["write"].records
+
+    def report(self) -> dict:
+        stages = {
+            name: stats.report(self.seconds) for name, stats in self.stats.items()
+        }
+        return {
+            "seconds": self.seconds,
+            "queue_size": self.queue_size,
+            "bottleneck": max(stages, key=lambda name: stages[name]["busy_s"]),
+            "stages": stages,
+        }
@@ -0,0 +1,173 @@
+import json
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+INDEX_SUFFIX = ".idx"
+# Newlines are searched block by block, so building the index of a large
+# file never maps more than this in numpy at once
+INDEX_BLOCK_SIZE = 1 << 26
+
+
+def iter_line_blocks(data, block_size: int = INDEX_BLOCK_SIZE):
+    """(start, end) offsets of the non empty lines of a buffer, as (n, 2)
+    arrays, block after block"""
+    size = len(data)
+    start = 0
+    for block_start in range(0, size, block_size):
+        block = np.frombuffer(
+            data,
+            dtype=np.uint8,
+            count=min(block_size, size - block_start),
+            offset=block_start,
+        )
+        ends = np.flatnonzero(block == 10).astype(np.int64) + block_start
+        # The last line may lack its newline
+        if block_start + len(block) == size and (
+            len(ends) == 0 or ends[-1] != size - 1
+        ):
+            ends = np.append(ends, size)
+        if len(ends) == 0:
+            continue
+        starts = np.concatenate(([start], ends[:-1] + 1)).astype(np.int64)
+        start = int(ends[-1]) + 1
+        lines = np.stack((starts, ends), axis=1)
+        yield lines[lines[:, 1] > lines[:, 0]]
+
+
+def build_line_index(data, block_size: int = INDEX_BLOCK_SIZE) -> np.ndarray:
+    """(start, end) offsets of every non empty line of a buffer, as an (n, 2)
+    array in memory"""
+    return np.concatenate(
+        [np.empty((0, 2), dtype=np.int64), *iter_line_blocks(data, block_size)]
+    )
+
+
+def write_line_index(data, path: str, header) -> np.ndarray:
+    """Write the line index of a buffer to the .npy file ``path``, after a
+    ``header`` row, block after block through a memory map; return the
+    mapped lines"""
+    count = sum(len(lines) for lines in iter_line_blocks(data))
+    index = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.int64, shape=(count + 1, 2)
+    )
+    index[0] = header
+    position = 1
+    for lines in iter_line_blocks(data):
+        index[position : position + len(lines)] = lines
+        position += len(lines)
+    index.flush()
+    return index[1:]
+
+
+class JsonLinesReader:
+    """Lazy, random access reader of a json lines file.
+
+    The file is memory-mapped and the offsets of its lines are indexed on
+    first open, then kept next to it in ``path``.idx so that later opens
+    start at once. The index is memory-mapped too, 16 bytes a line on disk
+    rather than in memory. Records are only parsed when read, one at a time.
+    """
+
+    def __init__(self, path: str, persist_index: bool = True):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.persist_index = persist_index
+        self.file = None
+        self.data = None
+        self.lines = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        if self.lines is not None:
+            return
+        self.file = open(self.path, "rb")
+        stat = os.fstat(self.file.fileno())
+        # An empty file cannot be mapped
+        self.data = (
+            mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if stat.st_size
+            else b""
+        )
+        self.lines = self.load_index(stat)
+        if self.lines is None:
+            self.lines = self.build_index(stat)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.data = None
+        self.lines = None
+
+    def load_index(self, stat) -> np.ndarray:
+        """Persisted index, if it was built for this very version of the file"""
+        try:
+            index = np.load(self.index_path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if index.ndim != 2 or len(index) == 0:
+            return None
+        if tuple(index[0]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        return index[1:]
+
+    def build_index(self, stat) -> np.ndarray:
+        """Index the lines in ``path``.idx, or in a temporary file when it is
+        not to be kept or cannot be written"""
+        header = (stat.st_size, stat.st_mtime_ns)
+        if self.persist_index:
+            temporary = self.index_path + ".tmp"
+            try:
+                lines = write_line_index(self.data, temporary, header)
+                os.replace(temporary, self.index_path)
+                return lines
+            except OSError:
+                # Read-only directory, the index is rebuilt on every open
+                pass
+        descriptor, temporary = tempfile.mkstemp(suffix=INDEX_SUFFIX)
+        os.close(descriptor)
+        try:
+            return write_line_index(self.data, temporary, header)
+        finally:
+            # Mapped already, the file goes once the reader is closed
+            os.remove(temporary)
+
+    def __len__(self) -> int:
+        self.open()
+        return len(self.lines)
+
+    def record(self, number: int):
+        start, end = self.lines[number]
+        return json.loads(self.data[start:end])
+
+    def __getitem__(self, item):
+        self.open()
+        if isinstance(item, slice):
+            return list(self.range(*item.indices(len(self.lines))))
+        return self.record(item)
+
+    def range(self, start: int, stop: int = None, step: int = 1):
+        """Yield the records [start, stop) one by one"""
+        self.open()
+        for number in range(start, len(self.lines) if stop is None else stop, step):
+            yield self.record(number)
+
+    def __iter__(self):
+        return self.range(0)
+
+    def chunks(self, chunk_size: int):
+        """Yield the records by lists of ``chunk_size``"""
+        self.open()
+        for start in range(0, len(self.lines), chunk_size):
+            yield list(self.range(start, min(start + chunk_size, len(self.lines))))
@@ -1,32 +1,41 @@
-import json
 import datetime
-from elasticsearch import Elasticsearch, helpers
+from itertools import chain
 
+from project.sink.ElasticsearchSink import get_client
+from project.utils.Reader import JsonLinesReader
 
-def load_json_file(path):
-    data = []
-    file = open(path, "r")
-    for line in file.readlines():
-        data.append(json.loads(line))
-    return data
 
+def write_to_es(datas, index, nodes, port, bulk_size, login, password, thread_count=4):
+    from elasticsearch import helpers
 
-def write_to_es(datas, index, nodes, port, bulk_size, login, password):
-    client: Elasticsearch = Elasticsearch(
-        nodes=nodes, port=port, http_auth=(login, password)
-    )
-    actions: List = [
+    client = get_client(nodes, port, login, password, maxsize=thread_count)
+    actions = (
         {"_index": index, "_source": {**data, "@timestamp": datetime.datetime.utcnow()}}
         for data in datas
-    ]
-    helpers.bulk(
-        client=client, actions=actions, chunk_size=bulk_size, request_timeout=60
     )
+    for ok, item in helpers.parallel_bulk(
+        client=client,
+        actions=actions,
+        chunk_size=bulk_size,
+        thread_count=thread_count,
+        request_timeout=60,
+    ):
+        pass
 
 
 if __name__ == "__main__":
 
     print("Push Referentiels")
-    datas = load_json_file("/data/world_map.json")
-    datas[0]["transform"]["translate"][0] = float(datas[0]["transform"]["translate"][0])
-    write_to_es(datas, "world-map", "localhost", "9200", 100, "", "")
+    # Records are parsed as the bulk requests need them, not all at once
+    with JsonLinesReader("/data/world_map.json") as datas:
+        first = datas[0]
+        first["transform"]["translate"][0] = float(first["transform"]["translate"][0])
+        write_to_es(
+            chain([first], datas.range(1)),
+            "world-map",
+            "localhost",
+            "9200",
+            100,
+            "",
+            "",
+        )
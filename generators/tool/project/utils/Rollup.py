@@ -0,0 +1,448 @@
+import math
+
+import numpy as np
+
+from project.sink.SinkFactory import SinkFactory
+from project.utils.Columnar import (
+    TIMESTAMP_STR,
+    RecordBlock,
+    format_timestamps,
+    parse_timestamps,
+)
+
+DEFAULT_INTERVAL_S = 60
+DEFAULT_PERCENTILES = (50, 95, 99)
+# Relative error of the quantiles of the sketches
+DEFAULT_ALPHA = 0.01
+# Groups kept in memory before the oldest buckets are written
+DEFAULT_MAX_GROUPS = 100000
+# Summaries written at once
+SUMMARY_CHUNK_SIZE = 1000
+ROLLUP_OPTIONS = (
+    "interval_s",
+    "timestamp_field",
+    "group_by",
+    "histograms",
+    "stats",
+    "quantiles",
+    "percentiles",
+    "alpha",
+    "max_groups",
+)
+
+
+def get_path(record: dict, field: str):
+    """Value of a dotted field of a nested record, None if it is missing"""
+    for key in field.split("."):
+        if not isinstance(record, dict) or key not in record:
+            return None
+        record = record[key]
+    return record
+
+
+def set_path(record: dict, field: str, value):
+    keys = field.split(".")
+    for key in keys[:-1]:
+        record = record.setdefault(key, {})
+    record[keys[-1]] = value
+
+
+def chunk_column(chunk, field: str):
+    """Values of a field for every record of a chunk, None if it is missing"""
+    if isinstance(chunk, RecordBlock):
+        if field not in chunk.columns:
+            return None
+        return np.asarray(chunk.column(field))
+    values = [get_path(record, field) for record in chunk]
+    if any(value is None for value in values):
+        return None
+    return np.asarray(values)
+
+
+def python_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class QuantileSketch:
+    """Mergeable sketch of a distribution, answering its quantiles within a
+    relative error of ``alpha``.
+
+    Values are counted in buckets of logarithmically growing width, as in
+    DDSketch: bucket k of the positive values holds (gamma^(k-1), gamma^k].
+    Buckets are keyed 4 * k + 2 for positive values, 4 * k for negative ones
+    and 1 for zero, so sketches of the same alpha merge by adding counts.
+    """
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.counts = {}
+
+    def keys(self, values: np.ndarray) -> np.ndarray:
+        magnitudes = np.abs(values)
+        signs = np.sign(values).astype(np.int64)
+        with np.errstate(divide="ignore"):
+            exponents = np.ceil(np.log(magnitudes) / math.log(self.gamma))
+        exponents = np.where(signs == 0, 0, exponents).astype(np.int64)
+        return exponents * 4 + signs + 1
+
+    def add_counts(self, keys, counts):
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        keys, counts = np.unique(
+            self.keys(values[~np.isnan(values)]), return_counts=True
+        )
+        self.add_counts(keys, counts)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.alpha != self.alpha:
+            raise Exception(
+                "Sketches of alpha {} and {}".format(self.alpha, other.alpha)
+            )
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def values(self, keys: np.ndarray) -> np.ndarray:
+        """Value standing for the buckets, within alpha of all their values"""
+        signs = keys % 4 - 1
+        exponents = (keys - signs - 1) // 4
+        return signs * 2 * self.gamma ** exponents.astype(np.float64) / (self.gamma + 1)
+
+    def quantiles(self, quantiles) -> list:
+        if not self.counts:
+            return [None for _ in quantiles]
+        keys = np.fromiter(self.counts, dtype=np.int64, count=len(self.counts))
+        values = self.values(keys)
+        order = np.argsort(values)
+        values = values[order]
+        cumulative = np.cumsum([self.counts[key] for key in keys[order].tolist()])
+        ranks = np.asarray(quantiles, dtype=np.float64) * (cumulative[-1] - 1)
+        return values[np.searchsorted(cumulative, ranks, "right")].tolist()
+
+    def to_dict(self) -> dict:
+        keys = sorted(self.counts)
+        return {
+            "alpha": self.alpha,
+            "keys": keys,
+            "counts": [self.counts[key] for key in keys],
+        }
+
+    @classmethod
+    def from_dict(cls, sketch: dict) -> "QuantileSketch":
+        result = cls(sketch["alpha"])
+        result.counts = dict(zip(sketch["keys"], sketch["counts"]))
+        return result
+
+
+class GroupAggregate:
+    """Aggregates of the records of one time bucket and group"""
+
+    def __init__(self, rollup: "Rollup"):
+        self.count = 0
+        self.histograms = {field: {} for field in rollup.histograms}
+        # min, max, sum and count of the values that are numbers
+        self.stats = {
+            field: [math.inf, -math.inf, 0.0, 0] for field in rollup.stat_fields
+        }
+        self.sketches = {
+            field: QuantileSketch(rollup.alpha) for field in rollup.quantiles
+        }
+
+    def merge(self, other: "GroupAggregate"):
+        self.count += other.count
+        for field, histogram in other.histograms.items():
+            for value, count in histogram.items():
+                self.histograms[field][value] = (
+                    self.histograms[field].get(value, 0) + count
+                )
+        for field, (low, high, total, count) in other.stats.items():
+            stats = self.stats[field]
+            stats[0] = min(stats[0], low)
+            stats[1] = max(stats[1], high)
+            stats[2] += total
+            stats[3] += count
+        for field, sketch in other.sketches.items():
+            self.sketches[field].merge(sketch)
+
+    def summary(self, rollup: "Rollup", summary: dict):
+        set_path(summary, "rollup.count", self.count)
+        for field, histogram in self.histograms.items():
+            set_path(
+                summary,
+                field + ".histogram",
+                {str(value): count for value, count in sorted(histogram.items())},
+            )
+        for field, (low, high, total, count) in self.stats.items():
+            set_path(
+                summary,
+                field,
+                {
+                    "min": low if count else None,
+                    "max": high if count else None,
+                    "mean": total / count if count else None,
+                    "sum": total,
+                    "count": count,
+                },
+            )
+        for field, sketch in self.sketches.items():
+            quantiles = sketch.quantiles([p / 100 for p in rollup.percentiles])
+            low, high = self.stats[field][:2]
+            for percentile, value in zip(rollup.percentiles, quantiles):
+                # The exact extremes are tighter than the buckets holding them
+                if value is not None:
+                    value = min(max(value, low), high)
+                set_path(summary, "{}.p{:g}".format(field, percentile), value)
+            set_path(summary, field + ".sketch", sketch.to_dict())
+
+    @classmethod
+    def from_summary(cls, rollup: "Rollup", summary: dict) -> "GroupAggregate":
+        aggregate = cls(rollup)
+        aggregate.count = get_path(summary, "rollup.count")
+        for field in rollup.histograms:
+            # Values are the keys of json objects, strings from now on
+            aggregate.histograms[field] = dict(get_path(summary, field + ".histogram"))
+        for field in rollup.stat_fields:
+            stats = get_path(summary, field)
+            if stats["count"]:
+                aggregate.stats[field] = [
+                    stats["min"],
+                    stats["max"],
+                    stats["sum"],
+                    stats["count"],
+                ]
+        for field in rollup.quantiles:
+            aggregate.sketches[field] = QuantileSketch.from_dict(
+                get_path(summary, field + ".sketch")
+            )
+        return aggregate
+
+
+class Rollup:
+    """Summaries of the records of a stream by time bucket, written to a sink
+    of their own as the records go by.
+
+    Records are grouped by bucket of ``interval_s`` seconds of their
+    ``timestamp_field`` and by the values of the ``group_by`` fields. Each
+    group keeps its count, the histogram of the values of the
+    ``histograms`` fields, min / max / mean of the ``stats`` and
+    ``quantiles`` fields, and a QuantileSketch of the ``quantiles`` fields
+    giving their ``percentiles``. Chunks missing one of the fields, such as
+    the user blocks of Usage, are not summarized.
+
+    Summaries are written when the rollup is closed, bucket after bucket;
+    past ``max_groups`` groups the oldest buckets are written at once, and
+    records arriving later for them start new partial summaries of the same
+    bucket. Summaries carry their sketches, so merge_summaries merges
+    partial ones exactly.
+    """
+
+    def __init__(
+        self,
+        sink,
+        timestamp_field: str,
+        interval_s: float = DEFAULT_INTERVAL_S,
+        group_by=(),
+        histograms=(),
+        stats=(),
+        quantiles=(),
+        percentiles=DEFAULT_PERCENTILES,
+        alpha: float = DEFAULT_ALPHA,
+        max_groups: int = DEFAULT_MAX_GROUPS,
+        timestamp_style: str = TIMESTAMP_STR,
+    ):
+        self.sink = sink
+        self.timestamp_field = timestamp_field
+        self.interval_s = interval_s
+        self.interval_us = int(interval_s * 1000000)
+        self.group_by = tuple(group_by)
+        self.histograms = tuple(histograms)
+        self.quantiles = tuple(quantiles)
+        self.stat_fields = tuple(stats) + tuple(
+            field for field in self.quantiles if field not in stats
+        )
+        self.percentiles = tuple(percentiles)
+        self.alpha = alpha
+        self.max_groups = max_groups
+        self.timestamp_style = timestamp_style
+        self.fields = (
+            (timestamp_field,) + self.group_by + self.histograms + self.stat_fields
+        )
+        # (bucket, group values...) -> GroupAggregate
+        self.groups = {}
+        self.summaries = 0
+
+    def __enter__(self):
+        self.sink.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.flush(list(self.groups))
+        self.sink.close()
+
+    def stream(self, chunks):
+        """Yield the chunks, summarizing them on the way"""
+        for chunk in chunks:
+            self.observe(chunk)
+            yield chunk
+
+    def observe(self, chunk):
+        columns = {field: chunk_column(chunk, field) for field in self.fields}
+        if len(chunk) == 0 or any(values is None for values in columns.values()):
+            return
+        timestamps = parse_timestamps(columns[self.timestamp_field]).astype(np.int64)
+        codes = []
+        keys = []
+        for values in [timestamps // self.interval_us] + [
+            columns[field] for field in self.group_by
+        ]:
+            values, inverse = np.unique(values, return_inverse=True)
+            keys.append(values)
+            codes.append(inverse.ravel())
+        groups, inverse = np.unique(
+            np.ravel_multi_index(codes, [len(values) for values in keys]),
+            return_inverse=True,
+        )
+        inverse = inverse.ravel()
+        group_number = len(groups)
+        chunk_groups = [GroupAggregate(self) for _ in range(group_number)]
+        for aggregate, count in zip(
+            chunk_groups, np.bincount(inverse, minlength=group_number).tolist()
+        ):
+            aggregate.count = count
+
+        for field in self.histograms:
+            values, value_inverse = np.unique(columns[field], return_inverse=True)
+            pairs, counts = np.unique(
+                inverse * len(values) + value_inverse.ravel(), return_counts=True
+            )
+            for pair, count in zip(pairs.tolist(), counts.tolist()):
+                chunk_groups[pair // len(values)].histograms[field][
+                    python_value(values[pair % len(values)])
+                ] = count
+
+        for field in self.stat_fields:
+            values = columns[field].astype(np.float64)
+            valid = ~np.isnan(values)
+            group_values = inverse[valid]
+            values = values[valid]
+            lows = np.full(group_number, math.inf)
+            highs = np.full(group_number, -math.inf)
+            np.minimum.at(lows, group_values, values)
+            np.maximum.at(highs, group_values, values)
+            totals = np.bincount(group_values, values, minlength=group_number)
+            counts = np.bincount(group_values, minlength=group_number)
+            for aggregate, low, high, total, count in zip(
+                chunk_groups,
+                lows.tolist(),
+                highs.tolist(),
+                totals.tolist(),
+                counts.tolist(),
+            ):
+                aggregate.stats[field] = [low, high, total, count]
+
+            if field in self.quantiles:
+                sketch_keys = chunk_groups[0].sketches[field].keys(values)
+                sketch_values, sketch_inverse = np.unique(
+                    sketch_keys, return_inverse=True
+                )
+                pairs, counts = np.unique(
+                    group_values * len(sketch_values) + sketch_inverse.ravel(),
+                    return_counts=True,
+                )
+                pair_groups = pairs // len(sketch_values)
+                bounds = np.searchsorted(pair_groups, np.arange(group_number + 1))
+                for number, aggregate in enumerate(chunk_groups):
+                    start, end = bounds[number], bounds[number + 1]
+                    aggregate.sketches[field].add_counts(
+                        sketch_values[pairs[start:end] % len(sketch_values)],
+                        counts[start:end],
+                    )
+
+        for group, aggregate in zip(
+            zip(*np.unravel_index(groups, [len(values) for values in keys])),
+            chunk_groups,
+        ):
+            key = tuple(python_value(values[code]) for values, code in zip(keys, group))
+            if key in self.groups:
+                self.groups[key].merge(aggregate)
+            else:
+                self.groups[key] = aggregate
+
+        if len(self.groups) > self.max_groups:
+            self.evict()
+
+    def evict(self):
+        """Write the oldest buckets until half of max_groups are left"""
+        keys = sorted(self.groups)
+        last = keys[len(keys) - self.max_groups // 2 - 1][0]
+        self.flush([key for key in keys if key[0] <= last])
+
+    def summary(self, key: tuple, aggregate: GroupAggregate) -> dict:
+        bucket = np.array([key[0] * self.interval_us], dtype="datetime64[us]")
+        summary = {
+            self.timestamp_field: str(
+                format_timestamps(bucket, self.timestamp_style)[0]
+            )
+        }
+        for field, value in zip(self.group_by, key[1:]):
+            set_path(summary, field, value)
+        set_path(summary, "rollup.interval_s", self.interval_s)
+        aggregate.summary(self, summary)
+        return summary
+
+    def flush(self, keys: list):
+        keys = sorted(keys)
+        for start in range(0, len(keys), SUMMARY_CHUNK_SIZE):
+            self.sink.write(
+                [
+                    self.summary(key, self.groups.pop(key))
+                    for key in keys[start : start + SUMMARY_CHUNK_SIZE]
+                ]
+            )
+        self.summaries += len(keys)
+
+    def key(self, summary: dict) -> tuple:
+        """Key of the group of a summary"""
+        bucket = parse_timestamps([summary[self.timestamp_field]]).astype(np.int64)
+        return (int(bucket[0]) // self.interval_us,) + tuple(
+            get_path(summary, field) for field in self.group_by
+        )
+
+    def merge_summaries(self, summaries):
+        """Merge summaries of the same groups, such as the partial ones of
+        several shards, and write them"""
+        for summary in summaries:
+            key = self.key(summary)
+            aggregate = GroupAggregate.from_summary(self, summary)
+            if key in self.groups:
+                self.groups[key].merge(aggregate)
+            else:
+                self.groups[key] = aggregate
+
+
+def build_rollup(spec: dict, generator) -> Rollup:
+    """Rollup of a use case: ``spec`` is its "rollup" entry, over the
+    rollup_defaults of its generator, with the output_logs and optional sink
+    of the summaries"""
+    spec = {
+        "timestamp_field": generator.timestamp_field,
+        **generator.rollup_defaults,
+        **spec,
+    }
+    sink = SinkFactory.SinkBuild(
+        spec.get("sink", "file"), spec["output_logs"], generator.encoder
+    )
+    return Rollup(
+        sink,
+        timestamp_style=generator.timestamp_style,
+        **{option: spec[option] for option in ROLLUP_OPTIONS if option in spec},
+    )
@@ -0,0 +1,215 @@
+import json
+from itertools import chain, repeat
+from json.encoder import encode_basestring_ascii
+
+import numpy as np
+
+from project.utils.Columnar import RecordBlock, nest_fields
+
+DEFAULT_ENCODER = "template"
+DEFAULT_BUFFER_SIZE = 1 << 22
+# Columns with at least this many values per run of equal values are
+# encoded run by run
+RUN_ENCODING_RATIO = 8
+
+
+def _numpy_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(
+        "Object of type {} is not JSON serializable".format(type(value).__name__)
+    )
+
+
+# Same settings as json.dumps, so lines are byte-identical to what the
+# generators always wrote
+_JSON_ENCODER = json.JSONEncoder(default=_numpy_default)
+
+
+def _encode_json(record) -> bytes:
+    return _JSON_ENCODER.encode(record).encode("utf-8")
+
+
+def _load_orjson():
+    import orjson
+
+    option = orjson.OPT_SERIALIZE_NUMPY
+
+    def encode(record) -> bytes:
+        return orjson.dumps(record, default=_numpy_default, option=option)
+
+    return encode
+
+
+def _load_ujson():
+    import ujson
+
+    def encode(record) -> bytes:
+        return ujson.dumps(record, default=_numpy_default).encode("utf-8")
+
+    return encode
+
+
+_ENCODER_LOADERS = {"orjson": _load_orjson, "ujson": _load_ujson}
+
+
+def get_record_encoder(name: str):
+    """Function encoding one record to a json line (without the newline).
+
+    "json" and "template" use the standard library; "orjson" and "ujson" are
+    faster but write compact json, and fall back to the standard library
+    when they are not installed.
+    """
+    if name in ("json", DEFAULT_ENCODER):
+        return _encode_json
+    if name not in _ENCODER_LOADERS:
+        raise Exception("Unknown encoder {}".format(name))
+    try:
+        return _ENCODER_LOADERS[name]()
+    except ImportError:
+        print("Encoder {} is not installed, default json".format(name))
+        return _encode_json
+
+
+def encode_runs(values: np.ndarray):
+    """Encoded column of an array made of a few runs of equal values, e.g.
+    the fields of the records of a handful of sources, None otherwise"""
+    if len(values) < 2 or values.dtype.kind not in "fiuU":
+        return None
+    starts = np.flatnonzero(values[1:] != values[:-1]) + 1
+    if len(starts) * RUN_ENCODING_RATIO >= len(values):
+        return None
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.append(starts, len(values)))
+    encoded = encode_column(values[starts])
+    return list(chain.from_iterable(map(repeat, encoded, lengths.tolist())))
+
+
+def encode_column(values) -> list:
+    """Encode every value of a column to its json text, as json.dumps would"""
+    if isinstance(values, np.ndarray):
+        runs = encode_runs(values)
+        if runs is not None:
+            return runs
+        kind = values.dtype.kind
+        if kind == "f" and np.isfinite(values).all():
+            return list(map(float.__repr__, values.tolist()))
+        if kind in "iu":
+            return list(map(int.__repr__, values.tolist()))
+        if kind == "U":
+            return list(map(encode_basestring_ascii, values.tolist()))
+        values = values.tolist()
+    return list(map(_JSON_ENCODER.encode, values))
+
+
+def compile_json_template(fields: tuple, constants: dict) -> str:
+    """%-format template producing one json line from the encoded columns.
+
+    ``constants`` maps the index of the constant fields to their encoded
+    value, every other field becomes a positional placeholder.
+    """
+
+    def render(node):
+        members = []
+        for name, value in node.items():
+            if isinstance(value, dict):
+                member = render(value)
+            elif value in constants:
+                member = constants[value].replace("%", "%%")
+            else:
+                member = "%s"
+            members.append(
+                "{}: {}".format(
+                    encode_basestring_ascii(name).replace("%", "%%"), member
+                )
+            )
+        return "{{{}}}".format(", ".join(members))
+
+    return render(nest_fields(fields))
+
+
+def encode_block(block: RecordBlock) -> bytes:
+    """Encode a whole block to json lines through a precompiled template"""
+    fields = tuple(block.columns)
+    constants = {
+        index: _JSON_ENCODER.encode(block.columns[field])
+        for index, field in enumerate(fields)
+        if block.is_constant(field)
+    }
+    template = compile_json_template(fields, constants)
+    columns = [
+        encode_column(block.columns[field])
+        for index, field in enumerate(fields)
+        if index not in constants
+    ]
+    if columns:
+        lines = map(template.__mod__, zip(*columns))
+    else:
+        lines = [template % ()] * len(block)
+    text = "\n".join(lines)
+    return (text + "\n").encode("utf-8") if text else b""
+
+
+class ChunkEncoder:
+    """Encode whole chunks, rows or columnar blocks, to json lines"""
+
+    def __init__(self, encoder: str = DEFAULT_ENCODER):
+        self.use_template = encoder == DEFAULT_ENCODER
+        self.encode_record = get_record_encoder(encoder)
+
+    def encode(self, chunk) -> bytes:
+        if isinstance(chunk, RecordBlock):
+            if self.use_template:
+                return encode_block(chunk)
+            chunk = chunk.rows()
+        if not chunk:
+            return b""
+        return b"\n".join(map(self.encode_record, chunk)) + b"\n"
+
+
+class JsonLinesWriter:
+    """Append records to a json lines file through a large write buffer"""
+
+    def __init__(
+        self,
+        output_path: str,
+        encoder: str = DEFAULT_ENCODER,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        self.output_path = output_path
+        self.chunk_encoder = ChunkEncoder(encoder)
+        self.buffer_size = buffer_size
+        self.file = None
+        self.records = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        self.file = open(self.output_path, "ab", buffering=self.buffer_size)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def encode(self, chunk) -> bytes:
+        return self.chunk_encoder.encode(chunk)
+
+    def write_encoded(self, data: bytes, records: int):
+        self.file.write(data)
+        self.records += records
+        self.bytes += len(data)
+
+    def write(self, chunk):
+        self.write_encoded(self.encode(chunk), len(chunk))
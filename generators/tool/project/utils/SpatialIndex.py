@@ -0,0 +1,349 @@
+import os
+import zipfile
+
+import numpy as np
+
+from project.utils.Reader import JsonLinesReader
+
+GRID_SUFFIX = ".grid.npz"
+# Side of the cells of the grid in degrees
+DEFAULT_CELL_DEG = 1.0
+DEFAULT_OBJECT = "countries"
+# Id of the points outside every polygon
+OUTSIDE = -1
+# Polygon edges tested against points at once in mixed cells
+QUERY_BLOCK_SIZE = 1 << 20
+
+_INDEXES = {}
+
+
+def load_topology(path: str) -> dict:
+    """The TopoJSON topology of a map file: the file itself, or the document
+    of the Elasticsearch bulk file pushed by Referentiels"""
+    with JsonLinesReader(path, persist_index=False) as reader:
+        for record in reader:
+            if record.get("type") == "Topology":
+                return record
+    raise Exception("No TopoJSON topology in {}".format(path))
+
+
+def decode_arcs(topology: dict) -> list:
+    """lon, lat (n, 2) arrays of the arcs of a topology, quantized ones being
+    delta-decoded then scaled by its transform"""
+    transform = topology.get("transform")
+    arcs = []
+    for arc in topology["arcs"]:
+        points = np.asarray(arc, dtype=np.float64)[:, :2]
+        if transform is not None:
+            points = np.cumsum(points, axis=0) * transform["scale"]
+            points += transform["translate"]
+        arcs.append(points)
+    return arcs
+
+
+def ring_points(arcs: list, ring: list) -> np.ndarray:
+    """Points of a ring joining its arcs, ~i being arc i reversed"""
+    parts = []
+    for position, arc in enumerate(ring):
+        points = arcs[arc] if arc >= 0 else arcs[~arc][::-1]
+        # Every arc starts where the previous one ends
+        parts.append(points if position == 0 else points[1:])
+    return np.concatenate(parts)
+
+
+def polygon_edges(topology: dict, object_name: str) -> tuple:
+    """(m, 4) x1, y1, x2, y2 edges of the rings of every geometry of an
+    object, with the id of their geometry and the list of ids"""
+    arcs = decode_arcs(topology)
+    topology_object = topology["objects"][object_name]
+    geometries = topology_object.get("geometries", [topology_object])
+    ids = []
+    edges = []
+    owners = []
+    for number, geometry in enumerate(geometries):
+        if geometry["type"] == "Polygon":
+            polygons = [geometry["arcs"]]
+        elif geometry["type"] == "MultiPolygon":
+            polygons = geometry["arcs"]
+        else:
+            continue
+        ids.append(int(geometry.get("id", number)))
+        for polygon in polygons:
+            # Holes are rings too, the even-odd rule leaves them out
+            for ring in polygon:
+                points = ring_points(arcs, ring)
+                edges.append(np.concatenate((points[:-1], points[1:]), axis=1))
+                owners.append(np.full(len(points) - 1, len(ids) - 1))
+    return np.concatenate(edges), np.concatenate(owners), np.array(ids)
+
+
+def crossings(edges: np.ndarray, px, py, qx, qy) -> np.ndarray:
+    """Whether the segments p-q cross the edges, an edge end lying on the
+    line p-q counting on one side only, as in ray casting"""
+    x1, y1, x2, y2 = edges.T
+
+    def side(ax, ay, bx, by, cx, cy):
+        return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+    return (
+        (side(px, py, qx, qy, x1, y1) > 0) != (side(px, py, qx, qy, x2, y2) > 0)
+    ) & (side(x1, y1, x2, y2, px, py) * side(x1, y1, x2, y2, qx, qy) < 0)
+
+
+class SpatialIndex:
+    """Polygons of a TopoJSON object, answering which one holds each point of
+    lon, lat arrays.
+
+    The map is covered by a grid of ``cell_deg`` cells keeping the polygon
+    holding the center of each cell and the edges crossing it. A point of a
+    cell without edges is in the polygon of its center; otherwise the edges
+    crossed on the way to the center tell whether it left or entered one.
+    The grid is built on first load, then kept next to the map in
+    ``path``.grid.npz. Polygons are expected not to overlap.
+    """
+
+    def __init__(
+        self,
+        ids,
+        lon_min,
+        lat_min,
+        cell_deg,
+        columns,
+        rows,
+        owners,
+        cell_start,
+        cell_edges,
+        cell_owners,
+    ):
+        self.ids = ids
+        self.lon_min = lon_min
+        self.lat_min = lat_min
+        self.cell_deg = cell_deg
+        self.columns = columns
+        self.rows = rows
+        # Polygon number holding the center of every cell, or OUTSIDE
+        self.owners = owners
+        # Edges crossing the cell i are cell_edges[cell_start[i]:cell_start[i + 1]]
+        self.cell_start = cell_start
+        self.cell_edges = cell_edges
+        self.cell_owners = cell_owners
+
+    @classmethod
+    def build(
+        cls,
+        topology: dict,
+        object_name: str = DEFAULT_OBJECT,
+        cell_deg: float = DEFAULT_CELL_DEG,
+    ):
+        edges, edge_owners, ids = polygon_edges(topology, object_name)
+        lon_min = (
+            np.floor(min(edges[:, 0].min(), edges[:, 2].min()) / cell_deg) * cell_deg
+        )
+        lat_min = (
+            np.floor(min(edges[:, 1].min(), edges[:, 3].min()) / cell_deg) * cell_deg
+        )
+        lon_max = max(edges[:, 0].max(), edges[:, 2].max())
+        lat_max = max(edges[:, 1].max(), edges[:, 3].max())
+        columns = int((lon_max - lon_min) // cell_deg) + 1
+        rows = int((lat_max - lat_min) // cell_deg) + 1
+
+        # Every edge goes to the cells of its bounding box
+        column_first = (
+            (np.minimum(edges[:, 0], edges[:, 2]) - lon_min) // cell_deg
+        ).astype(np.int64)
+        column_last = (
+            (np.maximum(edges[:, 0], edges[:, 2]) - lon_min) // cell_deg
+        ).astype(np.int64)
+        row_first = (
+            (np.minimum(edges[:, 1], edges[:, 3]) - lat_min) // cell_deg
+        ).astype(np.int64)
+        row_last = (
+            (np.maximum(edges[:, 1], edges[:, 3]) - lat_min) // cell_deg
+        ).astype(np.int64)
+        widths = column_last - column_first + 1
+        counts = widths * (row_last - row_first + 1)
+        edge_numbers = np.repeat(np.arange(len(edges)), counts)
+        offsets = np.arange(len(edge_numbers)) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        cell_columns = column_first[edge_numbers] + offsets % widths[edge_numbers]
+        cell_rows = row_first[edge_numbers] + offsets // widths[edge_numbers]
+        cells = cell_rows * columns + cell_columns
+        order = np.argsort(cells, kind="stable")
+        cell_start = np.searchsorted(cells[order], np.arange(rows * columns + 1))
+        cell_edges = edges[edge_numbers[order]]
+        cell_owners = edge_owners[edge_numbers[order]]
+
+        # Polygons holding the centers, casting rays row by row
+        center_lon = lon_min + (np.arange(columns) + 0.5) * cell_deg
+        owners = np.full((rows, columns), OUTSIDE, dtype=np.int64)
+        for row in range(rows):
+            y = lat_min + (row + 0.5) * cell_deg
+            crossing = (edges[:, 1] > y) != (edges[:, 3] > y)
+            x1, y1, x2, y2 = edges[crossing].T
+            x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            right = (x[None, :] > center_lon[:, None]).astype(np.int64)
+            inside = (
+                right @ np.eye(len(ids), dtype=np.int64)[edge_owners[crossing]]
+            ) % 2
+            held = inside.any(axis=1)
+            owners[row, held] = inside[held].argmax(axis=1)
+        return cls(
+            ids,
+            lon_min,
+            lat_min,
+            cell_deg,
+            columns,
+            rows,
+            owners.ravel(),
+            cell_start,
+            cell_edges,
+            cell_owners,
+        )
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        object_name: str = DEFAULT_OBJECT,
+        cell_deg: float = DEFAULT_CELL_DEG,
+        persist: bool = True,
+    ):
+        """Index of an object of a map file, from its grid file if it was built
+        for this very version of the map"""
+        grid_path = path + GRID_SUFFIX
+        stat = os.stat(path)
+        key = np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+        try:
+            with np.load(grid_path, allow_pickle=False) as grid:
+                if (
+                    np.array_equal(grid["key"], key)
+                    and str(grid["object_name"]) == object_name
+                    and float(grid["cell_deg"]) == cell_deg
+                ):
+                    return cls(
+                        grid["ids"],
+                        float(grid["lon_min"]),
+                        float(grid["lat_min"]),
+                        cell_deg,
+                        int(grid["columns"]),
+                        int(grid["rows"]),
+                        grid["owners"],
+                        grid["cell_start"],
+                        grid["cell_edges"],
+                        grid["cell_owners"],
+                    )
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+        index = cls.build(load_topology(path), object_name, cell_deg)
+        if persist:
+            index.save(grid_path, key, object_name)
+        return index
+
+    def save(self, grid_path: str, key: np.ndarray, object_name: str):
+        temporary = grid_path + ".tmp"
+        try:
+            with open(temporary, "wb") as file:
+                np.savez(
+                    file,
+                    key=key,
+                    object_name=object_name,
+                    cell_deg=self.cell_deg,
+                    ids=self.ids,
+                    lon_min=self.lon_min,
+                    lat_min=self.lat_min,
+                    columns=self.columns,
+                    rows=self.rows,
+                    owners=self.owners,
+                    cell_start=self.cell_start,
+                    cell_edges=self.cell_edges,
+                    cell_owners=self.cell_owners,
+                )
+            os.replace(temporary, grid_path)
+        except OSError:
+            # Read-only directory, the grid is rebuilt on every load
+            pass
+
+    def polygons(self, lon, lat) -> np.ndarray:
+        """Number of the polygon holding every point, or OUTSIDE"""
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        columns = np.floor((lon - self.lon_min) / self.cell_deg).astype(np.int64)
+        rows = np.floor((lat - self.lat_min) / self.cell_deg).astype(np.int64)
+        inside = (
+            (columns >= 0) & (columns < self.columns) & (rows >= 0) & (rows < self.rows)
+        )
+        cells = np.where(inside, rows * self.columns + columns, 0)
+        result = np.where(inside, self.owners[cells], OUTSIDE)
+
+        counts = np.where(
+            inside, self.cell_start[cells + 1] - self.cell_start[cells], 0
+        )
+        mixed = np.flatnonzero(counts)
+        # Points are tested against the edges of their cell by blocks of
+        # points holding about QUERY_BLOCK_SIZE edges together
+        blocks = np.cumsum(counts[mixed]) // QUERY_BLOCK_SIZE
+        for block in np.split(mixed, np.flatnonzero(np.diff(blocks)) + 1):
+            if len(block):
+                self.cross_cells(block, lon, lat, columns, rows, cells, counts, result)
+        return result
+
+    def cross_cells(self, points, lon, lat, columns, rows, cells, counts, result):
+        """Polygons of points of cells crossed by edges, from the edges crossed
+        on their way to the center of their cell"""
+        point_counts = counts[points]
+        pairs = np.repeat(points, point_counts)
+        offsets = np.arange(len(pairs)) - np.repeat(
+            np.cumsum(point_counts) - point_counts, point_counts
+        )
+        edge_numbers = self.cell_start[cells[pairs]] + offsets
+        center_lon = self.lon_min + (columns[pairs] + 0.5) * self.cell_deg
+        center_lat = self.lat_min + (rows[pairs] + 0.5) * self.cell_deg
+        crossed = crossings(
+            self.cell_edges[edge_numbers],
+            lon[pairs],
+            lat[pairs],
+            center_lon,
+            center_lat,
+        )
+        # Polygons whose edges are crossed an odd number of times are left or entered
+        keys = pairs[crossed] * len(self.ids) + self.cell_owners[edge_numbers[crossed]]
+        keys, times = np.unique(keys, return_counts=True)
+        keys = keys[times % 2 == 1]
+        flipped_points = keys // len(self.ids)
+        flipped_polygons = keys % len(self.ids)
+        centers = self.owners[cells[flipped_points]]
+        left = flipped_polygons == centers
+        result[flipped_points[left]] = OUTSIDE
+        result[flipped_points[~left]] = flipped_polygons[~left]
+
+    def lookup(self, lon, lat) -> np.ndarray:
+        """Id of the polygon holding every point, or OUTSIDE"""
+        polygons = self.polygons(lon, lat)
+        return np.where(polygons == OUTSIDE, OUTSIDE, self.ids[polygons])
+
+
+def load_index(path: str, object_name: str = DEFAULT_OBJECT) -> SpatialIndex:
+    """Index of a map file, loaded once per process"""
+    key = (os.path.abspath(path), object_name)
+    if key not in _INDEXES:
+        _INDEXES[key] = SpatialIndex.load(path, object_name)
+    return _INDEXES[key]
+
+
+def enrich_chunks(chunks, index: SpatialIndex, geo_fields: tuple):
+    """Yield the chunks with the polygon ids of their locations, geo_fields
+    being (lon field, lat field, id field) triples"""
+    for chunk in chunks:
+        for lon_field, lat_field, id_field in geo_fields:
+            if chunk.is_constant(lon_field) and chunk.is_constant(lat_field):
+                # Shared by every record, like the site of a single radar block
+                ids = int(
+                    index.lookup(
+                        [chunk.columns[lon_field]], [chunk.columns[lat_field]]
+                    )[0]
+                )
+            else:
+                ids = index.lookup(chunk.column(lon_field), chunk.column(lat_field))
+            chunk.insert_column(id_field, ids)
+        yield chunk
@@ -1,200 +1,545 @@
-import copy
 import datetime
-import json
 import numpy as np
-import uuid
 import math
-import random
+from itertools import chain
+
+from project.utils.Columnar import (
+    TIMESTAMP_EVENT,
+    TIMESTAMP_STR,
+    RecordBlock,
+    chunk_rows,
+    datetime_offsets,
+    datetime_range,
+    format_timestamps,
+    new_uuid,
+    new_uuid_base,
+    uuid_column,
+)
+from project.utils.Geo import great_circle_points, project_polar
+from project.utils.Reader import JsonLinesReader
+from project.utils.Serializer import DEFAULT_ENCODER, JsonLinesWriter
+
+DEFAULT_CHUNK_SIZE = 10000
+# lon min, lat min, lon max, lat max of the airspace the tracks fly over,
+# where radar sites and routes are drawn when none are given
+DEFAULT_AIRSPACE_AREA = (2.294859, 48.8175, 37.918436, 55.59828)
+GEO_DECIMALS = 6
+FLEET_SHAPES = ("linear", "curvy", "great_circle")
 
 
 def write_array_json_to_file(input_data: list(), output_path: str):
-    with open(output_path, "a") as file:
-        for record in input_data:
-            file.write(json.dumps(record))
-            file.write("\n")
+    with JsonLinesWriter(output_path) as writer:
+        writer.write(input_data)
+
+
+def write_chunks_json_to_file(
+    chunks, output_path: str, encoder: str = DEFAULT_ENCODER
+) -> JsonLinesWriter:
+    with JsonLinesWriter(output_path, encoder) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer
+
+
+def collect_records(chunks) -> list:
+    return list(chain.from_iterable(chunk_rows(chunk) for chunk in chunks))
+
+
+def chunk_ranges(size: int, chunk_size: int):
+    for start in range(0, size, chunk_size):
+        yield start, min(start + chunk_size, size)
+
+
+def split_count(count: int, size: int) -> list:
+    """[size, size, ..., rest] summing to count"""
+    return [end - start for start, end in chunk_ranges(count, size)]
+
+
+def linspace_chunk(start, stop, num, chunk_start, chunk_end):
+    # Same values as np.linspace(start, stop, num)[chunk_start:chunk_end]
+    # without building the whole array
+    step = (stop - start) / (num - 1) if num > 1 else 0.0
+    values = np.arange(chunk_start, chunk_end) * step + start
+    if chunk_end == num and num > 1:
+        values[-1] = stop
+    return values
+
+
+def parse_start_time(start_time=None) -> datetime.datetime:
+    """Naive UTC datetime of an ISO 8601 string or a datetime, now if None"""
+    if start_time is None:
+        return datetime.datetime.utcnow()
+    if isinstance(start_time, str):
+        start_time = datetime.datetime.fromisoformat(start_time)
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return start_time
 
 
 def load_json_file(path):
-    data = []
-    file = open(path, "r")
-    for line in file.readlines():
-        data.append(json.loads(line))
-    return data
-
-
-def generate_random_radar_plots(sample_size_by_radar, radar_number, frequency_s):
-    max_distance = (1000 - 10) * np.random.random(radar_number) + 10
-    max_altitude = (10000 - 0) * np.random.random(radar_number) + 0
-
-    result = []
-    for radar in range(0, radar_number):
-
-        current_max_radar_distance = max_distance[radar]
-        current_max_radar_altitude = max_altitude[radar]
-        degrees = (360 - 0) * np.random.random(sample_size_by_radar)
-        distances = (current_max_radar_distance - 10) * np.random.random(
-            sample_size_by_radar
-        ) + 10
-
-        altitudes = (current_max_radar_altitude - 0) * np.random.random(
-            sample_size_by_radar
-        ) + 0
-        start_timestamp = datetime.datetime.utcnow()
-        all_timestamp = [
-            start_timestamp + datetime.timedelta(seconds=(i * frequency_s))
-            for i in range(0, sample_size_by_radar)
-        ]
-        radar_id = uuid.uuid1()
-        for degree, distance, altitude, timestamp in zip(
-            degrees, distances, altitudes, all_timestamp
-        ):
-            plots_id = uuid.uuid1()
-
-            result.append(
-                {
-                    "coord": {
-                        "degree": degree,
-                        "distance": distance,
-                        "altitude": altitude,
-                    },
-                    "plots": {"id": str(plots_id)},
-                    "radar": {
-                        "id": str(radar_id),
-                        "coverage": {
-                            "distance": current_max_radar_distance,
-                            "altitude": current_max_radar_altitude,
-                        },
-                    },
-                    "@timestamp": str(timestamp),
-                }
-            )
-    return result
+    """Every record of a json lines file, see JsonLinesReader to read lazily"""
+    with JsonLinesReader(path) as reader:
+        return list(reader)
+
+
+def radar_sites(sites, area, radar_number: int, rng) -> tuple:
+    """lon, lat arrays of the radars: the ``sites`` given, reused in turn if
+    there are fewer than radars, or drawn uniformly in ``area``"""
+    if sites:
+        lon = np.array(
+            [float(sites[i % len(sites)]["lon"]) for i in range(0, radar_number)]
+        )
+        lat = np.array(
+            [float(sites[i % len(sites)]["lat"]) for i in range(0, radar_number)]
+        )
+        return lon, lat
+    lon_min, lat_min, lon_max, lat_max = area or DEFAULT_AIRSPACE_AREA
+    lon = (lon_max - lon_min) * rng.random(radar_number) + lon_min
+    lat = (lat_max - lat_min) * rng.random(radar_number) + lat_min
+    return np.round(lon, GEO_DECIMALS), np.round(lat, GEO_DECIMALS)
+
+
+def iter_random_radar_plots(
+    sample_size_by_radar,
+    radar_number,
+    frequency_s,
+    sites=None,
+    area=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
+):
+    """Plots of every radar, radar after radar, by blocks of chunk_size plots
+    that may span several radars. Polar coordinates (bearing in degrees,
+    distance in km) are also projected to lon/lat around the radar site."""
+    rng = np.random.default_rng(rng)
+    max_distance = (1000 - 10) * rng.random(radar_number) + 10
+    max_altitude = (10000 - 0) * rng.random(radar_number) + 0
+    site_lon, site_lat = radar_sites(sites, area, radar_number, rng)
+    radar_ids = uuid_column(new_uuid_base(rng), 0, radar_number)
+    plots_base = new_uuid_base(rng)
+    start_timestamp = parse_start_time(start_time)
+
+    radar_fields = {
+        "radar.id": radar_ids,
+        "radar.coverage.distance": max_distance,
+        "radar.coverage.altitude": max_altitude,
+        "radar.location.lon": site_lon,
+        "radar.location.lat": site_lat,
+    }
+
+    for start, end in chunk_ranges(sample_size_by_radar * radar_number, chunk_size):
+        size = end - start
+        indices = np.arange(start, end)
+        radars = indices // sample_size_by_radar
+        plots = indices - radars * sample_size_by_radar
+        if radars[0] == radars[-1]:
+            # Radar fields of a block of one radar are written once
+            radars = int(radars[0])
+
+        degrees = (360 - 0) * rng.random(size)
+        distances = (max_distance[radars] - 10) * rng.random(size) + 10
+        altitudes = (max_altitude[radars] - 0) * rng.random(size) + 0
+        lon, lat = project_polar(site_lon[radars], site_lat[radars], degrees, distances)
+        # A micro degree is about 10 cm, as fine as a geo_point keeps
+        lon = np.round(lon, GEO_DECIMALS)
+        lat = np.round(lat, GEO_DECIMALS)
+        all_timestamp = datetime_offsets(start_timestamp, frequency_s, plots)
+
+        yield RecordBlock(
+            {
+                "coord.degree": degrees,
+                "coord.distance": distances,
+                "coord.altitude": altitudes,
+                "coord.location.lon": lon,
+                "coord.location.lat": lat,
+                "plots.id": uuid_column(plots_base, start, end),
+                **{
+                    field: (
+                        values[radars].item()
+                        if isinstance(radars, int)
+                        else values[radars]
+                    )
+                    for field, values in radar_fields.items()
+                },
+                "@timestamp": format_timestamps(all_timestamp, TIMESTAMP_STR),
+            },
+            size,
+        )
+
+
+def generate_random_radar_plots(
+    sample_size_by_radar, radar_number, frequency_s, sites=None, area=None
+):
+    return collect_records(
+        iter_random_radar_plots(
+            sample_size_by_radar, radar_number, frequency_s, sites, area
+        )
+    )
+
+
+def iter_random_linear_points(
+    x_start,
+    x_end,
+    y_start,
+    y_end,
+    duration_h,
+    frequency_s,
+    aeronef_ID,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
+):
+    duration_s = duration_h * 3600
+    max_track_point = int(duration_s / frequency_s)
+    rng = np.random.default_rng(rng)
+    track_id = new_uuid(rng)
+    plots_base = new_uuid_base(rng)
+    start_timestamp = parse_start_time(start_time)
+
+    for start, end in chunk_ranges(max_track_point, chunk_size):
+        x_tracks = linspace_chunk(x_start, x_end, max_track_point, start, end)
+        y_tracks = linspace_chunk(y_start, y_end, max_track_point, start, end)
+        x_altitude = linspace_chunk(0, math.pi, max_track_point, start, end)
+        y_altitude = 10000 * np.sin(x_altitude)
+        all_timestamp = datetime_range(start_timestamp, frequency_s, start, end)
+
+        yield RecordBlock(
+            {
+                "@timestamp": format_timestamps(all_timestamp, TIMESTAMP_STR),
+                "aeronef.id": aeronef_ID,
+                "coord.longitude": x_tracks,
+                "coord.latitude": y_tracks,
+                "coord.altitude": y_altitude,
+                "plots.id": uuid_column(plots_base, start, end),
+                "tracks.id": str(track_id),
+            },
+            end - start,
+        )
 
 
 def generate_random_linear_points(
     x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
+):
+    return collect_records(
+        iter_random_linear_points(
+            x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
+        )
+    )
+
+
+def iter_random_curvy_points(
+    x_start,
+    x_end,
+    y_start,
+    y_end,
+    duration_h,
+    frequency_s,
+    aeronef_ID,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
 ):
     duration_s = duration_h * 3600
     max_track_point = int(duration_s / frequency_s)
-    x_tracks = np.linspace(x_start, x_end, max_track_point)
-    y_tracks = np.linspace(y_start, y_end, max_track_point)
-    x_altitude = np.linspace(0, math.pi, max_track_point)
-    y_altitude = [10000 * math.sin(i) for i in x_altitude]
-    track_id = uuid.uuid1()
-    start_timestamp = datetime.datetime.utcnow()
-    all_timestamp = [
-        start_timestamp + datetime.timedelta(seconds=(i * frequency_s))
-        for i in range(0, max_track_point)
-    ]
-
-    return [
-        {
-            "@timestamp": str(timestamp),
-            "aeronef": {"id": aeronef_ID},
-            "coord": {"longitude": x, "latitude": y, "altitude": a},
-            "plots": {"id": str(uuid.uuid1())},
-            "tracks": {"id": str(track_id)},
-        }
-        for x, y, a, timestamp in zip(x_tracks, y_tracks, y_altitude, all_timestamp)
-    ]
+    rng = np.random.default_rng(rng)
+    track_id = new_uuid(rng)
+    plots_base = new_uuid_base(rng)
+    start_timestamp = parse_start_time(start_time)
+
+    for start, end in chunk_ranges(max_track_point, chunk_size):
+        x_tracks = linspace_chunk(x_start, x_end, max_track_point, start, end)
+        x_curve = linspace_chunk(-3, 3, max_track_point, start, end)
+        y_tracks = linspace_chunk(y_start, y_end, max_track_point, start, end)
+        y_curve = -(x_curve * x_curve) + 10
+        latitudes = y_tracks + y_curve
+        x_altitude = linspace_chunk(0, math.pi, max_track_point, start, end)
+        y_altitude = 10000 * np.sin(x_altitude)
+        all_timestamp = datetime_range(start_timestamp, frequency_s, start, end)
+
+        yield RecordBlock(
+            {
+                "@timestamp": format_timestamps(all_timestamp, TIMESTAMP_STR),
+                "aeronef.id": aeronef_ID,
+                "coord.longitude": x_tracks,
+                "coord.latitude": latitudes,
+                "coord.altitude": y_altitude,
+                "plots.id": uuid_column(plots_base, start, end),
+                "tracks.id": str(track_id),
+            },
+            end - start,
+        )
 
 
 def generate_random_curvy_points(
     x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
 ):
-    duration_s = duration_h * 3600
-    max_track_point = int(duration_s / frequency_s)
-    x_tracks = np.linspace(x_start, x_end, max_track_point)
-    x_curve = np.linspace(-3, 3, max_track_point)
-    y_tracks = np.linspace(y_start, y_end, max_track_point)
-    y_curve = [-(x * x) + 10 for x in x_curve]
-    x_altitude = np.linspace(0, math.pi, max_track_point)
-    y_altitude = [10000 * math.sin(i) for i in x_altitude]
-    track_id = uuid.uuid1()
-    start_timestamp = datetime.datetime.utcnow()
-    all_timestamp = [
-        start_timestamp + datetime.timedelta(seconds=(i * frequency_s))
-        for i in range(0, max_track_point)
-    ]
-
-    return [
-        {
-            "@timestamp": str(timestamp),
-            "aeronef": {"id": aeronef_ID},
-            "coord": {"longitude": x1, "latitude": y1 + y2, "altitude": a},
-            "plots": {"id": str(uuid.uuid1())},
-            "tracks": {"id": str(track_id)},
-        }
-        for x1, x2, y1, y2, a, timestamp in zip(
-            x_tracks, x_curve, y_tracks, y_curve, y_altitude, all_timestamp
+    return collect_records(
+        iter_random_curvy_points(
+            x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
         )
-    ]
+    )
+
+
+def iter_random_shape_points(
+    x_start,
+    x_end,
+    y_start,
+    y_end,
+    duration_h,
+    frequency_s,
+    aeronef_ID,
+    shape="linear",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
+):
+    if shape == "linear":
+        iter_points = iter_random_linear_points
+    elif shape == "curvy":
+        iter_points = iter_random_curvy_points
+    else:
+        print("Unknown Shape TYPE, default linear")
+        iter_points = iter_random_linear_points
+    return iter_points(
+        x_start,
+        x_end,
+        y_start,
+        y_end,
+        duration_h,
+        frequency_s,
+        aeronef_ID,
+        chunk_size,
+        rng,
+        start_time,
+    )
 
 
 def generate_random_shape_points(
     x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID, shape="linear"
 ):
-    if shape == "linear":
-        tracks = generate_random_linear_points(
-            x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
+    return collect_records(
+        iter_random_shape_points(
+            x_start,
+            x_end,
+            y_start,
+            y_end,
+            duration_h,
+            frequency_s,
+            aeronef_ID,
+            shape,
         )
-    elif shape == "curvy":
-        tracks = generate_random_curvy_points(
-            x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
+    )
+
+
+def step_count(duration_h, frequency_s) -> int:
+    return int(duration_h * 3600 / frequency_s)
+
+
+def fleet_positions(
+    shapes, start_lon, start_lat, end_lon, end_lat, steps, step_number: int
+) -> tuple:
+    """lon, lat and altitude of aircraft at time steps of their routes, the
+    linear and curvy ones being the tracks of iter_random_shape_points"""
+    last = max(1, step_number - 1)
+    lon = steps * ((end_lon - start_lon) / last) + start_lon
+    lat = steps * ((end_lat - start_lat) / last) + start_lat
+    arrived = steps == step_number - 1
+    if step_number > 1 and arrived.any():
+        lon[arrived] = end_lon[arrived]
+        lat[arrived] = end_lat[arrived]
+
+    curvy = shapes == FLEET_SHAPES.index("curvy")
+    if curvy.any():
+        x_curve = steps[curvy] * (6 / last) - 3
+        lat[curvy] += -(x_curve * x_curve) + 10
+
+    great_circle = shapes == FLEET_SHAPES.index("great_circle")
+    if great_circle.any():
+        lon[great_circle], lat[great_circle] = great_circle_points(
+            start_lon[great_circle],
+            start_lat[great_circle],
+            end_lon[great_circle],
+            end_lat[great_circle],
+            steps[great_circle] / last,
         )
+
+    altitude = 10000 * np.sin(steps * (math.pi / last))
+    return lon, lat, altitude
+
+
+def iter_fleet_points(
+    aircraft_number,
+    duration_h,
+    frequency_s,
+    shape="linear",
+    area=None,
+    aeronef_prefix="aeronef",
+    step_start=0,
+    step_end=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
+):
+    """Plots of a fleet of aircraft flying at the same time, ordered by time
+    step then aircraft, by chunks of chunk_size plots.
+
+    Every aircraft flies from a random point of ``area`` to another over the
+    duration, along a linear, curvy or great_circle route, or one of them
+    drawn per aircraft if shape is "mixed". Only the steps [step_start,
+    step_end) are generated, of the same fleet for the same rng.
+    """
+    rng = np.random.default_rng(rng)
+    step_number = step_count(duration_h, frequency_s)
+    step_end = step_number if step_end is None else step_end
+    lon_min, lat_min, lon_max, lat_max = area or DEFAULT_AIRSPACE_AREA
+    start_lon = (lon_max - lon_min) * rng.random(aircraft_number) + lon_min
+    start_lat = (lat_max - lat_min) * rng.random(aircraft_number) + lat_min
+    end_lon = (lon_max - lon_min) * rng.random(aircraft_number) + lon_min
+    end_lat = (lat_max - lat_min) * rng.random(aircraft_number) + lat_min
+    if shape == "mixed":
+        shapes = rng.integers(0, len(FLEET_SHAPES), aircraft_number)
     else:
-        print("Unknown Shape TYPE, default linear")
-        tracks = generate_random_linear_points(
-            x_start, x_end, y_start, y_end, duration_h, frequency_s, aeronef_ID
+        if shape not in FLEET_SHAPES:
+            print("Unknown Shape TYPE, default linear")
+            shape = "linear"
+        shapes = np.full(aircraft_number, FLEET_SHAPES.index(shape))
+    aeronef_ids = np.char.add(
+        aeronef_prefix + "-", np.arange(1, aircraft_number + 1).astype("U")
+    )
+    tracks_ids = uuid_column(new_uuid_base(rng), 0, aircraft_number)
+    plots_base = new_uuid_base(rng)
+    start_timestamp = parse_start_time(start_time)
+
+    first = step_start * aircraft_number
+    for start, end in chunk_ranges(
+        (step_end - step_start) * aircraft_number, chunk_size
+    ):
+        indices = np.arange(first + start, first + end)
+        steps = indices // aircraft_number
+        aircraft = indices - steps * aircraft_number
+        lon, lat, altitude = fleet_positions(
+            shapes[aircraft],
+            start_lon[aircraft],
+            start_lat[aircraft],
+            end_lon[aircraft],
+            end_lat[aircraft],
+            steps,
+            step_number,
         )
-    return tracks
+        all_timestamp = datetime_offsets(start_timestamp, frequency_s, steps)
+
+        yield RecordBlock(
+            {
+                "@timestamp": format_timestamps(all_timestamp, TIMESTAMP_STR),
+                "aeronef.id": aeronef_ids[aircraft],
+                "coord.longitude": lon,
+                "coord.latitude": lat,
+                "coord.altitude": altitude,
+                "plots.id": uuid_column(plots_base, first + start, first + end),
+                "tracks.id": tracks_ids[aircraft],
+            },
+            end - start,
+        )
+
+
+def generate_fleet_points(aircraft_number, duration_h, frequency_s, shape="linear"):
+    return collect_records(
+        iter_fleet_points(aircraft_number, duration_h, frequency_s, shape)
+    )
+
+
+def iter_linear_aircraft_sensor_values(
+    aircraft_number: int,
+    max_cycle_number: int,
+    cycle_schedule_s: int,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
+):
+    rng = np.random.default_rng(rng)
+    all_aircraft_cycles = (max_cycle_number - 1) * rng.random(aircraft_number) + 1
+    all_cycle_numbers = all_aircraft_cycles.astype(np.int64)
+    all_aircraft_offsets = np.concatenate(([0], np.cumsum(all_cycle_numbers)))
+    aircraft_base = new_uuid_base(rng)
+    start_timestamp = parse_start_time(start_time)
+
+    first = 0
+    while first < aircraft_number:
+        # Group whole aircraft until the block holds chunk_size records
+        last = int(
+            np.searchsorted(
+                all_aircraft_offsets, all_aircraft_offsets[first] + chunk_size, "right"
+            )
+        )
+        last = min(max(last - 1, first + 1), aircraft_number)
+
+        cycle_numbers = all_cycle_numbers[first:last]
+        size = int(all_aircraft_offsets[last] - all_aircraft_offsets[first])
+        record_offsets = np.repeat(
+            all_aircraft_offsets[first:last] - all_aircraft_offsets[first],
+            cycle_numbers,
+        )
+        cycle_index = np.arange(0, size) - record_offsets
+        repeated_cycle_numbers = np.repeat(cycle_numbers, cycle_numbers)
+
+        # np.linspace(0, 1.0, cycle_number) for every aircraft at once
+        steps = 1.0 / np.maximum(repeated_cycle_numbers - 1, 1)
+        sensor_values = cycle_index * steps
+        sensor_values[
+            (cycle_index == repeated_cycle_numbers - 1) & (repeated_cycle_numbers > 1)
+        ] = 1.0
+
+        all_timestamp = np.datetime64(start_timestamp, "us") + (
+            cycle_index * cycle_schedule_s
+        ).astype("timedelta64[s]")
+        aircraft_ids = np.repeat(uuid_column(aircraft_base, first, last), cycle_numbers)
+
+        yield RecordBlock(
+            {
+                "cycle.schedule": cycle_schedule_s,
+                "cycle.number": cycle_index + 1,
+                "aircraft.id": aircraft_ids,
+                "event_timestamp": format_timestamps(all_timestamp, TIMESTAMP_EVENT),
+                "sensor": sensor_values,
+            },
+            size,
+        )
+        first = last
 
 
 def generate_linear_aircraft_sensor_values(
     aircraft_number: int, max_cycle_number: int, cycle_schedule_s: int
 ) -> list():
-    to_return = []
-    meta = {"cycle": {"schedule": cycle_schedule_s}}
-    all_aircraft_cycles = (max_cycle_number - 1) * np.random.random(aircraft_number) + 1
-    all_aircraft_id = [uuid.uuid1() for i in range(0, aircraft_number)]
-
-    for i in range(0, aircraft_number):
-        current_cycle_number = int(all_aircraft_cycles[i])
-        current_aircraft_id = all_aircraft_id[i]
-
-        start_timestamp = datetime.datetime.utcnow()
-
-        all_timestamp = [
-            start_timestamp + datetime.timedelta(seconds=(i * cycle_schedule_s))
-            for i in range(0, current_cycle_number)
-        ]
-        all_cycles = [i for i in range(1, current_cycle_number + 1)]
-        all_sensor_values = np.linspace(0, 1.0, current_cycle_number)
-
-        for timestamp, cycle, sensor in zip(
-            all_timestamp, all_cycles, all_sensor_values
-        ):
-            current_record = copy.deepcopy(meta)
-            current_record["aircraft"] = {}
-            current_record["aircraft"]["id"] = str(current_aircraft_id)
-            current_record["event_timestamp"] = timestamp.strftime(
-                "%Y-%m-%dT%H:%M:%S.000Z"
-            )
-            current_record["cycle"]["number"] = cycle
-            current_record["sensor"] = sensor
+    return collect_records(
+        iter_linear_aircraft_sensor_values(
+            aircraft_number, max_cycle_number, cycle_schedule_s
+        )
+    )
 
-            to_return.append(current_record)
 
-    return to_return
+def label_column(prefix: str, numbers: np.ndarray) -> np.ndarray:
+    """Render "{prefix}{number}" for every number at once"""
+    return np.char.add(prefix, numbers.astype(np.int64).astype("U20"))
 
 
-def generate_random_tool_user(
-    iteration_number, schedule_time_s, average_life_esperancy_s, average_flow_rate
+def slice_block(block: RecordBlock, chunk_size: int):
+    for start, end in chunk_ranges(len(block), chunk_size):
+        yield block.slice(start, end)
+
+
+def iter_random_tool_user(
+    iteration_number,
+    schedule_time_s,
+    average_life_esperancy_s,
+    average_flow_rate,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
 ):
-    all_new_users = np.random.poisson(average_flow_rate, iteration_number)
-    all_users = []
-    to_return = []
-    http_code = [200, 301, 302, 401, 403, 404, 500, 503, 504]
+    rng = np.random.default_rng(rng)
+    all_new_users = rng.poisson(average_flow_rate, iteration_number)
+    http_code = np.array([200, 301, 302, 401, 403, 404, 500, 503, 504])
     project_number = 10
     tool_number = 10
     average_request_number = 10
@@ -202,96 +547,141 @@ def generate_random_tool_user(
     average_request_duration = 20000
     std_request_duration = 10
 
+    start_timestamp = np.datetime64(parse_start_time(start_time), "us")
+    user_base = new_uuid_base(rng)
+    user_count = 0
+
+    # Only users still alive are kept, one array per attribute
+    users_id = np.empty(0, dtype="U36")
+    users_project = np.empty(0, dtype=np.int64)
+    users_life = np.empty(0, dtype=np.int64)
+    users_timestamp = np.empty(0, dtype="datetime64[us]")
+
     for current_iteration in range(0, iteration_number):
 
-        start_timestamp = datetime.datetime.utcnow()
+        # Add new Users
         new_users = all_new_users[current_iteration]
-        projects_number = project_number * np.random.random(new_users)
+        projects_number = (project_number * rng.random(new_users)).astype(np.int64)
+        lives = rng.exponential(average_life_esperancy_s, new_users).astype(np.int64)
+        born = lives > 0
+        born_number = int(born.sum())
+        ids = uuid_column(user_base, user_count, user_count + born_number)
+        user_count += born_number
+
+        # One block every iteration, empty without new users, so that the
+        # observers of the chunks see those iterations too
+        yield RecordBlock(
+            {
+                "event_timestamp": format_timestamps(
+                    np.repeat(start_timestamp, born_number), TIMESTAMP_EVENT
+                ),
+                "user.id": ids,
+                "user.project": label_column("project-", projects_number[born]),
+                "life": lives[born],
+            },
+            born_number,
+        )
 
-        # Add new Users
-        for i in range(0, new_users):
-            current_user = {
-                "event_timestamp": start_timestamp.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-                "user": {
-                    "id": str(uuid.uuid1()),
-                    "project": "project-{index}".format(
-                        index=str(int(projects_number[i]))
-                    ),
-                },
-                "life": int(random.expovariate(1 / average_life_esperancy_s)),
-            }
-            if current_user["life"] > 0:
-                all_users.append(current_user.copy())
-                to_return.append(current_user.copy())
+        # Decrease users life counter, forget the dead ones
+        users_life = np.concatenate((users_life, lives[born])) - 1
+        alive = users_life > 0
+        users_life = users_life[alive]
+        users_id = np.concatenate((users_id, ids))[alive]
+        users_project = np.concatenate((users_project, projects_number[born]))[alive]
+        users_timestamp = np.concatenate(
+            (users_timestamp, np.repeat(start_timestamp, born_number))
+        )[alive] + np.timedelta64(int(schedule_time_s * 1000000), "us")
+
+        # Draw the requests of every living user at once
+        request_number = rng.poisson(average_request_number, len(users_life))
+        total_request_number = int(request_number.sum())
+        if total_request_number == 0:
+            continue
+        request_user = np.repeat(np.arange(0, len(users_life)), request_number)
+        request_index = np.arange(0, total_request_number) - np.repeat(
+            np.cumsum(request_number) - request_number, request_number
+        )
+        step = request_number[request_user] / schedule_time_s
+        request_timestamp = users_timestamp[request_user] + np.round(
+            request_index * step * 1000000
+        ).astype("timedelta64[us]")
 
-        # Decrease users life counter
-        for user in all_users:
-            user["life"] = user["life"] - 1
+        current_all_request_type = request_type_number * rng.random(
+            total_request_number
+        )
+        current_all_http_codes = len(http_code) * rng.random(total_request_number)
+        current_all_project = tool_number * rng.random(total_request_number)
+        current_all_request_duration = rng.normal(
+            average_request_duration, std_request_duration, total_request_number
+        )
 
-            if user["life"] > 0:
+        requests = RecordBlock(
+            {
+                "event_timestamp": format_timestamps(
+                    request_timestamp, TIMESTAMP_EVENT
+                ),
+                "user.id": users_id[request_user],
+                "user.project": label_column("project-", users_project[request_user]),
+                "user.tool": label_column("tool-", current_all_project),
+                "life": users_life[request_user],
+                "http.request.payload": label_column(
+                    "request-", current_all_request_type
+                ),
+                "http.response.code": http_code[
+                    current_all_http_codes.astype(np.int64)
+                ],
+                "http.response.duration": current_all_request_duration,
+            },
+            total_request_number,
+        )
+        yield from slice_block(requests, chunk_size)
+
+
+def generate_random_tool_user(
+    iteration_number, schedule_time_s, average_life_esperancy_s, average_flow_rate
+):
+    return collect_records(
+        iter_random_tool_user(
+            iteration_number,
+            schedule_time_s,
+            average_life_esperancy_s,
+            average_flow_rate,
+        )
+    )
 
-                user["event_timestamp"] = (
-                    datetime.datetime.strptime(
-                        user["event_timestamp"], "%Y-%m-%dT%H:%M:%S.000Z"
-                    )
-                    + datetime.timedelta(seconds=schedule_time_s)
-                ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-
-                request_number = np.random.poisson(average_request_number, 1)
-                step = request_number[0] / schedule_time_s
-                current_all_request_type = request_type_number * np.random.random(
-                    request_number
-                )
-                current_all_http_codes = len(http_code) * np.random.random(
-                    request_number
-                )
-                current_all_project = tool_number * np.random.random(request_number)
-                current_all_request_duration = np.random.normal(
-                    average_request_duration, std_request_duration, request_number
-                )
-                current_all_timestamp = [
-                    (
-                        datetime.datetime.strptime(
-                            user["event_timestamp"], "%Y-%m-%dT%H:%M:%S.000Z"
-                        )
-                        + datetime.timedelta(seconds=i * step)
-                    ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-                    for i in range(0, request_number[0])
-                ]
-
-                for (
-                    current_request_type,
-                    current_http_code,
-                    current_request_duration,
-                    current_timestamp,
-                    current_project,
-                ) in zip(
-                    current_all_request_type,
-                    current_all_http_codes,
-                    current_all_request_duration,
-                    current_all_timestamp,
-                    current_all_project,
-                ):
-                    current_user = user.copy()
-                    current_user["event_timestamp"] = current_timestamp
-                    current_user["http"] = {}
-                    current_user["http"]["request"] = {}
-                    current_user["http"]["response"] = {}
-                    current_user["http"]["request"][
-                        "payload"
-                    ] = "request-{number}".format(number=int(current_request_type))
-                    current_user["http"]["response"]["code"] = http_code[
-                        int(current_http_code)
-                    ]
-                    current_user["http"]["response"][
-                        "duration"
-                    ] = current_request_duration
-                    current_user["user"]["tool"] = "tool-{number}".format(
-                        number=int(current_project)
-                    )
-                    to_return.append(current_user)
 
-    return to_return
+def iter_linear_values(
+    schedule_time_s,
+    sample_number,
+    x_start_value,
+    x_end_value,
+    y_start_value,
+    y_end_value,
+    type,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    rng=None,
+    start_time=None,
+):
+    start_timestamp = parse_start_time(start_time)
+
+    for start, end in chunk_ranges(sample_number, chunk_size):
+        dependent = linspace_chunk(
+            x_start_value, x_end_value, sample_number, start, end
+        )
+        independent = linspace_chunk(
+            y_start_value, y_end_value, sample_number, start, end
+        )
+        all_timestamp = datetime_range(start_timestamp, schedule_time_s, start, end)
+
+        yield RecordBlock(
+            {
+                "event_timestamp": format_timestamps(all_timestamp, TIMESTAMP_EVENT),
+                "x": dependent,
+                "y": independent,
+                "corr_type": type,
+            },
+            end - start,
+        )
 
 
 def generate_linear_values(
@@ -303,24 +693,14 @@ def generate_linear_values(
     y_end_value,
     type,
 ):
-    to_return = []
-    dependent = np.linspace(x_start_value, x_end_value, sample_number)
-    independent = np.linspace(y_start_value, y_end_value, sample_number)
-    start_timestamp = datetime.datetime.utcnow()
-    all_timestamp = [
-        (start_timestamp + datetime.timedelta(seconds=i * schedule_time_s)).strftime(
-            "%Y-%m-%dT%H:%M:%S.000Z"
+    return collect_records(
+        iter_linear_values(
+            schedule_time_s,
+            sample_number,
+            x_start_value,
+            x_end_value,
+            y_start_value,
+            y_end_value,
+            type,
         )
-        for i in range(0, sample_number)
-    ]
-
-    for dep, ind, timestamp in zip(dependent, independent, all_timestamp):
-        current_record = {
-            "event_timestamp": timestamp,
-            "x": dep,
-            "y": ind,
-            "corr_type": type,
-        }
-        to_return.append(current_record)
-
-    return to_return
+    )
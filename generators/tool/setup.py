@@ -9,7 +9,12 @@ setuptools.setup(
     "mlflow==1.12.1",
     "scikit-learn==0.23.2",
     "elasticsearch==7.10.0"
-    ],    
+    ],
+    extras_require={
+        "kafka": ["kafka-python==2.0.2"],
+        "arrow": ["pyarrow>=2.0.0"],
+        "zstd": ["zstandard>=0.15"],
+    },
     packages=setuptools.find_packages(),
 )
 